@@ -1,31 +1,551 @@
+import functools
+import itertools
+import json
+import math
+import os
 import sys
-from qtpy.QtWidgets import (QApplication, QWidget, QComboBox, QVBoxLayout, QTableWidget, QGridLayout,
-                            QTableWidgetItem, QFileDialog, QPushButton, QLabel, QLineEdit, 
-                            QTableWidgetSelectionRange, QTextEdit, QCheckBox, QHBoxLayout, QDialog)
-from qtpy.QtCore import Qt
-from qtpy.QtGui import QFont, QColor, QDoubleValidator
-import pandas as pd
+import time
+from contextlib import contextmanager
+from qtpy import QT5
+from qtpy.QtWidgets import (QApplication, QWidget, QComboBox, QVBoxLayout, QTableView, QAbstractItemView,
+                            QAbstractScrollArea, QFileDialog, QPushButton, QLabel, QLineEdit,
+                            QTextEdit, QCheckBox, QHBoxLayout, QDialog, QSpinBox, QShortcut, QMenuBar, QListView,
+                            QMessageBox)
+from qtpy.QtCore import (Qt, QAbstractListModel, QAbstractTableModel, QEvent, QModelIndex, QRect, QSize,
+                         QStandardPaths, QTimer, Signal, Slot)
+from qtpy.QtGui import (QFont, QColor, QDoubleValidator, QKeySequence, QPainter, QRegion,
+                        QTextCharFormat, QTextCursor, QValidator)
+from qgenerator import (FREE, PLATE_FORMATS, SAMPLE_TYPES, SELECTION_MODES, TRAYS, Campaign, RubberBand, full_name,
+                        iter_bits, iter_injections, iter_rows, row_runs, sample_type)
+from qgenerator.exports import EXPORT_MODES, injection_keys, save_diff
+from qgenerator.history import AddGroups, Clear, EditGroup, History, RemoveWell, SetPlateFormat
+from qgenerator.manifest import FILL_ORDERS, place_manifest, read_manifest
+from qgenerator.methods import MethodIndex
+from qgenerator.naming import DEFAULT_TEMPLATE, TOKENS, NameTemplate, check_unique
+from qgenerator.ordering import optimize_travel
+from qgenerator.outputs import check_outputs
+from qgenerator.profiling import PROFILER, profile_path, profiled, start_from_environment
+from qgenerator.project import (PROJECT_EXTENSION, Journal, journal_in_use, load_project, remove_journal,
+                                replay_journal, save_project)
+from qgenerator.runorder import RUN_ORDERS, run_order
+from qgenerator.validation import ValidationIndex
+from qgenerator.worklists import DEFAULT_FORMAT, WORKLIST_FORMATS, export_worklists, worklist_jobs
+
+OVERVIEW_COLUMNS = ["Sample", "Inj. Vol.", "Instrument Method", "Path"]
+# Group fields behind the editable overview columns
+OVERVIEW_FIELDS = {1: "inj_vol", 2: "instrument_method", 3: "path"}
+PROJECT_FILTER = f"Qgenerator Projects (*{PROJECT_EXTENSION})"
+JOURNAL_EXTENSION = ".qgenlog"
+# Numbers the journals of this process, since several windows may start one within the same second
+JOURNAL_NUMBERS = itertools.count(1)
+GRID_MOUSE_EVENTS = (QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.MouseButtonRelease)
+
+# Plate canvas geometry, in logical pixels; Qt scales them on high-DPI screens
+MIN_WELL_SIZE = 6       # Wells never get smaller than this when the plate is fitted to the view
+DEFAULT_WELL_SIZE = 32  # Preferred well size of the main grid
+LABEL_PADDING = 4
+MAX_ZOOM = 16
+ZOOM_STEP = 1.25        # Per wheel notch or zoom shortcut
+
+# While profiling, a timer ticking this often (ms) reports ticks delayed by more than STALL_THRESHOLD_MS
+STALL_CHECK_INTERVAL_MS = 50
+STALL_THRESHOLD_MS = 100
+
+# Set to a file name to have the window write its startup timings there and close (see benchmarks/startup.py)
+STARTUP_REPORT_VARIABLE = "QGEN_STARTUP_REPORT"
+
+# Data paths are checked on disk this long (ms) after the last edit
+OUTPUT_CHECK_DELAY_MS = 500
+# The run order summary is rebuilt this long (ms) after the last edit, not on every drag step
+RUN_ORDER_PREVIEW_DELAY_MS = 150
+METHOD_RESULTS = 500  # Methods listed at most in the method library
+
+
+def thread_pool(max_workers, name):
+    # Pools are made on first use; showing the window does not need concurrent.futures
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+def close_splash():
+    # The splash screen of a frozen build made with a splash image, see Qgenerator.spec
+    try:
+        import pyi_splash
+    except ImportError:
+        return
+    pyi_splash.close()
+
+
+def order_queue(campaign, optimize=False, keep_groups=False, **order):
+    # The campaign's injections in the order the queue is written: travel optimized, then in run order.
+    # Returns (injections, seed, travel report or None). Reads no widgets, so it also runs on workers.
+    injections = iter_injections(campaign.sample_groups)
+    report = None
+    if optimize:
+        injections, report = optimize_travel(campaign, injections, keep_groups)
+    injections, seed = run_order(injections, **order)
+    return list(injections), seed, report
+
+
+def check_queue_outputs(campaign, queue_order, template):
+    injections, _seed, _report = queue_order(campaign)
+    return check_outputs(injections, template)
+
+
+def volume_validator(parent=None):
+    # Injection volumes in µL, wherever they are typed
+    return QDoubleValidator(0.0, 9999.99, 2, parent)
+
+
+def encode_color(value):
+    # Group colors are stored as "#rrggbb" in project files and the autosave journal
+    if isinstance(value, QColor):
+        return value.name()
+    raise TypeError(f"Cannot store {type(value).__name__} in a project")
+
+
+class PlateCanvas(QAbstractScrollArea):
+    # Wells of the shown plate, painted straight from the selector's PlateModel (owner array and
+    # selection) and the group colors. Wells sit on a regular grid, so hit-testing and the region to
+    # repaint for a set of wells are plain arithmetic. At zoom 1 the plate fits the view; zooming in
+    # (Ctrl+wheel, Ctrl++ / Ctrl+-) makes it scroll. The main grid, the mini grid and the plate viewer
+    # are all instances following the selector's wells_changed and plate_reset signals.
+    def __init__(self, selector, labels=True, parent=None):
+        super().__init__(parent)
+        self.selector = selector
+        self.labels = labels          # Row and column labels, and well names once they fit
+        self.zoom = 1.0
+        self._geometry = (0.0, 0.0, float(MIN_WELL_SIZE))  # Top-left well in content coordinates, well size
+        self._gutter = (0, 0)
+        for keys, factor in ((QKeySequence.ZoomIn, ZOOM_STEP), (QKeySequence.ZoomOut, 1 / ZOOM_STEP)):
+            shortcut = QShortcut(keys, self, functools.partial(self.zoom_by, factor))
+            shortcut.setContext(Qt.WidgetWithChildrenShortcut)
+        selector.wells_changed.connect(self.wells_changed)
+        selector.plate_reset.connect(self.plate_reset)
+        self.update_geometry()
+
+    def sizeHint(self):
+        plate = self.selector.plate
+        gutter_x, gutter_y = self.gutter()
+        size = DEFAULT_WELL_SIZE if self.labels else MIN_WELL_SIZE * 2
+        frame = 2 * self.frameWidth()
+        return QSize(min(gutter_x + plate.n_cols * size, 800) + frame,
+                     min(gutter_y + plate.n_rows * size, 500) + frame)
+
+    def minimumSizeHint(self):
+        # Room for every well at the smallest size, so zoom 1 always shows the whole plate
+        plate = self.selector.plate
+        gutter_x, gutter_y = self.gutter()
+        frame = 2 * self.frameWidth() + 1
+        return QSize(gutter_x + plate.n_cols * MIN_WELL_SIZE + frame,
+                     gutter_y + plate.n_rows * MIN_WELL_SIZE + frame)
+
+    def gutter(self):
+        # Room for the row labels on the left and the column labels on top
+        if not self.labels:
+            return 0, 0
+        metrics = self.fontMetrics()
+        plate = self.selector.plate
+        return (max(metrics.horizontalAdvance(label) for label in plate.row_labels) + 2 * LABEL_PADDING,
+                metrics.height() + 2 * LABEL_PADDING)
+
+    def update_geometry(self):
+        # Well size from the space without scroll bars, so showing them does not change the layout
+        plate = self.selector.plate
+        gutter_x, gutter_y = self._gutter = self.gutter()
+        available = self.maximumViewportSize()
+        fit = min((available.width() - gutter_x - 1) / plate.n_cols,
+                  (available.height() - gutter_y - 1) / plate.n_rows)
+        size = max(fit, MIN_WELL_SIZE) * self.zoom
+        # Labels, a one pixel border and the wells; a plate smaller than the view is centered in it
+        width, height = gutter_x + 1 + plate.n_cols * size, gutter_y + 1 + plate.n_rows * size
+        self._geometry = (gutter_x + 1 + max(0.0, (available.width() - width) / 2),
+                          gutter_y + 1 + max(0.0, (available.height() - height) / 2), size)
+        viewport = self.viewport().size()
+        for scroll_bar, content, shown in ((self.horizontalScrollBar(), width, viewport.width()),
+                                           (self.verticalScrollBar(), height, viewport.height())):
+            scroll_bar.setRange(0, max(0, math.ceil(content) - shown))
+            scroll_bar.setPageStep(shown)
+            scroll_bar.setSingleStep(max(1, int(size)))
+
+    def wells_area(self):
+        # Part of the viewport showing wells: the labels stay next to the plate, or at the edge once it scrolls
+        left, top, _size = self._geometry
+        gutter_x, gutter_y = self._gutter
+        if not self.labels:
+            return self.viewport().rect()
+        area_left = max(gutter_x, int(left) - 1 - self.horizontalScrollBar().value())
+        area_top = max(gutter_y, int(top) - 1 - self.verticalScrollBar().value())
+        return self.viewport().rect().adjusted(area_left, area_top, 0, 0)
+
+    def cell_at(self, pos, clamp=False):
+        # (row, col) of the well under pos in viewport coordinates; None outside the plate unless
+        # clamp, which gives the nearest well so a drag can leave the plate
+        plate = self.selector.plate
+        left, top, size = self._geometry
+        col = math.floor((pos.x() + self.horizontalScrollBar().value() - left) / size)
+        row = math.floor((pos.y() + self.verticalScrollBar().value() - top) / size)
+        if clamp:
+            return min(max(row, 0), plate.n_rows - 1), min(max(col, 0), plate.n_cols - 1)
+        if 0 <= row < plate.n_rows and 0 <= col < plate.n_cols and self.wells_area().contains(pos):
+            return row, col
+        return None
+
+    def cells_rect(self, first_row, first_col, last_row, last_col):
+        # Viewport rectangle covering the given block of wells; edges are rounded the same way for every well
+        left, top, size = self._geometry
+        x, y = self.horizontalScrollBar().value(), self.verticalScrollBar().value()
+        x0, y0 = int(left + first_col * size) - x, int(top + first_row * size) - y
+        x1, y1 = int(left + (last_col + 1) * size) - x, int(top + (last_row + 1) * size) - y
+        return QRect(x0, y0, x1 - x0, y1 - y0)
+
+    @Slot(object)
+    def wells_changed(self, mask):
+        # Repaint just the rows of wells in mask
+        plate = self.selector.plate
+        if mask == plate.full_mask:
+            self.viewport().update()
+            return
+        region = QRegion()
+        for row, first_col, last_col in row_runs(plate, mask):
+            region += self.cells_rect(row, first_col, row, last_col)
+        self.viewport().update(region)
+
+    @Slot()
+    def plate_reset(self):
+        # Another plate type or tray: new layout, everything repainted
+        self.update_geometry()
+        self.updateGeometry()
+        self.viewport().update()
+
+    def zoom_by(self, factor, anchor=None):
+        # Keep the point under anchor (default: the middle of the view) in place
+        zoom = min(max(self.zoom * factor, 1.0), MAX_ZOOM)
+        if zoom == self.zoom:
+            return
+        if anchor is None:
+            anchor = self.viewport().rect().center()
+        horizontal, vertical = self.horizontalScrollBar(), self.verticalScrollBar()
+        left, top, size = self._geometry
+        wells_x = (anchor.x() + horizontal.value() - left) / size
+        wells_y = (anchor.y() + vertical.value() - top) / size
+        self.zoom = zoom
+        self.update_geometry()
+        left, top, size = self._geometry
+        horizontal.setValue(round(left + wells_x * size - anchor.x()))
+        vertical.setValue(round(top + wells_y * size - anchor.y()))
+        self.viewport().update()
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            steps = event.angleDelta().y() / 120
+            if steps:
+                self.zoom_by(ZOOM_STEP ** steps, event.position().toPoint())
+            event.accept()
+            return
+        super().wheelEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_geometry()
+
+    def scrollContentsBy(self, dx, dy):
+        # Move the wells already painted and paint only the strip that scrolled into view, plus the labels
+        viewport = self.viewport()
+        area = self.wells_area()
+        viewport.scroll(dx, dy, area)
+        if self.labels and dx:
+            viewport.update(QRect(area.left(), 0, area.width(), area.top()))
+        if self.labels and dy:
+            viewport.update(QRect(0, area.top(), area.left(), area.height()))
+
+    @profiled
+    def paintEvent(self, event):
+        selector = self.selector
+        plate = selector.plate
+        owner = selector.plate_model.owner
+        selection = selector.plate_model.selection
+        groups_by_id = selector.groups_by_id
+        left, top, size = self._geometry
+        x, y = self.horizontalScrollBar().value(), self.verticalScrollBar().value()
+        rect = event.rect()
+        area = self.wells_area()
+
+        # Wells touching the repainted rectangle
+        first_col = max(0, math.floor((max(rect.left(), area.left()) + x - left) / size))
+        last_col = min(plate.n_cols - 1, math.floor((rect.right() + x - left) / size))
+        first_row = max(0, math.floor((max(rect.top(), area.top()) + y - top) / size))
+        last_row = min(plate.n_rows - 1, math.floor((rect.bottom() + y - top) / size))
+
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        metrics = self.fontMetrics()
+        if first_col <= last_col and first_row <= last_row and rect.intersects(area):
+            painter.setClipRect(area)
+            n_cols = plate.n_cols
+            visible = (1 << last_col - first_col + 1) - 1
+            # Well edges; the last pixel column and row before each edge are the grid lines
+            xs = [int(left + col * size) - x for col in range(first_col, last_col + 2)]
+            ys = [int(top + row * size) - y for row in range(first_row, last_row + 2)]
+            painter.fillRect(QRect(xs[0], ys[0], xs[-1] - xs[0], ys[-1] - ys[0]), Qt.white)
+
+            # One rectangle per run of wells of the same group, and per run of selected wells, in each row
+            highlight = palette.highlight()
+            colors = {}
+            for row_number, row in enumerate(range(first_row, last_row + 1)):
+                well_top, well_height = ys[row_number], ys[row_number + 1] - ys[row_number]
+                start = row * n_cols + first_col
+                col_number = 0
+                for group_id, run in itertools.groupby(owner[start:start + len(xs) - 1]):
+                    end = col_number + len(tuple(run))
+                    if group_id != FREE:
+                        color = colors.get(group_id)
+                        if color is None:
+                            color = colors[group_id] = groups_by_id[group_id]["color"]
+                        painter.fillRect(QRect(xs[col_number], well_top, xs[end] - xs[col_number], well_height), color)
+                    col_number = end
+                selected = selection >> start & visible
+                while selected:
+                    col_number = (selected & -selected).bit_length() - 1
+                    shifted = selected >> col_number
+                    end = col_number + (shifted ^ (shifted + 1)).bit_length() - 1
+                    painter.fillRect(QRect(xs[col_number], well_top, xs[end] - xs[col_number], well_height), highlight)
+                    selected &= ~((1 << end) - 1)
+
+            grid = palette.mid()
+            for edge in xs:
+                painter.fillRect(QRect(edge - 1, ys[0] - 1, 1, ys[-1] - ys[0] + 1), grid)
+            for edge in ys:
+                painter.fillRect(QRect(xs[0] - 1, edge - 1, xs[-1] - xs[0] + 1, 1), grid)
+
+            if self.labels and size > metrics.horizontalAdvance(plate.well_names[-1]) + 2 * LABEL_PADDING:
+                text_colors = (QColor(Qt.black), palette.highlightedText().color())
+                for row_number, row in enumerate(range(first_row, last_row + 1)):
+                    for col_number, col in enumerate(range(first_col, last_col + 1)):
+                        index = row * n_cols + col
+                        painter.setPen(text_colors[selection >> index & 1])
+                        painter.drawText(QRect(xs[col_number], ys[row_number], xs[col_number + 1] - xs[col_number] - 1,
+                                               ys[row_number + 1] - ys[row_number] - 1), Qt.AlignCenter,
+                                         plate.well_names[index])
+
+        if self.labels:
+            # Labels that would overlap are thinned out to every second, third, ... row or column
+            gutter_x, gutter_y = self._gutter
+            col_step = math.ceil((metrics.horizontalAdvance(plate.col_labels[-1]) + LABEL_PADDING) / size)
+            row_step = math.ceil(metrics.height() / size)
+            painter.setPen(palette.windowText().color())
+            band = QRect(area.left(), area.top() - gutter_y, area.width(), gutter_y)
+            painter.setClipRect(band)
+            for col in range(first_col, last_col + 1):
+                if col % col_step == 0:
+                    cell = self.cells_rect(0, col, 0, col)
+                    painter.drawText(QRect(cell.left(), band.top(), cell.width(), gutter_y), Qt.AlignCenter,
+                                     plate.col_labels[col])
+            band = QRect(area.left() - gutter_x, area.top(), gutter_x, area.height())
+            painter.setClipRect(band)
+            for row in range(first_row, last_row + 1):
+                if row % row_step == 0:
+                    cell = self.cells_rect(row, 0, row, 0)
+                    painter.drawText(QRect(band.left(), cell.top(), gutter_x, cell.height()), Qt.AlignCenter,
+                                     plate.row_labels[row])
+        painter.end()
+
+
+class SampleOverviewModel(QAbstractTableModel):
+    # One row per sample group, in the order of the sample log
+    def __init__(self, selector):
+        super().__init__(selector)
+        self.selector = selector
+        self.group_ids = []
+        self.volume_validator = volume_validator(self)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.group_ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(OVERVIEW_COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        group = self.selector.groups_by_id.get(self.group_ids[index.row()])
+        if group is None:
+            return None
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return group["name"]
+            if column == 1:
+                return f"{group['inj_vol']} µL"
+            if column == 2:
+                return group.get("instrument_method", "N/A")
+            return group.get("path", "N/A")
+        if role == Qt.EditRole and column in OVERVIEW_FIELDS:
+            return group.get(OVERVIEW_FIELDS[column], "")
+        if role == Qt.BackgroundRole and column == 0:
+            return group["color"]
+        if role in (Qt.ForegroundRole, Qt.ToolTipRole):
+            errors = self.selector.validation.group_errors(group["id"])
+            output_problems = self.selector.output_problems.get(group["id"])
+            if output_problems:
+                errors = errors + output_problems
+            if errors:
+                return QColor("#c00000") if role == Qt.ForegroundRole else "\n".join(errors)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return OVERVIEW_COLUMNS[section] if orientation == Qt.Horizontal else str(section + 1)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        return flags | Qt.ItemIsEditable if index.column() in OVERVIEW_FIELDS else flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or index.column() not in OVERVIEW_FIELDS:
+            return False
+        value = str(value).strip()
+        field = OVERVIEW_FIELDS[index.column()]
+        if field == "inj_vol" and self.volume_validator.validate(value, 0)[0] != QValidator.Acceptable:
+            return False
+        self.selector.edit_group(self.group_ids[index.row()], **{field: value})
+        return True
+
+    def set_groups(self, group_ids):
+        self.beginResetModel()
+        self.group_ids = list(group_ids)
+        self.endResetModel()
+
+    def insert_group(self, row, group_id):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.group_ids.insert(row, group_id)
+        self.endInsertRows()
+
+    def remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.group_ids[row]
+        self.endRemoveRows()
+
+    def row_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(OVERVIEW_COLUMNS) - 1))
+
+    def all_rows_changed(self):
+        if self.group_ids:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.group_ids) - 1, len(OVERVIEW_COLUMNS) - 1))
+
+
+class MethodListModel(QAbstractListModel):
+    # Search results of the method library: file name, then the folder it is in
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paths = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self.paths[index.row()]
+        if role == Qt.DisplayRole:
+            folder, name = os.path.split(path)
+            return f"{name}    \u2014 {folder}"
+        if role in (Qt.ToolTipRole, Qt.UserRole):
+            return path
+        return None
+
+    def set_paths(self, paths):
+        self.beginResetModel()
+        self.paths = list(paths)
+        self.endResetModel()
+
 
 class PlateSelector(QWidget):
+    # Emitted from worker threads, delivered on the GUI thread
+    methods_indexed = Signal(object)
+    outputs_checked = Signal(int, object)
+    export_written = Signal(int, bool)
+    export_failed = Signal(str)
+    # Repaint requests for every plate canvas: a mask of changed wells of the shown plate, or the whole plate
+    wells_changed = Signal(object)
+    plate_reset = Signal()
+
     def __init__(self):
         super().__init__()
+        self.construction_time = time.time()  # Wall clock, for the startup report
         self.setWindowTitle("Qgenerator")
         
         # Initialize attributes for tracking
-        self.selected_positions = []   # Track selected positions on the grid
-        self.sample_groups = []        # Store each sample group with identifiers and colors
-        self.cell_to_group = {}        # Map each cell to its sample group for easy removal
+        self.campaign = Campaign()     # One plate per tray and every sample group of the queue
+        self.current_tray = TRAYS[0]   # Tray whose plate is shown and edited in the grids
+        self.mouse_pressed = False
+        self.start_cell = None
+        self.rubber_band = None        # Active drag selection, see select_range
+
+        # Change tracking for incremental repaints (see mark_dirty / flush_updates)
+        self._dirty_wells = 0          # Bitmask of wells whose color changed
+        self._dirty_groups = set()     # Ids of groups added, edited or removed since the last flush
+        self._batch_depth = 0
+        self.validation = ValidationIndex()  # Conflicting wells, repeated file names, missing methods/paths
+        self.history = History()       # Undo/redo of every campaign edit made through the GUI
+        self.output_problems = {}      # Group id -> missing data path or raw files already there, see start_output_check
+        self.output_check_generation = 0
+        self.output_check_timer = QTimer(self)
+        self.output_check_timer.setSingleShot(True)
+        self.output_check_timer.setInterval(OUTPUT_CHECK_DELAY_MS)
+        self.output_check_timer.timeout.connect(self.start_output_check)
+        self.outputs_checked.connect(self.output_check_done)
+        self.run_order_timer = QTimer(self)
+        self.run_order_timer.setSingleShot(True)
+        self.run_order_timer.setInterval(RUN_ORDER_PREVIEW_DELAY_MS)
+        self.run_order_timer.timeout.connect(self.update_run_order_preview)
         self.colors = self.generate_colors(96)  # Initialize a list of distinct colors
         self.current_color_index = 0   # Track current color index
 
         # Main layout
         self.layout = QVBoxLayout(self)
 
+        # Tools menu: profiling of the hot paths to a Chrome trace (also QGEN_PROFILE=trace|log|<file>)
+        menu_bar = QMenuBar(self)
+        self.profile_action = menu_bar.addMenu("Tools").addAction("Record Profile")
+        self.profile_action.setCheckable(True)
+        self.profile_action.toggled.connect(self.set_profiling)
+        self.layout.setMenuBar(menu_bar)
+        self.stall_timer = QTimer(self)
+        self.stall_timer.setInterval(STALL_CHECK_INTERVAL_MS)
+        self.stall_timer.timeout.connect(self.check_stall)
+        self.last_tick = None
+
+        # Project files, and recovery of a session that did not close cleanly
+        self.project_path = None
+        self.open_project_button = QPushButton("Open Project")
+        self.open_project_button.clicked.connect(lambda: self.open_project())
+        self.save_project_button = QPushButton("Save Project")
+        self.save_project_button.clicked.connect(lambda: self.save_project())
+        self.recover_button = QPushButton("Recover Autosave")
+        self.recover_button.clicked.connect(self.recover_autosave)
+        project_layout = QHBoxLayout()
+        project_layout.addWidget(self.open_project_button)
+        project_layout.addWidget(self.save_project_button)
+        project_layout.addWidget(self.recover_button)
+
+        # Undo/redo, also on the platform's usual shortcuts
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.clicked.connect(self.undo)
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.clicked.connect(self.redo)
+        QShortcut(QKeySequence.Undo, self, self.undo)
+        QShortcut(QKeySequence.Redo, self, self.redo)
+        project_layout.addWidget(self.undo_button)
+        project_layout.addWidget(self.redo_button)
+        self.layout.addLayout(project_layout)
+
         # Plate type selection with styling
         self.plate_type_label = QLabel("Select Plate Type:")
         self.plate_type_label.setFont(QFont("Arial", 12))
         self.plate_type_combo = QComboBox()
-        self.plate_type_combo.addItems(["96-well", "384-well"])
+        self.plate_type_combo.addItems(list(PLATE_FORMATS))
         self.plate_type_combo.currentTextChanged.connect(self.create_plate_grid)
 
         self.layout.addWidget(self.plate_type_label)
@@ -43,17 +563,31 @@ class PlateSelector(QWidget):
         self.layout.addWidget(self.sample_name_label)
         self.layout.addWidget(self.sample_name_input)
 
+        # Comment written to the worklist formats that have a comment column
+        self.comment_label = QLabel("Comment:")
+        self.comment_input = QLineEdit()
+        self.layout.addWidget(self.comment_label)
+        self.layout.addWidget(self.comment_input)
+
         # Tray position selector
         self.tray_color_label = QLabel("Select Tray position:")
         self.tray_color_combo = QComboBox()
-        self.tray_color_combo.addItems(["Red", "Green", "Blue", "Yellow"])
+        self.tray_color_combo.addItems(list(TRAYS))
+        self.tray_color_combo.currentTextChanged.connect(self.show_tray)
         self.layout.addWidget(self.tray_color_label)
         self.layout.addWidget(self.tray_color_combo)
 
+        # Sample type of the group; Blank and QC wells can be interleaved by the run order
+        self.sample_type_label = QLabel("Sample Type:")
+        self.sample_type_combo = QComboBox()
+        self.sample_type_combo.addItems(list(SAMPLE_TYPES))
+        self.layout.addWidget(self.sample_type_label)
+        self.layout.addWidget(self.sample_type_combo)
+
         # Injection Volume Input with numeric-only restriction and checkbox
         self.injection_volume_label = QLabel("Injection Volume:")
         self.injection_volume_input = QLineEdit()
-        self.injection_volume_input.setValidator(QDoubleValidator(0.0, 9999.99, 2))
+        self.injection_volume_input.setValidator(volume_validator(self.injection_volume_input))
         self.same_inj_vol_checkbox = QCheckBox("Same volume for all samples")
         self.layout.addWidget(self.injection_volume_label)
         self.layout.addWidget(self.injection_volume_input)
@@ -62,8 +596,8 @@ class PlateSelector(QWidget):
         # Instrument Method Input
         self.instrument_method_label = QLabel("Instrument Method:")
         self.instrument_method_input = QLineEdit()
-        self.instrument_method_button = QPushButton("Browse")
-        self.instrument_method_button.clicked.connect(self.browse_instrument_method)
+        self.instrument_method_button = QPushButton("Library")
+        self.instrument_method_button.clicked.connect(self.show_method_library)
         self.same_instrument_method_checkbox = QCheckBox("Use same method for all samples")
         
         # Path Input
@@ -86,15 +620,14 @@ class PlateSelector(QWidget):
         self.layout.addWidget(self.path_label)
         self.layout.addLayout(path_layout)
 
+        # Shared model behind the overview table and its viewer; the plate canvases read the PlateModel itself
+        self.overview_model = SampleOverviewModel(self)
+
         # Mini grid and Sample Overview title
-        self.mini_grid = QTableWidget()
-        self.mini_grid.setSelectionMode(QTableWidget.NoSelection)
-        self.mini_grid.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.mini_grid = self.create_mini_grid_view()
 
         # Table for displaying Sample Overview
-        self.sample_info_table = QTableWidget(0, 4)
-        self.sample_info_table.setHorizontalHeaderLabels(["Sample", "Inj. Vol.", "Instrument Method", "Path"])
-        self.sample_info_table.horizontalHeader().setStretchLastSection(True)
+        self.sample_info_table = self.create_sample_info_view()
 
         # Sample Overview Title
         self.sample_overview_label = QLabel("Sample Overview")
@@ -110,6 +643,12 @@ class PlateSelector(QWidget):
         self.grid_and_info_layout = QVBoxLayout()
         self.grid_and_info_layout.addWidget(self.sample_overview_label)
         self.grid_and_info_layout.addWidget(self.sample_info_table)
+
+        # Problems found by the validation index, kept up to date on every edit
+        self.validation_label = QLabel()
+        self.validation_label.setStyleSheet("color: #c00000;")
+        self.validation_label.setWordWrap(True)
+        self.grid_and_info_layout.addWidget(self.validation_label)
         self.grid_and_info_layout.addWidget(self.sample_log_label)
         self.grid_and_info_layout.addWidget(self.sample_log)
 
@@ -145,207 +684,514 @@ class PlateSelector(QWidget):
         self.select_samples_label.setFont(QFont("Arial", 14, QFont.Bold))
         self.layout.addWidget(self.select_samples_label)
 
-        self.table = QTableWidget()
-        self.table.setSelectionMode(QTableWidget.MultiSelection)
-        self.table.viewport().installEventFilter(self)
-        self.layout.addWidget(self.table)
+        # Drag selection mode for the main grid
+        self.selection_mode_combo = QComboBox()
+        self.selection_mode_combo.addItems(list(SELECTION_MODES))
+        selection_mode_layout = QHBoxLayout()
+        selection_mode_layout.addWidget(QLabel("Selection mode:"))
+        selection_mode_layout.addWidget(self.selection_mode_combo)
+        selection_mode_layout.addStretch()
+        self.layout.addLayout(selection_mode_layout)
+
+        self.plate_canvas = PlateCanvas(self)
+        self.plate_canvas.viewport().installEventFilter(self)
+        self.layout.addWidget(self.plate_canvas, 1)  # Extra height goes to the plate
         self.create_plate_grid()
 
         self.add_samples_button = QPushButton("Add Samples")
         self.add_samples_button.clicked.connect(self.add_samples)
         self.layout.addWidget(self.add_samples_button)
 
+        # Bulk import of a sample manifest onto the free wells of this and the following trays
+        self.import_manifest_button = QPushButton("Import Manifest")
+        self.import_manifest_button.clicked.connect(self.import_manifest)
+        self.fill_order_combo = QComboBox()
+        self.fill_order_combo.addItems(list(FILL_ORDERS))
+        manifest_layout = QHBoxLayout()
+        manifest_layout.addWidget(self.import_manifest_button)
+        manifest_layout.addWidget(QLabel("Fill order:"))
+        manifest_layout.addWidget(self.fill_order_combo)
+        self.layout.addLayout(manifest_layout)
+
+        # Injection order options applied when the queue is generated
+        self.optimize_travel_checkbox = QCheckBox("Optimize needle travel")
+        self.keep_groups_checkbox = QCheckBox("Keep replicates together")
+        order_layout = QHBoxLayout()
+        order_layout.addWidget(self.optimize_travel_checkbox)
+        order_layout.addWidget(self.keep_groups_checkbox)
+        self.layout.addLayout(order_layout)
+
+        # Run order: seeded randomization and blank/QC injections every N samples
+        self.run_order_combo = QComboBox()
+        self.run_order_combo.addItems(list(RUN_ORDERS))
+        self.seed_input = QLineEdit()
+        self.seed_input.setPlaceholderText("random")
+        self.blank_every_spin = QSpinBox()
+        self.blank_every_spin.setRange(0, 9999)
+        self.blank_every_spin.setSpecialValueText("off")
+        self.qc_every_spin = QSpinBox()
+        self.qc_every_spin.setRange(0, 9999)
+        self.qc_every_spin.setSpecialValueText("off")
+        self.bracket_checkbox = QCheckBox("Bracket run")
+        run_order_layout = QHBoxLayout()
+        for label, widget in (("Run order:", self.run_order_combo), ("Seed:", self.seed_input),
+                              ("Blank every:", self.blank_every_spin), ("QC every:", self.qc_every_spin)):
+            run_order_layout.addWidget(QLabel(label))
+            run_order_layout.addWidget(widget)
+        run_order_layout.addWidget(self.bracket_checkbox)
+        self.layout.addLayout(run_order_layout)
+
+        # File names are rendered from a template; the default keeps the group name
+        self.name_template_input = QLineEdit()
+        self.name_template_input.setPlaceholderText(DEFAULT_TEMPLATE)
+        self.name_template_input.setToolTip("Tokens: " + " ".join("{" + token + "}" for token in TOKENS)
+                                            + "\ne.g. {prefix}_{sample}_{well}_{rep:02d}")
+        name_template_layout = QHBoxLayout()
+        name_template_layout.addWidget(QLabel("File names:"))
+        name_template_layout.addWidget(self.name_template_input)
+        self.layout.addLayout(name_template_layout)
+        self.run_order_label = QLabel()
+        self.layout.addWidget(self.run_order_label)
+
+        # The run order is cheap to rebuild, so the summary follows every parameter change
+        self.run_order_combo.currentTextChanged.connect(self.update_run_order_preview)
+        self.seed_input.textChanged.connect(self.update_run_order_preview)
+        self.blank_every_spin.valueChanged.connect(self.update_run_order_preview)
+        self.qc_every_spin.valueChanged.connect(self.update_run_order_preview)
+        self.bracket_checkbox.toggled.connect(self.update_run_order_preview)
+        self.name_template_input.textChanged.connect(self.update_run_order_preview)
+        self.name_template_input.textChanged.connect(self.name_template_changed)
+        # The order decides the {seq} and {rep} of every file name, so the data paths are checked again
+        for signal in (self.optimize_travel_checkbox.toggled, self.keep_groups_checkbox.toggled,
+                       self.run_order_combo.currentTextChanged, self.seed_input.textChanged,
+                       self.blank_every_spin.valueChanged, self.qc_every_spin.valueChanged,
+                       self.bracket_checkbox.toggled):
+            signal.connect(lambda: self.output_check_timer.start())
+
+        # Worklist formats written by Generate Queue; the files are written on a thread pool
+        self.format_checkboxes = {name: QCheckBox(name) for name in WORKLIST_FORMATS}
+        self.format_checkboxes[DEFAULT_FORMAT].setChecked(True)
+        self.split_by_method_checkbox = QCheckBox("One file per instrument method")
+        format_layout = QHBoxLayout()
+        format_layout.addWidget(QLabel("Formats:"))
+        for checkbox in self.format_checkboxes.values():
+            format_layout.addWidget(checkbox)
+        format_layout.addWidget(self.split_by_method_checkbox)
+        # Full writes the whole queue; Append only the injections added or changed since the last export,
+        # Diff lists those and the removed ones
+        self.export_mode_combo = QComboBox()
+        self.export_mode_combo.addItems(list(EXPORT_MODES))
+        format_layout.addWidget(QLabel("Export:"))
+        format_layout.addWidget(self.export_mode_combo)
+        self.layout.addLayout(format_layout)
+        self.export_pool = None
+        self.export_futures = []
+        self.export_count = 0
+        self.pending_exports = {}  # Export number -> [files left, all written, campaign, updated rows, removed keys]
+        self.export_written.connect(self.record_export)
+        self.export_failed.connect(self.report_export_error)
+
+        # Disk work that must not block the window: method library scans and data path checks
+        self.background_pool = None
+        cache_dir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation), "Qgenerator")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.method_index = MethodIndex(cache_path=os.path.join(cache_dir, "method_index.json"))
+        self.method_scan = None
+        self.method_scan_again = False
+        self.method_library = None
+        self.methods_indexed.connect(self.method_index_updated)
+
         self.generate_button = QPushButton("Generate Queue")
         self.generate_button.clicked.connect(self.generate_queue)
         self.layout.addWidget(self.generate_button)
 
-    def show_mini_grid_viewer(self):
+        # Every edit is journaled in the background; leftovers of crashed sessions can be replayed
+        self.autosave_dir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation),
+                                         "Qgenerator", "autosave")
+        os.makedirs(self.autosave_dir, exist_ok=True)
+        self.leftover_journals = []    # Found once the window is shown, see finish_startup
+        self.recover_button.setEnabled(False)
+        self.journal = None
+        self.start_journal()
+        self.update_history_buttons()
+
+        # Disk work and everything else the first paint need not wait for is done by finish_startup
+        self.first_paint_time = None
+
+        self.profile_dir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation),
+                                        "Qgenerator", "profiles")
+        if start_from_environment(self.profile_dir):
+            self.profile_action.blockSignals(True)
+            self.profile_action.setChecked(True)
+            self.profile_action.blockSignals(False)
+            self.start_stall_timer()
+            print(f"Profiling to {PROFILER.file_path}")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint_time is None:
+            self.first_paint_time = time.time()
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        # Runs right after the window was first painted
+        close_splash()
+        # Journals of windows that are still open are locked by them and left alone
+        journals = (os.path.join(self.autosave_dir, name) for name in os.listdir(self.autosave_dir)
+                    if name.endswith(JOURNAL_EXTENSION))
+        self.leftover_journals = sorted((path for path in journals
+                                         if path != self.journal.file_path and not journal_in_use(path)),
+                                        key=os.path.getmtime)
+        self.recover_button.setEnabled(bool(self.leftover_journals))
+        if self.leftover_journals:
+            print("Found autosaved work of a session that did not close cleanly, use Recover Autosave to restore it")
+        self.scan_method_library(load=True)
+
+        report = os.environ.get(STARTUP_REPORT_VARIABLE)
+        if report:
+            # Wall-clock times, so the launching process can measure from before the interpreter started
+            with open(report, "w", encoding="utf-8") as f:
+                json.dump({"construction": self.construction_time, "first_paint": self.first_paint_time,
+                           "ready": time.time()}, f)
+            self.close()
+
+    def submit_background(self, function, *args):
+        if self.background_pool is None:
+            self.background_pool = thread_pool(2, "qgen-background")
+        return self.background_pool.submit(function, *args)
+
+    @property
+    def plate_model(self):
+        # Well occupancy and current selection of the shown tray
+        return self.campaign.plate(self.current_tray)
+
+    @property
+    def plate(self):
+        return self.plate_model.format
+
+    @property
+    def sample_groups(self):
+        # Each sample group with identifiers and colors, across all trays
+        return self.campaign.sample_groups
+
+    @property
+    def groups_by_id(self):
+        # Map the group ids stored in the plate models to sample groups
+        return self.campaign.groups_by_id
+
+    def create_mini_grid_view(self, labels=False):
+        return PlateCanvas(self, labels=labels)
+
+    def create_sample_info_view(self, stretch_rows=False):
+        view = QTableView()
+        view.setModel(self.overview_model)
+        # Volume, method and path are edited in place, as undoable edits (see SampleOverviewModel.setData)
+        view.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed)
+        view.horizontalHeader().setStretchLastSection(True)
+        view.verticalHeader().setStretchLastSection(stretch_rows)
+        return view
+
+    def show_viewer(self, title, view):
+        # Viewers are live views of the shared models, so nothing is copied and they stay open while editing
         viewer = QDialog(self)
-        viewer.setWindowTitle("Plate Overview Viewer")
+        viewer.setAttribute(Qt.WA_DeleteOnClose)
+        viewer.setWindowTitle(title)
         viewer.setMinimumSize(600, 400)
         viewer_layout = QVBoxLayout(viewer)
-
-        # Determine grid dimensions based on selected plate type
-        plate_type = self.plate_type_combo.currentText()
-        rows = "ABCDEFGH" if plate_type == "96-well" else "ABCDEFGHIJKLMNOP"
-        cols = 12 if plate_type == "96-well" else 24
-
-        # Create table with appropriate row and column counts
-        mini_grid_view = QTableWidget(len(rows), cols)
-        mini_grid_view.setHorizontalHeaderLabels([str(i+1) for i in range(cols)])  # Column headers as numbers
-        mini_grid_view.setVerticalHeaderLabels(list(rows))  # Row headers as letters
-        mini_grid_view.horizontalHeader().setStretchLastSection(True)
-        mini_grid_view.verticalHeader().setStretchLastSection(True)
-
-        # Copy contents of mini grid to viewer
-        for row in range(len(rows)):
-            for col in range(cols):
-                item = self.mini_grid.item(row, col)
-                if item:
-                    new_item = QTableWidgetItem(item.text())
-                    new_item.setBackground(item.background())
-                    mini_grid_view.setItem(row, col, new_item)
-        
-        viewer_layout.addWidget(mini_grid_view)
-        viewer.setLayout(viewer_layout)
+        viewer_layout.addWidget(view)
         viewer.resize(800, 600)
-        viewer.exec_()
+        viewer.show()
+        return viewer
 
+    def show_mini_grid_viewer(self):
+        return self.show_viewer("Plate Overview Viewer", self.create_mini_grid_view(labels=True))
 
     def show_sample_info_viewer(self):
-        viewer = QDialog(self)
-        viewer.setWindowTitle("Sample Overview Viewer")
-        viewer.setMinimumSize(600, 400)
-        viewer_layout = QVBoxLayout(viewer)
-        sample_info_view = QTableWidget(self.sample_info_table.rowCount(), self.sample_info_table.columnCount())
-        sample_info_view.setHorizontalHeaderLabels(["Sample", "Inj. Vol.", "Instrument Method", "Path"])
-        sample_info_view.horizontalHeader().setStretchLastSection(True)
-        sample_info_view.verticalHeader().setStretchLastSection(True)
-
-        # Copy contents of sample info table to viewer
-        for row in range(self.sample_info_table.rowCount()):
-            for col in range(self.sample_info_table.columnCount()):
-                item = self.sample_info_table.item(row, col)
-                if item:
-                    new_item = QTableWidgetItem(item.text())
-                    new_item.setBackground(item.background())
-                    sample_info_view.setItem(row, col, new_item)
-
-        viewer_layout.addWidget(sample_info_view)
-        viewer.setLayout(viewer_layout)
-        viewer.resize(800, 600)
-        viewer.exec_()
-        
+        return self.show_viewer("Sample Overview Viewer", self.create_sample_info_view(stretch_rows=True))
+
+    @Slot()
+    @profiled
     def create_plate_grid(self):
-        plate_type = self.plate_type_combo.currentText()
-        rows = "ABCDEFGH" if plate_type == "96-well" else "ABCDEFGHIJKLMNOP"
-        cols = 12 if plate_type == "96-well" else 24
-
-        # Clear and set up the main grid
-        self.table.clear()
-        self.table.setRowCount(len(rows))
-        self.table.setColumnCount(cols)
-        self.table.setVerticalHeaderLabels(list(rows))
-        self.table.setHorizontalHeaderLabels([str(i+1) for i in range(cols)])
-        self.table.clearSelection()
-
-        # Populate table cells with well identifiers
-        for row_index, row_label in enumerate(rows):
-            for col_index in range(cols):
-                well_position = f"{row_label}{col_index + 1}"
-                cell = QTableWidgetItem(well_position)
-                cell.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-                self.table.setItem(row_index, col_index, cell)
-
-        # Clear and set up the mini grid with the same dimensions
-        self.mini_grid.setRowCount(len(rows))
-        self.mini_grid.setColumnCount(cols)
-        self.mini_grid.setVerticalHeaderLabels(list(rows))
-        self.mini_grid.setHorizontalHeaderLabels([str(i+1) for i in range(cols)])
-
-        # Populate the mini grid cells without text to act as visual blocks
-        for row in range(len(rows)):
-            for col in range(cols):
-                mini_cell = QTableWidgetItem()
-                mini_cell.setFlags(Qt.ItemIsEnabled)  # Non-selectable
-                self.mini_grid.setItem(row, col, mini_cell)
+        # Switch the shown tray's plate to the selected plate type, keeping the wells both formats have
+        plate_format = PLATE_FORMATS[self.plate_type_combo.currentText()]
+        if plate_format is not self.plate:
+            if not self.confirm_format_losses(plate_format):
+                self.plate_type_combo.blockSignals(True)
+                self.plate_type_combo.setCurrentText(self.plate.name)
+                self.plate_type_combo.blockSignals(False)
+                return
+            command = SetPlateFormat(self.campaign, self.current_tray, plate_format)
+            self.campaign.set_plate_format(self.current_tray, plate_format)
+            self.push_history(command)
+        self.rubber_band = None
+        self.plate_reset.emit()
+
+        self._dirty_wells = 0
+        self._dirty_groups.clear()
+        self.update_validation()
+        if self.sample_groups or self.overview_model.group_ids:
+            self.update_sample_log()
+            self.update_sample_info_table()
+
+    def confirm_format_losses(self, plate_format):
+        # Ask before a smaller plate type drops wells that are in use
+        wells, groups = self.campaign.format_losses(self.current_tray, plate_format)
+        if not wells:
+            return True
+        text = (f"{wells} wells of the {self.current_tray} tray are not on a {plate_format.name} plate and "
+                f"will be removed from their groups")
+        if groups:
+            text += f", and groups left without wells are removed ({groups})"
+        answer = QMessageBox.question(self, "Change Plate Type", text + ". Change the plate type?",
+                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return answer == QMessageBox.Yes
+
+    def show_tray(self, tray):
+        # Show and edit another tray's plate; each tray keeps its own plate type, layout and selection
+        self.current_tray = tray
+        self.rubber_band = None
+        self._dirty_wells = 0
+        self.plate_reset.emit()
+
+        self.plate_type_combo.blockSignals(True)
+        self.plate_type_combo.setCurrentText(self.plate.name)
+        self.plate_type_combo.blockSignals(False)
 
     def eventFilter(self, source, event):
-        if source is self.table.viewport():
-            if event.type() == event.MouseButtonPress and event.button() == Qt.LeftButton:
-                item = self.table.itemAt(event.pos())
-                if item:
-                    position = item.text()
-                    if position in self.cell_to_group:
-                        # If the position is already part of a group, remove it
-                        group_index = self.cell_to_group[position]
-                        self.remove_cell_from_group(position, group_index)
-                    else:
-                        # Start new selection if it's not defined
-                        self.mouse_pressed = True
-                        self.start_cell = (item.row(), item.column())
-            elif event.type() == event.MouseMove and self.mouse_pressed:
-                item = self.table.itemAt(event.pos())
-                if item and self.start_cell:
-                    end_cell = (item.row(), item.column())
-                    self.select_range(self.start_cell, end_cell)
-            elif event.type() == event.MouseButtonRelease and event.button() == Qt.LeftButton:
-                self.mouse_pressed = False
-                self.start_cell = None
+        # Mouse handling on the main grid, which paints the wells of plate_model.selection as highlighted
+        if (source is self.plate_canvas.viewport() and event.type() in GRID_MOUSE_EVENTS
+                and self.grid_mouse_event(event)):
+            return True
         return super().eventFilter(source, event)
-    
-    def remove_cell_from_group(self, position, group_index):
-        # Remove the cell from the sample group
-        group = self.sample_groups[group_index]
-        if position in group["positions"]:
-            group["positions"].remove(position)
-            del self.cell_to_group[position]
-
-            # Reset the background color of the removed cell in the main grid
-            row = ord(position[0]) - ord('A')
-            col = int(position[1:]) - 1
-            item = self.table.item(row, col)
-            if item:
-                item.setBackground(Qt.white)
-
-            # Update mini grid colors to reflect changes
-            self.update_mini_grid()
-            
-            # If the group is now empty, remove it entirely
-            if not group["positions"]:
-                del self.sample_groups[group_index]
 
-            # Update the sample log to reflect the changes
+    @profiled
+    def grid_mouse_event(self, event):
+        # Returns True when the event was handled
+        if event.type() == event.MouseButtonPress and event.button() == Qt.LeftButton:
+            cell = self.plate_canvas.cell_at(event.pos())
+            if cell is not None:
+                index = self.plate.index(*cell)
+                group_id = self.plate_model.owner_of(index)
+                if group_id != FREE:
+                    # If the position is already part of a group, remove it
+                    self.remove_cell_from_group(index, group_id)
+                else:
+                    # Start a new drag selection on this well
+                    self.mouse_pressed = True
+                    self.start_cell = cell
+                    self.select_range(self.start_cell, self.start_cell)
+            return True
+        elif event.type() == event.MouseMove:
+            if self.mouse_pressed and self.start_cell:
+                # Past the edge of the plate the drag keeps to the nearest well
+                self.select_range(self.start_cell, self.plate_canvas.cell_at(event.pos(), clamp=True))
+            return True
+        elif event.type() == event.MouseButtonRelease and event.button() == Qt.LeftButton:
+            self.mouse_pressed = False
+            self.start_cell = None
+            self.rubber_band = None
+            return True
+        return False
+
+    def remove_cell_from_group(self, index, group_id):
+        # Remove the cell from its sample group; the group is dropped once it is empty
+        group = self.groups_by_id.get(group_id)
+        if group is None:
+            return
+        row = self.sample_groups.index(group) if len(group["positions"]) == 1 else None
+        self.campaign.remove_well(self.current_tray, index)
+        self.push_history(RemoveWell(self.current_tray, index, group, row))
+
+        # Repaint only the freed well and the group's log entry and overview row
+        self.mark_dirty(group_id, 1 << index)
+        self.flush_updates()
+
+    def mark_dirty(self, group_id, wells=0, tray=None):
+        # Wells are only tracked for the shown tray, the grids do not display the others
+        if tray is None or tray == self.current_tray:
+            self._dirty_wells |= wells
+        self._dirty_groups.add(group_id)
+
+    @contextmanager
+    def batch_update(self):
+        # Suspend repaints while many groups are applied; everything touched is flushed once at the end
+        if not self._batch_depth:
+            self.setUpdatesEnabled(False)
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush_updates()
+                self.setUpdatesEnabled(True)
+
+    @profiled
+    def flush_updates(self):
+        # Apply pending changes to the grids, sample log and overview table
+        if self._batch_depth:
+            return
+        wells, self._dirty_wells = self._dirty_wells, 0
+        dirty_groups, self._dirty_groups = self._dirty_groups, set()
+        if PROFILER.enabled:
+            PROFILER.counter("dirty", groups=len(dirty_groups), wells=bin(wells).count("1"))
+
+        # Every plate canvas repaints just the changed wells
+        if wells:
+            self.wells_changed.emit(wells)
+
+        if not dirty_groups:
+            return
+        revalidated = self.update_validation(dirty_groups)
+        self.run_order_timer.start()
+        shown_groups = self.overview_model.group_ids
+        if len(dirty_groups) > max(len(shown_groups), len(self.sample_groups)) // 2:
+            # Most of the list changed, rebuilding is cheaper than patching
             self.update_sample_log()
             self.update_sample_info_table()
-
+            return
+
+        # Drop removed groups bottom-up so earlier row numbers stay valid
+        removed = [row for row, group_id in enumerate(shown_groups)
+                   if group_id in dirty_groups and group_id not in self.groups_by_id]
+        for row in reversed(removed):
+            self._remove_log_entry(row)
+            self.overview_model.remove_row(row)
+
+        shown = {group_id: row for row, group_id in enumerate(shown_groups)}
+        for group_id in dirty_groups:
+            group = self.groups_by_id.get(group_id)
+            if group is None:
+                continue
+            row = shown.get(group_id)
+            if row is None:
+                continue
+            self._set_log_entry(row, self._log_entry_html(group))
+            self.overview_model.row_changed(row)
+
+        # Other groups can gain or lose an error through the edit, e.g. a file name no longer shared
+        for group_id in revalidated - dirty_groups:
+            row = shown.get(group_id)
+            if row is not None:
+                self.overview_model.row_changed(row)
+
+        # New groups usually come last, but undo puts a removed group back at its old row
+        for row, group in enumerate(self.sample_groups):
+            if group["id"] in dirty_groups and group["id"] not in shown:
+                self._insert_log_entry(row, self._log_entry_html(group))
+                self.overview_model.insert_group(row, group["id"])
+
+    def profile_item_counts(self):
+        # How much the widgets hold, next to the timings of a profile
+        PROFILER.counter("items", groups=len(self.sample_groups), log_blocks=self.sample_log.document().blockCount(),
+                         overview_rows=self.overview_model.rowCount(), wells=len(self.plate.well_names))
+
+    def set_profiling(self, enabled):
+        # Tools > Record Profile; each recording goes to a new Chrome trace
+        if enabled:
+            PROFILER.start(profile_path(self.profile_dir, "trace"))
+            self.start_stall_timer()
+            self.profile_item_counts()
+            print(f"Profiling to {PROFILER.file_path}")
+        else:
+            self.stall_timer.stop()
+            PROFILER.stop()
+            print(f"Profile written to {PROFILER.file_path}")
+
+    def start_stall_timer(self):
+        self.last_tick = time.perf_counter()
+        self.stall_timer.start()
+
+    def check_stall(self):
+        # A tick that comes late means the event loop was busy with something else for that long
+        now = time.perf_counter()
+        late = now - self.last_tick - STALL_CHECK_INTERVAL_MS / 1000
+        self.last_tick = now
+        if late * 1000 > STALL_THRESHOLD_MS:
+            PROFILER.stall(late)
+
+    @profiled
     def update_mini_grid(self):
-        # Clear mini grid colors
-        for row in range(self.mini_grid.rowCount()):
-            for col in range(self.mini_grid.columnCount()):
-                self.mini_grid.item(row, col).setBackground(Qt.white)
-        
-        # Apply current sample group colors
-        for group in self.sample_groups:
-            color = group["color"]
-            for position in group["positions"]:
-                # Split the position to get the tray color prefix and actual grid position
-                try:
-                    tray_prefix, grid_position = position.split(":")
-                    row = ord(grid_position[0]) - ord('A')  # Convert 'A'-'P' to row index
-                    col = int(grid_position[1:]) - 1  # Convert '1'-'24' to column index
-                    mini_item = self.mini_grid.item(row, col)
-                    if mini_item:
-                        mini_item.setBackground(color)
-                except (ValueError, IndexError):
-                    print(f"Invalid position format: {position}")
-
-
+        # Repaint every well on every plate canvas
+        self.wells_changed.emit(self.plate.full_mask)
 
+    @profiled
     def update_sample_log(self):
         # Clear the sample log to start fresh
         self.sample_log.clear()
 
-        # Loop through each sample group and add a formatted HTML entry
-        for group in self.sample_groups:
-            color_hex = group["color"].name()  # Get hex color for the group
-            positions_str = ", ".join(group["positions"])  # Join positions as a string
-            
-            # HTML entry with line break for each group and correct color
-            html_entry = (
-                f'<div style="display: flex; align-items: center; margin-bottom: 5px;">'
-                f'<span style="background-color: {color_hex}; width: 12px; height: 12px; '
-                f'display: inline-block; border-radius: 2px; margin-right: 6px;"></span>'
-                f'<b>{group["name"]}</b>: {positions_str}</div><br>'
-            )
-
-            # Insert the formatted HTML entry into the log
-            self.sample_log.insertHtml(html_entry)
-            
+        # One text block per sample group, so single entries can be patched later
+        cursor = QTextCursor(self.sample_log.document())
+        cursor.beginEditBlock()
+        for number, group in enumerate(self.sample_groups):
+            if number:
+                cursor.insertBlock()
+            cursor.setCharFormat(QTextCharFormat())
+            cursor.insertHtml(self._log_entry_html(group))
+        cursor.endEditBlock()
+        if PROFILER.enabled:
+            self.profile_item_counts()
+
+    def _log_entry_html(self, group):
+        color_hex = group["color"].name()  # Get hex color for the group
+        positions_str = ", ".join(group["positions"])  # Join positions as a string
+        return (
+            f'<span style="background-color: {color_hex}; width: 12px; height: 12px; '
+            f'display: inline-block; border-radius: 2px; margin-right: 6px;">&nbsp;&nbsp;&nbsp;</span>'
+            f'&nbsp;<b>{group["name"]}</b>: {positions_str}'
+        )
+
+    def _log_block_cursor(self, number):
+        # Cursor selecting the contents of one log block
+        block = self.sample_log.document().findBlockByNumber(number)
+        cursor = QTextCursor(block)
+        cursor.setPosition(block.position() + block.length() - 1, QTextCursor.KeepAnchor)
+        return cursor
+
+    def _set_log_entry(self, number, html_entry):
+        cursor = self._log_block_cursor(number)
+        cursor.beginEditBlock()
+        cursor.removeSelectedText()
+        cursor.setCharFormat(QTextCharFormat())  # Don't carry the old swatch color into the new entry
+        cursor.insertHtml(html_entry)
+        cursor.endEditBlock()
+
+    def _insert_log_entry(self, number, html_entry):
+        cursor = QTextCursor(self.sample_log.document())
+        cursor.beginEditBlock()
+        if number < len(self.overview_model.group_ids):
+            # Split a new block off in front of the entry that is there now
+            cursor.setPosition(self.sample_log.document().findBlockByNumber(number).position())
+            cursor.insertBlock()
+            cursor.movePosition(QTextCursor.PreviousBlock)
+        else:
+            cursor.movePosition(QTextCursor.End)
+            if self.overview_model.group_ids:
+                cursor.insertBlock()
+        cursor.setCharFormat(QTextCharFormat())
+        cursor.insertHtml(html_entry)
+        cursor.endEditBlock()
+
+    def _remove_log_entry(self, number):
+        document = self.sample_log.document()
+        block = document.findBlockByNumber(number)
+        cursor = QTextCursor(block)
+        if block.next().isValid():
+            # Take the block together with the separator that follows it
+            cursor.setPosition(block.next().position(), QTextCursor.KeepAnchor)
+        elif block.previous().isValid():
+            # Last block: take the separator in front of it instead
+            cursor.setPosition(block.position() - 1)
+            cursor.setPosition(block.position() + block.length() - 1, QTextCursor.KeepAnchor)
+        else:
+            cursor = self._log_block_cursor(number)
+        cursor.removeSelectedText()
+
     def clear_all(self):
         # Clear input fields
         self.file_prefix_input.clear()
         self.sample_name_input.clear()
+        self.comment_input.clear()
         self.injection_volume_input.clear()
         self.instrument_method_input.clear()
 
@@ -353,68 +1199,48 @@ class PlateSelector(QWidget):
         self.same_inj_vol_checkbox.setChecked(False)
         self.same_instrument_method_checkbox.setChecked(False)
 
-        # Clear selected positions, sample groups, and cell-to-group mapping
-        self.selected_positions.clear()
-        self.sample_groups.clear()
-        self.cell_to_group.clear()
+        # Clear the plates of every tray together with their selections and sample groups.
+        # Undo brings them back, together with the plate type reset below.
+        with self.history.batch():
+            self.push_history(Clear(self.campaign))
+            self.campaign.clear()
 
-        # Clear sample log and sample information table
-        self.sample_log.clear()
-        self.sample_info_table.setRowCount(0)
+            # Clear sample log and sample information table
+            self.sample_log.clear()
+            self.overview_model.set_groups([])
 
-        # Reset color index to start fresh colors for new groups
-        self.current_color_index = 0
+            # Reset color index to start fresh colors for new groups
+            self.current_color_index = 0
 
-        # Reinitialize the mini grid and main grid to remove existing colors and reset for new selections
-        self.create_plate_grid()
+            # Reinitialize the mini grid and main grid to remove existing colors and reset for new selections
+            self.create_plate_grid()
+        self.update_history_buttons()
 
         
+    @profiled
     def update_sample_info_table(self):
-        # Clear the sample info table to prepare for fresh data
-        self.sample_info_table.setRowCount(0)
-
-        # Populate the sample info table with each sample group's data
-        for group in self.sample_groups:
-            row_position = self.sample_info_table.rowCount()
-            self.sample_info_table.insertRow(row_position)
-
-            # Sample Name cell with color background
-            sample_item = QTableWidgetItem(group["name"])
-            sample_item.setBackground(group["color"])
-            self.sample_info_table.setItem(row_position, 0, sample_item)
-
-            # Injection Volume cell
-            inj_vol_item = QTableWidgetItem(f"{group['inj_vol']} µL")
-            self.sample_info_table.setItem(row_position, 1, inj_vol_item)
-
-            # Instrument Method cell
-            instrument_method_item = QTableWidgetItem(group.get("instrument_method", "N/A"))
-            self.sample_info_table.setItem(row_position, 2, instrument_method_item)
-
-            # Path cell
-            path_item = QTableWidgetItem(group.get("path", "N/A"))
-            self.sample_info_table.setItem(row_position, 3, path_item)
-
-            
+        # Point the overview model at the current groups; every view of it refreshes
+        self.overview_model.set_groups(group["id"] for group in self.sample_groups)
+        if PROFILER.enabled:
+            self.profile_item_counts()
 
+    @profiled
     def select_range(self, start_cell, end_cell):
-        start_row, start_col = start_cell
-        end_row, end_col = end_cell
-        top_row = min(start_row, end_row)
-        bottom_row = max(start_row, end_row)
-        left_col = min(start_col, end_col)
-        right_col = max(start_col, end_col)
-
-        selection_range = QTableWidgetSelectionRange(top_row, left_col, bottom_row, right_col)
-        self.table.setRangeSelected(selection_range, True)
-
-        # Add selected positions to the list
-        for row in range(top_row, bottom_row + 1):
-            for col in range(left_col, right_col + 1):
-                item = self.table.item(row, col)
-                if item and item.text() not in self.selected_positions:
-                    self.selected_positions.append(item.text())
-    
+        # Continue the drag that started at start_cell, or begin one on top of the current selection
+        band = self.rubber_band
+        if band is None or band.start_cell != start_cell:
+            band = self.rubber_band = RubberBand(self.plate, start_cell, self.plate_model.selection,
+                                                 self.plate_model.occupied,
+                                                 self.selection_mode_combo.currentText())
+
+        # Only moves onto a new cell do any work, and then only for the wells that changed
+        delta = band.move(end_cell)
+        if delta is None:
+            return
+        added, removed = delta
+        self.plate_model.selection = band.selection()
+        self.wells_changed.emit(added | removed)
+
     def browse_instrument_method(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Instrument Method")
         if file_path:
@@ -428,6 +1254,8 @@ class PlateSelector(QWidget):
 
 
                     
+    @Slot()
+    @profiled
     def add_samples(self):
         # Get prefix, sample name, injection volume, and instrument method
         file_prefix = self.file_prefix_input.text().strip()
@@ -439,73 +1267,561 @@ class PlateSelector(QWidget):
         if not sample_name or not inj_vol:
             return  # Skip if no sample name or injection volume is provided
 
-        # Combine prefix and sample name
-        full_name = f"{file_prefix}_{sample_name}" if file_prefix else sample_name
-
-        # Get the current color for this sample group
-        color = self.colors[self.current_color_index % len(self.colors)]
-        self.current_color_index += 1
-
-        # Format positions
-        tray_color_prefix = self.tray_color_combo.currentText()[0].upper() + ":"
-        formatted_positions = [f"{tray_color_prefix}{pos}" for pos in self.selected_positions]
-
-        # Store the sample group with injection volume, instrument method, and path
-        new_group = {
-            "name": full_name,
-            "positions": formatted_positions,
-            "color": color,
-            "inj_vol": inj_vol,
-            "instrument_method": instrument_method,  # Store instrument method
-            "path": path  # Store path
-        }
-        self.sample_groups.append(new_group)
-
-        # Update UI elements
-        self.update_sample_log()
-        self.update_sample_info_table()
-        self.update_mini_grid()  # Ensure colors are shown in mini grid
-        self.selected_positions.clear()
+        selected = self.plate_model.selection
+        group = self.add_group(full_name(file_prefix, sample_name), inj_vol, instrument_method, path,
+                               self.tray_color_combo.currentText(), sample_type=self.sample_type_combo.currentText(),
+                               prefix=file_prefix, sample=sample_name, comment=self.comment_input.text().strip())
+        self.wells_changed.emit(selected)  # The selection is used up, also where the wells were taken
+        if group is None:
+            return
         self.sample_name_input.clear()
+        self.comment_input.clear()
 
         # Clear the instrument method input if the "Use same method" checkbox is not checked
         if not self.same_instrument_method_checkbox.isChecked():
             self.instrument_method_input.clear()
 
 
-    def generate_queue(self):
-        # Prepare data dictionary for columns and data rows
-        data = {
-            "File Name": [],
-            "Position": [],
-            "Inj Vol": [],
-            "Instrument Method": [],
-            "Path": []
+    def add_group(self, name, inj_vol, instrument_method, path, tray, mask=None, **extra):
+        # Claim the wells of mask (default: the tray's current selection) for a new group,
+        # leaving out any that already belong to another group
+        model = self.campaign.plate(tray)
+        if mask is None:
+            mask = model.selection
+            model.clear_selection()
+        conflicting = model.conflicts(mask)
+        if conflicting:
+            taken = ", ".join(model.format.well_names[index] for index in iter_bits(conflicting))
+            print(f"Skipped wells already assigned to another group: {taken}")
+
+        # Store the sample group with injection volume, instrument method, path and the next color
+        color = self.colors[self.current_color_index % len(self.colors)]
+        new_group = self.campaign.add_group(tray, mask, name, inj_vol, instrument_method, path, color=color, **extra)
+        if new_group is None:
+            return None
+        self.current_color_index += 1
+        self.push_history(AddGroups(self.campaign, [new_group]))
+
+        # Repaint the claimed wells and add the group's log entry and overview row
+        self.mark_dirty(new_group["id"], mask & ~conflicting, tray)
+        self.flush_updates()
+        return new_group
+
+    @Slot()
+    @profiled
+    def import_manifest(self, file_path=None):
+        if not file_path:
+            file_path, _ = QFileDialog.getOpenFileName(self, "Import Sample Manifest", "",
+                                                       "Manifests (*.csv *.xlsx *.xlsm)")
+        if not file_path:
+            return []
+
+        # Empty manifest fields fall back to the current inputs
+        trays = TRAYS[TRAYS.index(self.current_tray):]
+        # Trays without a plate yet are set up with the current plate type, which undo takes back
+        new_trays = [tray for tray in trays if tray not in self.campaign.plates]
+        with self.batch_update():
+            try:
+                groups, leftover = place_manifest(
+                    self.campaign, read_manifest(file_path), self.fill_order_combo.currentText(), trays,
+                    self.plate, self.file_prefix_input.text().strip(), self.injection_volume_input.text().strip(),
+                    self.instrument_method_input.text().strip(), self.path_input.text().strip())
+            except (OSError, ValueError) as error:
+                QMessageBox.warning(self, "Import Manifest", f"Could not import {file_path}: {error}")
+                return []
+            for group in groups:
+                group["color"] = self.colors[self.current_color_index % len(self.colors)]
+                self.current_color_index += 1
+                wells = self.campaign.plate(group["tray"]).group_masks[group["id"]]
+                self.mark_dirty(group["id"], wells, group["tray"])
+            formats = {tray: (self.campaign.default_format, self.campaign.plate(tray).format) for tray in new_trays
+                       if self.campaign.plate(tray).format is not self.campaign.default_format}
+            if groups or formats:
+                self.push_history(AddGroups(self.campaign, groups, formats))
+
+        if leftover:
+            QMessageBox.warning(self, "Import Manifest", f"{len(leftover)} samples did not fit on the "
+                                f"{', '.join(trays)} trays and were not imported, starting with line {leftover[0][0]}.")
+        return groups
+
+    def edit_group(self, group_id, **changes):
+        # Change fields of a group from the overview table
+        previous = self.campaign.edit_group(group_id, **changes)
+        self.push_history(EditGroup(group_id, previous, changes))
+        self.mark_dirty(group_id)
+        self.flush_updates()
+
+    def push_history(self, command):
+        self.history.push(command)
+        self.update_history_buttons()
+
+    def update_history_buttons(self):
+        self.undo_button.setEnabled(bool(self.history.undo_stack))
+        self.redo_button.setEnabled(bool(self.history.redo_stack))
+
+    def undo(self):
+        self.step_history(self.history.undo)
+
+    def redo(self):
+        self.step_history(self.history.redo)
+
+    def step_history(self, step):
+        # Undo or redo one step, repainting only the wells and groups it touched
+        with self.batch_update():
+            command = step(self.campaign)
+            if command is not None:
+                if self.plate.name != self.plate_type_combo.currentText():
+                    self.show_tray(self.current_tray)  # The shown plate changed format
+                for group_id, tray, wells in command.changes:
+                    self.mark_dirty(group_id, wells, tray)
+        self.update_history_buttons()
+
+    def settings_widgets(self):
+        # Inputs saved with a project, by settings key
+        return {
+            "file_prefix": self.file_prefix_input,
+            "inj_vol": self.injection_volume_input,
+            "same_inj_vol": self.same_inj_vol_checkbox,
+            "instrument_method": self.instrument_method_input,
+            "same_instrument_method": self.same_instrument_method_checkbox,
+            "path": self.path_input,
+            "sample_type": self.sample_type_combo,
+            "selection_mode": self.selection_mode_combo,
+            "fill_order": self.fill_order_combo,
+            "optimize_travel": self.optimize_travel_checkbox,
+            "keep_groups": self.keep_groups_checkbox,
+            "run_order": self.run_order_combo,
+            "seed": self.seed_input,
+            "blank_every": self.blank_every_spin,
+            "qc_every": self.qc_every_spin,
+            "bracket": self.bracket_checkbox,
+            "name_template": self.name_template_input,
+            "comment": self.comment_input,
+            "split_by_method": self.split_by_method_checkbox,
+            "export_mode": self.export_mode_combo,
+            **{"format_" + name.lower(): checkbox for name, checkbox in self.format_checkboxes.items()},
         }
-        for group in self.sample_groups:
-            method_to_use = group.get("instrument_method", self.instrument_method_input.text().strip())
-            path_to_use = group.get("path", self.path_input.text().strip())
-            
-            for position in group["positions"]:
-                data["File Name"].append(group["name"])
-                data["Position"].append(position)
-                data["Inj Vol"].append(group.get("inj_vol", ""))
-                data["Instrument Method"].append(method_to_use)
-                data["Path"].append(path_to_use)
 
-        # Create DataFrame for data rows
-        df = pd.DataFrame(data)
+    def project_settings(self):
+        settings = {"tray": self.current_tray, "color_index": self.current_color_index}
+        for key, widget in self.settings_widgets().items():
+            if isinstance(widget, QLineEdit):
+                settings[key] = widget.text()
+            elif isinstance(widget, QCheckBox):
+                settings[key] = widget.isChecked()
+            elif isinstance(widget, QComboBox):
+                settings[key] = widget.currentText()
+            else:
+                settings[key] = widget.value()
+        return settings
+
+    def apply_project_settings(self, settings):
+        for key, widget in self.settings_widgets().items():
+            if key not in settings:
+                continue
+            value = settings[key]
+            if isinstance(widget, QLineEdit):
+                widget.setText(str(value))
+            elif isinstance(widget, QCheckBox):
+                widget.setChecked(bool(value))
+            elif isinstance(widget, QComboBox):
+                widget.setCurrentText(str(value))
+            else:
+                widget.setValue(int(value))
+
+    def set_campaign(self, campaign, settings=None):
+        # Show another campaign, e.g. a loaded project, and restart the autosave journal on it
+        settings = settings or {}
+        for group in campaign.sample_groups:
+            color = group.get("color")
+            group["color"] = QColor(color) if color else self.colors[group["id"] % len(self.colors)]
+        self.current_color_index = settings.get("color_index", len(campaign.sample_groups))
+
+        self.campaign = campaign
+        self._dirty_wells = 0
+        self._dirty_groups.clear()
+        self.apply_project_settings(settings)
+        tray = settings.get("tray", TRAYS[0])
+        self.tray_color_combo.blockSignals(True)
+        self.tray_color_combo.setCurrentText(tray)
+        self.tray_color_combo.blockSignals(False)
+        self.show_tray(tray)
+
+        self.update_validation()
+        self.update_sample_log()
+        self.update_sample_info_table()
+        self.update_run_order_preview()
+        self.start_journal()
+        self.history.clear()
+        self.update_history_buttons()
+
+    def start_journal(self):
+        if self.journal is not None:
+            self.journal.close(remove=True)
+        file_name = (f"session-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(JOURNAL_NUMBERS)}"
+                     f"{JOURNAL_EXTENSION}")
+        self.journal = Journal(os.path.join(self.autosave_dir, file_name), self.campaign, self.project_settings(),
+                               default=encode_color)
+
+    def save_project(self, file_path=None):
+        if not file_path:
+            file_path, _ = QFileDialog.getSaveFileName(self, "Save Project", self.project_path or "", PROJECT_FILTER)
+        if not file_path:
+            return
+        settings = self.project_settings()
+        try:
+            save_project(self.campaign, file_path, settings, default=encode_color)
+        except OSError as error:
+            QMessageBox.warning(self, "Save Project", f"Could not save {file_path}: {error}")
+            return
+        self.project_path = file_path
+        self.journal.snapshot(settings)  # Everything up to here is in the project file now
+        print(f"Project saved to {file_path}")
+
+    def open_project(self, file_path=None):
+        if not file_path:
+            file_path, _ = QFileDialog.getOpenFileName(self, "Open Project", "", PROJECT_FILTER)
+        if not file_path:
+            return
+        try:
+            campaign, settings = load_project(file_path)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, "Open Project", f"Could not open {file_path}: {error}")
+            return
+        self.project_path = file_path
+        self.set_campaign(campaign, settings)
+
+    def recover_autosave(self):
+        # Replay the newest journal left behind by a crashed session
+        # Another window may have recovered some of them since
+        self.leftover_journals = [path for path in self.leftover_journals if os.path.exists(path)]
+        if not self.leftover_journals:
+            self.recover_button.setEnabled(False)
+            return
+        file_path = self.leftover_journals[-1]
+        try:
+            campaign, settings, edits = replay_journal(file_path)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, "Recover Autosave", f"Could not recover {file_path}: {error}")
+            return
+        self.set_campaign(campaign, settings)
+        for leftover in self.leftover_journals:
+            remove_journal(leftover)
+        self.leftover_journals = []
+        self.recover_button.setEnabled(False)
+        print(f"Recovered {len(campaign.sample_groups)} sample groups ({edits} unsaved edits)")
+
+    def closeEvent(self, event):
+        # A clean exit leaves no journal behind
+        self.journal.close(remove=True)
+        if self.export_pool is not None:
+            self.export_pool.shutdown(wait=True)  # Let started worklists finish
+        self.run_order_timer.stop()
+        self.output_check_timer.stop()
+        self.output_check_generation += 1  # Results still coming in are dropped
+        if self.background_pool is not None:
+            self.background_pool.shutdown(wait=False, cancel_futures=True)
+        if PROFILER.enabled:
+            self.stall_timer.stop()
+            PROFILER.stop()
+        super().closeEvent(event)
+
+    def build_run_order(self, injections, seed):
+        return run_order(injections, self.run_order_combo.currentText(), seed, self.blank_every_spin.value(),
+                         self.qc_every_spin.value(), self.bracket_checkbox.isChecked())
+
+    def queue_order(self, seed):
+        # order_queue with the current settings, to call with a campaign
+        return functools.partial(order_queue, optimize=self.optimize_travel_checkbox.isChecked(),
+                                 keep_groups=self.keep_groups_checkbox.isChecked(),
+                                 order=self.run_order_combo.currentText(), seed=seed,
+                                 blank_every=self.blank_every_spin.value(), qc_every=self.qc_every_spin.value(),
+                                 bracket=self.bracket_checkbox.isChecked())
+
+    def run_order_seed(self):
+        text = self.seed_input.text().strip()
+        return int(text) if text.isdigit() else None
+
+    def name_template(self):
+        # None keeps the group names; raises ValueError for a malformed template
+        text = self.name_template_input.text().strip()
+        return NameTemplate(text) if text and text != DEFAULT_TEMPLATE else None
+
+    @Slot()
+    @profiled
+    def update_run_order_preview(self):
+        # Summarise the run order the current parameters give
+        seed = self.run_order_seed()
+        ordered, seed = self.build_run_order(iter_injections(self.sample_groups), 0 if seed is None else seed)
+        counts = {kind: 0 for kind in SAMPLE_TYPES}
+        for group, _position in ordered:
+            counts[sample_type(group)] += 1
+        summary = (f"{sum(counts.values())} injections: {counts['Unknown']} samples, "
+                   f"{counts['Blank']} blanks, {counts['QC']} QCs")
+
+        try:
+            self.name_template()
+        except ValueError as error:
+            summary += f" \u2014 {error}"
+        self.run_order_label.setText(summary)
+
+    def name_template_changed(self):
+        # Every file name may change, so the name index is rebuilt
+        try:
+            self.validation.template = self.name_template()
+        except ValueError:
+            return
+        self.update_validation()
+        self.overview_model.all_rows_changed()
+
+    def update_validation(self, group_ids=None):
+        # Re-index the given groups (all of them when None) and show the queue's problems.
+        # Returns the ids of every group whose errors may have changed.
+        changed = set()
+        if group_ids is None:
+            self.validation.rebuild(self.sample_groups, self.validation.template)
+        else:
+            for group_id in group_ids:
+                group = self.groups_by_id.get(group_id)
+                changed |= self.validation.remove(group_id) if group is None else self.validation.update(group)
+        self.update_validation_label()
+        self.output_check_timer.start()
+        return changed
+
+    def update_validation_label(self):
+        # Only the first few messages are built, however many problems there are
+        errors = list(itertools.islice(self.validation.errors(), 3))
+        count = self.validation.error_count()
+        if count > len(errors):
+            errors.append(f"and {count - len(errors)} more")
+        missing = sum(any(problem.startswith("data path") for problem in problems)
+                      for problems in self.output_problems.values())
+        overwriting = len(self.output_problems) - missing
+        if missing:
+            errors.append(f"{missing} group{'s' if missing > 1 else ''} with a data path that is missing or unreadable")
+        if overwriting:
+            errors.append(f"{overwriting} group{'s' if overwriting > 1 else ''} would overwrite existing raw files")
+        self.validation_label.setText("; ".join(errors))
+
+    def start_output_check(self):
+        # Check the data paths on a worker thread, with copies of the groups as they are now, under the
+        # names the queue would be written with
+        self.output_check_generation += 1
+        generation = self.output_check_generation
+        campaign = Campaign(self.campaign.default_format)
+        campaign.plates = dict(self.campaign.plates)  # A format change replaces the tray's model
+        campaign.sample_groups = [dict(group) for group in self.sample_groups]
+        future = self.submit_background(check_queue_outputs, campaign, self.queue_order(self.run_order_seed()),
+                                        self.validation.template)
+        future.add_done_callback(lambda future: self.outputs_checked.emit(generation, future))
+
+    def output_check_done(self, generation, future):
+        if generation != self.output_check_generation or future.cancelled():
+            return  # The groups changed since, a newer check is on its way
+        error = future.exception()
+        if error is not None:
+            print(f"Could not check the data paths: {error}")
+            return
+        problems = future.result()
+        changed = {group_id for group_id in problems.keys() | self.output_problems.keys()
+                   if problems.get(group_id) != self.output_problems.get(group_id)}
+        self.output_problems = problems
+        if changed:
+            for row, group_id in enumerate(self.overview_model.group_ids):
+                if group_id in changed:
+                    self.overview_model.row_changed(row)
+            self.update_validation_label()
+
+    def show_method_library(self):
+        # Non-modal search over the methods of the library folders; activating one fills in the method field
+        if self.method_library is not None:
+            self.method_library.show()
+            self.method_library.raise_()
+            self.method_library.activateWindow()
+            return self.method_library
+        library = self.method_library = QDialog(self)
+        library.setWindowTitle("Method Library")
+        library.resize(700, 500)
+        library_layout = QVBoxLayout(library)
+
+        self.method_folders_label = QLabel()
+        self.method_folders_label.setWordWrap(True)
+        add_folder_button = QPushButton("Add Folder")
+        add_folder_button.clicked.connect(self.add_method_folder)
+        clear_folders_button = QPushButton("Clear Folders")
+        clear_folders_button.clicked.connect(self.clear_method_folders)
+        rescan_button = QPushButton("Rescan")
+        rescan_button.clicked.connect(self.scan_method_library)
+        browse_button = QPushButton("Other File")
+        browse_button.clicked.connect(self.browse_instrument_method)
+        folder_layout = QHBoxLayout()
+        for button in (add_folder_button, clear_folders_button, rescan_button, browse_button):
+            folder_layout.addWidget(button)
+        library_layout.addWidget(self.method_folders_label)
+        library_layout.addLayout(folder_layout)
+
+        self.method_filter_input = QLineEdit()
+        self.method_filter_input.setPlaceholderText("Type to filter, e.g. dia60 hela")
+        self.method_filter_input.textChanged.connect(self.filter_methods)
+        self.method_filter_input.returnPressed.connect(lambda: self.choose_method(self.method_list_model.index(0)))
+        library_layout.addWidget(self.method_filter_input)
+        self.method_list_model = MethodListModel(library)
+        method_list = QListView()
+        method_list.setModel(self.method_list_model)
+        method_list.setUniformItemSizes(True)
+        method_list.activated.connect(self.choose_method)
+        library_layout.addWidget(method_list)
+
+        self.update_method_library()
+        library.show()
+        self.method_filter_input.setFocus()
+        return library
+
+    def update_method_library(self):
+        if self.method_library is None:
+            return
+        roots = self.method_index.roots
+        status = f"{len(self.method_index)} methods in {', '.join(roots)}" if roots else "No library folders yet"
+        if self.method_scan is not None:
+            status += " (indexing\u2026)"
+        self.method_folders_label.setText(status)
+        self.filter_methods()
+
+    def filter_methods(self):
+        self.method_list_model.set_paths(self.method_index.search(self.method_filter_input.text(), METHOD_RESULTS))
+
+    def choose_method(self, index):
+        if index.isValid():
+            self.instrument_method_input.setText(self.method_list_model.data(index, Qt.UserRole))
+
+    def add_method_folder(self):
+        folder = QFileDialog.getExistingDirectory(self.method_library, "Add Method Folder")
+        if folder and folder not in self.method_index.roots:
+            self.method_index.roots.append(folder)
+            self.scan_method_library()
+
+    def clear_method_folders(self):
+        self.method_index.roots.clear()
+        self.scan_method_library()
+
+    def scan_method_library(self, load=False):
+        # One scan at a time; the cached listings make a rescan of unchanged folders cheap
+        if self.method_scan is not None:
+            self.method_scan_again = True
+            return
+        self.method_scan_again = False
+        index = self.method_index
+
+        def scan():
+            if load:
+                index.load()
+            index.scan()
+        self.method_scan = self.submit_background(scan)
+        self.method_scan.add_done_callback(self.methods_indexed.emit)
+        self.update_method_library()
+
+    def method_index_updated(self, future):
+        self.method_scan = None
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Could not index the method library: {future.exception()}")
+        if self.method_scan_again:
+            self.scan_method_library()
+        self.update_method_library()
+
+    @Slot()
+    @profiled
+    def generate_queue(self):
+        try:
+            template = self.name_template()
+        except ValueError as error:
+            QMessageBox.warning(self, "Generate Queue", str(error))
+            return
+        mode = self.export_mode_combo.currentText()
+        formats = [name for name, checkbox in self.format_checkboxes.items() if checkbox.isChecked()]
+        if not formats and mode != "Diff":
+            QMessageBox.warning(self, "Generate Queue", "Select at least one worklist format.")
+            return
 
         # Specify the file path
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Queue", "", "CSV Files (*.csv)")
+        if mode == "Diff":
+            file_filter = "Queue Diffs (*.csv)"
+        elif len(formats) == 1:
+            file_filter = f"{formats[0]} Worklists (*{WORKLIST_FORMATS[formats[0]].extension})"
+        else:
+            file_filter = "Worklists (*.csv *.txt)"
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Queue", "", file_filter)
         if file_path:
-            with open(file_path, 'w', newline='') as f:
-                # Write the custom header row
-                f.write("Bracket Type=4\n")
-                # Append the actual DataFrame data
-                df.to_csv(f, index=False)
-            
-            print(f"Queue saved to {file_path}")
+            injections, seed, report = self.queue_order(self.run_order_seed())(self.campaign)
+            if report is not None:
+                print(report)
+
+            # Keep the seed in the field so the same order can be regenerated
+            if self.run_order_combo.currentText() != RUN_ORDERS[0] and not self.seed_input.text().strip():
+                self.seed_input.setText(str(seed))
+                print(f"Run order seed: {seed}")
+
+            # The rows are built here, from the groups as they are now; only the writing goes to the pool
+            duplicates = []
+            rows = list(check_unique(iter_rows(injections, self.instrument_method_input.text().strip(),
+                                               self.path_input.text().strip(), template, details=True), duplicates))
+            diff = self.campaign.exported.diff(zip(injection_keys(injections), rows))
+            if mode != "Full":
+                if not diff:
+                    QMessageBox.information(self, "Generate Queue", "Nothing changed since the last export.")
+                    return
+                print(diff.summary())
+                if mode == "Append" and not diff.updated:
+                    QMessageBox.information(self, "Generate Queue", f"Nothing to append: {diff.summary()}. "
+                                            "A Full export or a Diff records the removed injections.")
+                    return
+
+            self.export_futures = [future for future in self.export_futures if not future.done()]
+            if self.export_pool is None:
+                self.export_pool = thread_pool(4, "qgen-export")
+            if mode == "Diff":
+                label, exports = "Diff", [(file_path, self.export_pool.submit(save_diff, diff, file_path))]
+            else:
+                jobs = worklist_jobs(rows if mode == "Full" else diff.rows(), file_path, formats,
+                                     self.split_by_method_checkbox.isChecked())
+                label, exports = "Queue", export_worklists(jobs, self.export_pool)
+
+            # Recorded once every file is written; an appended worklist runs after the exported one,
+            # so the removed injections stay on record until a full export or a diff
+            self.export_count += 1
+            removed = diff.removed_keys() if mode != "Append" else []
+            self.pending_exports[self.export_count] = [len(exports), True, self.campaign, diff.updates(), removed]
+            for path, future in exports:
+                future.add_done_callback(functools.partial(self.export_done, self.export_count, label, path))
+                self.export_futures.append(future)
+            if duplicates:
+                print(f"Warning: {len(duplicates)} injections reuse a file name (e.g. {duplicates[0]}); "
+                      "add {rep}, {well} or {seq} to the file name template")
+
+    def export_done(self, number, label, file_path, future):
+        # Runs on the export thread; the dialogs are left to the GUI thread through the signals
+        error = future.exception()
+        if error is None:
+            print(f"{label} saved to {file_path} ({future.result()} injections)")
+        else:
+            self.export_failed.emit(f"Could not save {file_path}: {error}")
+        self.export_written.emit(number, error is None)
+
+    def report_export_error(self, text):
+        QMessageBox.warning(self, "Generate Queue", text)
+
+    def record_export(self, number, written):
+        pending = self.pending_exports[number]
+        pending[0] -= 1
+        pending[1] = pending[1] and written
+        if pending[0]:
+            return
+        del self.pending_exports[number]
+        _left, written, campaign, updates, removed = pending
+        if written:
+            campaign.record_export(updates, removed)
+        else:
+            QMessageBox.warning(self, "Generate Queue", "The export was not recorded, the next one compares "
+                                "against the export before it.")
 
 
     def generate_colors(self, n):
@@ -520,6 +1836,10 @@ class PlateSelector(QWidget):
 
 
 if __name__ == "__main__":
+    if QT5:
+        # Qt 6 always scales to the screen's DPI; Qt 5 lays out and paints in device pixels unless asked
+        QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
+        QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
     app = QApplication(sys.argv)
     window = PlateSelector()
     window.show()
@@ -1,5 +1,40 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# Startup-optimized build:
+#
+#   pyinstaller Qgenerator.spec                          one-file executable
+#   pyinstaller Qgenerator.spec -- --onedir              one folder; starts fastest, nothing to unpack at launch
+#   pyinstaller Qgenerator.spec -- --splash splash.png   show an image while the one-file build unpacks
+#                                                        (Windows and Linux only)
+#
+# Compare the result with `python benchmarks/startup.py --exe dist/Qgenerator/Qgenerator`.
+import argparse
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--onedir", action="store_true", help="build a folder instead of a single executable")
+parser.add_argument("--splash", metavar="IMAGE", help="splash image shown until the window is painted")
+options = parser.parse_args()
+
+ICON = '/Users/Pedarf/Desktop/Python scripts/qGenerator/250px_arwing_starlink_6XL_icon.ico'
+
+# Modules the app never imports; most are pulled in by the hooks of qtpy and the standard library.
+# openpyxl stays: it reads Excel manifests, imported only when one is opened.
+EXCLUDES = [
+    # Other Qt bindings qtpy could pick
+    'PyQt6', 'PySide2', 'PySide6',
+    # Qt modules beyond QtCore, QtGui and QtWidgets
+    'PyQt5.QtBluetooth', 'PyQt5.QtDBus', 'PyQt5.QtDesigner', 'PyQt5.QtHelp', 'PyQt5.QtLocation',
+    'PyQt5.QtMultimedia', 'PyQt5.QtMultimediaWidgets', 'PyQt5.QtNetwork', 'PyQt5.QtNfc', 'PyQt5.QtOpenGL',
+    'PyQt5.QtPositioning', 'PyQt5.QtPrintSupport', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtQuickWidgets',
+    'PyQt5.QtSensors', 'PyQt5.QtSerialPort', 'PyQt5.QtSql', 'PyQt5.QtSvg', 'PyQt5.QtTest',
+    'PyQt5.QtWebChannel', 'PyQt5.QtWebEngine', 'PyQt5.QtWebEngineCore', 'PyQt5.QtWebEngineWidgets',
+    'PyQt5.QtWebSockets', 'PyQt5.QtXml', 'PyQt5.QtXmlPatterns',
+    # Scientific stack the queue logic no longer uses
+    'pandas', 'numpy', 'matplotlib', 'PIL', 'IPython',
+    # Standard library parts an end user never needs
+    'tkinter', 'unittest', 'doctest', 'pydoc', 'pdb', 'lib2to3', 'distutils', 'setuptools', 'pip',
+    'sqlite3', 'xmlrpc', 'multiprocessing',
+]
 
 a = Analysis(
     ['Qgen.py'],
@@ -10,36 +45,45 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES,
     noarchive=False,
-    optimize=0,
+    optimize=2,  # No docstrings or asserts: smaller archive, less to unmarshal
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
+splash, splash_binaries = [], []
+if options.splash:
+    # Qgen.py closes it once the window is painted (see close_splash)
+    splash_target = Splash(options.splash, binaries=a.binaries, datas=a.datas, text_pos=None)
+    splash, splash_binaries = [splash_target], splash_target.binaries
+
+# UPX is off: decompressing the Qt libraries at every launch costs more than the smaller download saves
+exe_options = dict(
     name='Qgenerator',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
     target_arch=None,
     codesign_identity=None,
     entitlements_file=None,
-    icon=['/Users/Pedarf/Desktop/Python scripts/qGenerator/250px_arwing_starlink_6XL_icon.ico'],
+    icon=[ICON],
 )
+
+if options.onedir:
+    exe = EXE(pyz, a.scripts, *splash, [], exclude_binaries=True, **exe_options)
+    target = COLLECT(exe, splash_binaries, a.binaries, a.datas, strip=False, upx=False, name='Qgenerator')
+else:
+    exe = EXE(pyz, a.scripts, *splash, splash_binaries, a.binaries, a.datas, [], runtime_tmpdir=None,
+              upx_exclude=[], **exe_options)
+    target = exe
+
 app = BUNDLE(
-    exe,
+    target,
     name='Qgenerator.app',
-    icon='/Users/Pedarf/Desktop/Python scripts/qGenerator/250px_arwing_starlink_6XL_icon.ico',
+    icon=ICON,
     bundle_identifier=None,
 )
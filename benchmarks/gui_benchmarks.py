@@ -0,0 +1,278 @@
+"""Headless benchmarks of the GUI hot paths.
+
+Runs Qgen.py's PlateSelector on Qt's offscreen platform and times each
+scenario at 96, 384 and 1536 wells, with the plate partly filled by
+groups of a few wells each. Wall time is the median of several runs
+(after one warm-up), peak memory is the Python allocation peak of one
+extra run under tracemalloc.
+
+    python benchmarks/gui_benchmarks.py -o before.json
+    python benchmarks/gui_benchmarks.py -o after.json
+    python benchmarks/gui_benchmarks.py --compare before.json after.json
+
+``--compare`` exits with status 1 when a scenario got slower than the
+threshold allows, so it can gate a release build.
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qtpy import API_NAME, QT_VERSION  # noqa: E402
+from qtpy.QtCore import QCoreApplication, QEvent, QStandardPaths  # noqa: E402
+from qtpy.QtWidgets import QApplication, QFileDialog  # noqa: E402
+
+import Qgen  # noqa: E402
+from qgenerator import PLATE_FORMATS  # noqa: E402
+
+SCENARIOS = {}
+
+
+def scenario(function):
+    # function(window) returns the callable to time and, optionally, one to run before each timing
+    SCENARIOS[function.__name__] = function
+    return function
+
+
+def process_events():
+    # Include the repaints and deferred deletes a user would wait for
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    QApplication.processEvents()
+
+
+@scenario
+def create_plate_grid(window):
+    def run():
+        window.create_plate_grid()
+        process_events()
+    return run, None
+
+
+@scenario
+def select_range(window):
+    # A drag from the top-left well to the bottom-right one, one column per mouse move
+    plate = window.plate
+    cells = [(col * (plate.n_rows - 1) // max(plate.n_cols - 1, 1), col) for col in range(plate.n_cols)]
+
+    def prepare():
+        window.plate_model.clear_selection()
+        window.update_mini_grid()
+        window.rubber_band = None
+        process_events()
+
+    def run():
+        for cell in cells:
+            window.select_range(cells[0], cell)
+        process_events()
+    return run, prepare
+
+
+@scenario
+def update_mini_grid(window):
+    def run():
+        window.update_mini_grid()
+        process_events()
+    return run, None
+
+
+@scenario
+def paint_plate(window):
+    # Repaint the whole main grid of a window filling a 4K screen
+    window.resize(3840, 2160)
+    process_events()
+    viewport = window.plate_canvas.viewport()
+    return viewport.repaint, None
+
+
+@scenario
+def update_sample_log(window):
+    def run():
+        window.update_sample_log()
+        process_events()
+    return run, None
+
+
+@scenario
+def update_sample_info_table(window):
+    def run():
+        window.update_sample_info_table()
+        process_events()
+    return run, None
+
+
+@scenario
+def plate_viewer(window):
+    def run():
+        window.show_mini_grid_viewer().close()
+        process_events()
+    return run, None
+
+
+@scenario
+def sample_info_viewer(window):
+    def run():
+        window.show_sample_info_viewer().close()
+        process_events()
+    return run, None
+
+
+@scenario
+def generate_queue(window):
+    # The save dialog is answered with a temporary file, see run_benchmarks
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            window.generate_queue()
+            concurrent.futures.wait(window.export_futures)
+    return run, None
+
+
+def build_window(plate_type, fill, wells_per_group):
+    # A shown window whose plate is filled to `fill` with groups of consecutive wells
+    window = Qgen.PlateSelector()
+    window.plate_type_combo.setCurrentText(plate_type)
+    window.instrument_method_input.setText(r"C:\Xcalibur\methods\dda_60min.meth")
+    window.path_input.setText(r"C:\Xcalibur\data\benchmark")
+    plate = window.plate
+    wells = int(len(plate.well_names) * fill)
+    with window.batch_update(), contextlib.redirect_stdout(io.StringIO()):
+        for number, first in enumerate(range(0, wells, wells_per_group)):
+            mask = ((1 << min(wells_per_group, wells - first)) - 1) << first
+            window.add_group(f"BENCH_S{number + 1}", "2", window.instrument_method_input.text(),
+                             window.path_input.text(), window.current_tray, mask, prefix="BENCH",
+                             sample=f"S{number + 1}")
+    window.show()
+    process_events()
+    return window
+
+
+def measure(run, prepare, repeat):
+    times = []
+    for attempt in range(repeat + 1):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        run()
+        if attempt:
+            times.append(time.perf_counter() - start)  # The first run only warms up
+
+    # One more run for the allocation peak; tracemalloc slows it down too much to time it
+    if prepare is not None:
+        prepare()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeat": repeat,
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args):
+    app = QApplication.instance() or QApplication([])  # noqa: F841 (kept alive for the windows)
+    QStandardPaths.setTestModeEnabled(True)  # Keep autosave journals out of the user's data
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        queue_path = os.path.join(output_dir, "queue.csv")
+        get_save_file_name = QFileDialog.getSaveFileName
+        QFileDialog.getSaveFileName = staticmethod(lambda *args, **kwargs: (queue_path, ""))
+        try:
+            for plate_type in args.plates:
+                for name in args.scenarios:
+                    # A fresh window per scenario, so one scenario's leftovers can't slow down the next
+                    window = build_window(plate_type, args.fill, args.wells_per_group)
+                    run, prepare = SCENARIOS[name](window)
+                    result = results[f"{plate_type}/{name}"] = measure(run, prepare, args.repeat)
+                    result["groups"] = len(window.sample_groups)
+                    print(f"{plate_type:>10}  {name:<26} {result['median_s'] * 1000:9.2f} ms "
+                          f"{result['peak_kib']:10.1f} KiB", file=sys.stderr)
+                    window.close()
+                    process_events()
+        finally:
+            QFileDialog.getSaveFileName = get_save_file_name
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": f"{API_NAME} {QT_VERSION}",
+            "platform": platform.platform(),
+            "fill": args.fill,
+            "wells_per_group": args.wells_per_group,
+        },
+        "results": results,
+    }
+
+
+def compare(base_path, new_path, threshold):
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{'scenario':<38}{'base ms':>10}{'new ms':>10}{'change':>9}{'base KiB':>11}{'new KiB':>11}")
+    regressions = []
+    for key, result in new["results"].items():
+        old = base["results"].get(key)
+        if old is None:
+            print(f"{key:<38}{'':>10}{result['median_s'] * 1000:10.2f}")
+            continue
+        change = result["median_s"] / old["median_s"] - 1 if old["median_s"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = "  slower"
+        print(f"{key:<38}{old['median_s'] * 1000:10.2f}{result['median_s'] * 1000:10.2f}{change:+9.0%}"
+              f"{old['peak_kib']:11.1f}{result['peak_kib']:11.1f}{flag}")
+    if regressions:
+        print(f"{len(regressions)} scenarios are more than {threshold:.0%} slower", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the Qgenerator GUI hot paths on the offscreen platform.")
+    parser.add_argument("-o", "--output", help="JSON file to save the results to (default: stdout)")
+    parser.add_argument("--plates", nargs="+", choices=list(PLATE_FORMATS), default=list(PLATE_FORMATS))
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per scenario (default: %(default)s)")
+    parser.add_argument("--fill", type=float, default=0.75,
+                        help="fraction of the plate holding sample groups (default: %(default)s)")
+    parser.add_argument("--wells-per-group", type=int, default=4, help="(default: %(default)s)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two saved runs instead")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="with --compare, slowdown counted as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+    report = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Cold start of the Qgenerator GUI: import time and time to the first window.
+
+Import time is read from ``python -X importtime -c "import Qgen"``, which
+also names the slowest top-level imports. Time to first window launches
+the app (from source, or a frozen build with ``--exe``) with
+``QGEN_STARTUP_REPORT`` set, so it writes when its window was constructed,
+first painted and done with the work deferred past the first paint, and
+closes itself. Times are medians over several launches, measured from
+just before the process was started.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --exe dist/Qgenerator/Qgenerator -o onedir.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(python):
+    # (total seconds, [(seconds, module), ...] of the modules Qgen imports directly, slowest first)
+    result = subprocess.run([python, "-X", "importtime", "-c", "import Qgen"], cwd=ROOT, capture_output=True,
+                            text=True, env=dict(os.environ, QT_QPA_PLATFORM="offscreen"), check=True)
+    total, modules = 0.0, []
+    for match in _IMPORT_LINE.finditer(result.stderr):
+        cumulative, depth, module = int(match.group(2)) / 1e6, len(match.group(3)), match.group(4)
+        if module == "Qgen":
+            total = cumulative
+        elif depth == 3:  # Imported by Qgen itself
+            modules.append((cumulative, module))
+    return total, sorted(modules, reverse=True)
+
+
+def launch(command, timeout):
+    # One cold start; returns seconds from launch to construction, first paint and ready
+    with tempfile.TemporaryDirectory() as report_dir:
+        report = os.path.join(report_dir, "startup.json")
+        env = dict(os.environ, QGEN_STARTUP_REPORT=report)
+        started = time.time()
+        subprocess.run(command, cwd=ROOT, env=env, timeout=timeout, check=True, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        with open(report, encoding="utf-8") as f:
+            times = json.load(f)
+    return {key: value - started for key, value in times.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold start of the Qgenerator GUI.")
+    parser.add_argument("--exe", help="frozen build to launch instead of Qgen.py, e.g. dist/Qgenerator/Qgenerator")
+    parser.add_argument("--python", default=sys.executable, help="interpreter for Qgen.py (default: this one)")
+    parser.add_argument("--repeat", type=int, default=5, help="launches to take the median of (default: %(default)s)")
+    parser.add_argument("--offscreen", action="store_true", help="use Qt's offscreen platform, e.g. without a display")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for one launch")
+    parser.add_argument("-o", "--output", help="JSON file to save the results to")
+    args = parser.parse_args(argv)
+    if args.offscreen:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
+
+    import_total, modules = import_times(args.python)
+    print(f"import Qgen                  {import_total * 1000:8.1f} ms", file=sys.stderr)
+    for seconds, module in modules[:8]:
+        print(f"  {module:<26} {seconds * 1000:8.1f} ms", file=sys.stderr)
+
+    command = [os.path.abspath(args.exe)] if args.exe else [args.python, os.path.join(ROOT, "Qgen.py")]
+    launches = [launch(command, args.timeout) for _ in range(args.repeat)]
+    startup = {key: statistics.median(times[key] for times in launches) for key in launches[0]}
+    for key, label in (("construction", "window construction starts"), ("first_paint", "first window paint"),
+                       ("ready", "startup work done")):
+        print(f"{label:<28} {startup[key] * 1000:8.1f} ms", file=sys.stderr)
+
+    report = {
+        "meta": {"command": command, "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat},
+        "import_s": import_total,
+        "imports": {module: seconds for seconds, module in modules},
+        "startup_s": startup,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
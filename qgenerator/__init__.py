@@ -0,0 +1,13 @@
+"""Headless queue engine behind the Qgenerator GUI.
+
+Nothing in this package imports Qt or pandas, so queues can be generated
+from scripts (or ``python -m qgenerator``) without starting a QApplication.
+"""
+from .campaign import Campaign, position_table, positions_for
+from .groups import SAMPLE_TYPES, format_positions, full_name, make_group, sample_type
+from .layout import campaign_from_layout, groups_from_layout, load_layout
+from .plate import (FREE, PLATE_FORMATS, TRAYS, PlateFormat, PlateModel, get_plate_format, iter_bits, row_label,
+                    split_position, tray_prefix)
+from .queue import DETAIL_COLUMNS, QUEUE_COLUMNS, build_queue, iter_injections, iter_queue_rows, iter_rows
+from .selection import SELECTION_MODES, RubberBand, row_runs, shape_mask
+from .xcalibur import BRACKET_HEADER, iter_xcalibur_lines, save_queue, save_rows, write_xcalibur_csv
@@ -0,0 +1,203 @@
+"""Campaigns: up to four plates, one per autosampler tray, run as one queue."""
+from .exports import ExportRecord
+from .groups import make_group
+from .plate import PLATE_FORMATS, TRAYS, PlateModel, iter_bits, split_position, tray_prefix
+from .queue import iter_queue_rows
+
+_position_tables = {}
+
+
+def position_table(tray, plate_format):
+    # Every "R:A1"-style position string of a tray/format pair, built once and indexed like the wells
+    key = (tray, plate_format.name)
+    table = _position_tables.get(key)
+    if table is None:
+        prefix = tray_prefix(tray)
+        table = _position_tables[key] = [prefix + well for well in plate_format.well_names]
+    return table
+
+
+def positions_for(tray, plate_format, mask):
+    table = position_table(tray, plate_format)
+    return [table[index] for index in iter_bits(mask)]
+
+
+class Campaign:
+    """Sample groups spread over the plates of up to four trays.
+
+    Each tray gets its own PlateModel (and may use its own plate format);
+    group ids are unique across the campaign and every group remembers
+    its ``tray``. ``sample_groups`` is the same list-of-dicts structure
+    the queue writers consume, in the order groups were added.
+
+    Every edit is reported to ``journal`` (see ``project.Journal``) when
+    one is attached, so the campaign can be rebuilt after a crash. Edits
+    are reported once they are complete.
+
+    ``exported`` records the rows the queue was exported with (see
+    ``exports``). Clearing the campaign keeps it, since the exported
+    queue may still be running.
+    """
+
+    def __init__(self, plate_format=None):
+        self.default_format = plate_format or PLATE_FORMATS["96-well"]
+        self.plates = {}
+        self.sample_groups = []
+        self.groups_by_id = {}
+        self.next_group_id = 0
+        self.exported = ExportRecord()
+        self.journal = None
+
+    def _log(self, edit, *args):
+        if self.journal is not None:
+            self.journal.record(edit, *args)
+
+    def plate(self, tray):
+        model = self.plates.get(tray)
+        if model is None:
+            if tray not in TRAYS:
+                raise ValueError(f"Unknown tray {tray!r}, expected one of: {', '.join(TRAYS)}")
+            model = self.plates[tray] = PlateModel(self.default_format)
+        return model
+
+    def trays(self):
+        # Trays that hold at least one group, in autosampler order
+        return [tray for tray in TRAYS if tray in self.plates and self.plates[tray].occupied]
+
+    def set_plate_format(self, tray, plate_format):
+        # Swap a tray's plate for another format, keeping the wells that exist on both.
+        # Returns the groups that no longer have any wells (they are dropped).
+        old_model = self.plate(tray)
+        if old_model.format is plate_format:
+            return []
+        model = self.plates[tray] = PlateModel(plate_format)
+        dropped = []
+        for group in list(self.sample_groups):
+            if group["tray"] != tray:
+                continue
+            mask = 0
+            for position in group["positions"]:
+                index = plate_format.well_index.get(split_position(position)[1])
+                if index is not None:
+                    mask |= 1 << index
+            model.assign(mask, group["id"])
+            if not self.refresh_positions(group):
+                dropped.append(group)
+        self._log("set_plate_format", tray, plate_format.name)
+        return dropped
+
+    def format_losses(self, tray, plate_format):
+        # (wells, groups) that set_plate_format would drop: the wells plate_format lacks and the
+        # groups left without any
+        model = self.plates.get(tray)
+        if model is None or model.format is plate_format:
+            return 0, 0
+        wells = groups = 0
+        for group in self.sample_groups:
+            if group["tray"] != tray:
+                continue
+            lost = sum(1 for position in group["positions"]
+                       if split_position(position)[1] not in plate_format.well_index)
+            wells += lost
+            groups += lost == len(group["positions"])
+        return wells, groups
+
+    def add_group(self, tray, mask, name, inj_vol, instrument_method="", path="", **extra):
+        # Create a group from the free wells of mask; returns None if none of them were free
+        model = self.plate(tray)
+        group_id = self.next_group_id
+        assigned = model.assign(mask, group_id)
+        if not assigned:
+            return None
+        self.next_group_id += 1
+        group = make_group(name, positions_for(tray, model.format, assigned), inj_vol, instrument_method, path,
+                           tray=tray, id=group_id, **extra)
+        self.sample_groups.append(group)
+        self.groups_by_id[group_id] = group
+        self._log("add_group", group)
+        return group
+
+    def place_group(self, group, mask, row=None):
+        # Put a group that already has an id and tray (e.g. from a project file or undo) on its plate,
+        # queued at row (default: last)
+        model = self.plate(group["tray"])
+        group_id = group["id"]
+        if group_id in self.groups_by_id:
+            raise ValueError(f"Group id {group_id} is already in use")
+        assigned = model.assign(mask, group_id)
+        if not assigned:
+            return None
+        group["positions"] = positions_for(group["tray"], model.format, assigned)
+        self.groups_by_id[group_id] = group
+        self.next_group_id = max(self.next_group_id, group_id + 1)
+        if row is None:
+            self.sample_groups.append(group)
+            self._log("add_group", group)
+        else:
+            self.sample_groups.insert(row, group)
+            self._log("add_group", group, row)
+        return group
+
+    def add_wells(self, group_id, mask):
+        # Give free wells of mask to an existing group; returns the wells it got
+        group = self.groups_by_id[group_id]
+        assigned = self.plate(group["tray"]).assign(mask, group_id)
+        if assigned:
+            self.refresh_positions(group)
+            self._log("add_wells", group_id, format(assigned, "x"))
+        return assigned
+
+    def edit_group(self, group_id, **changes):
+        # Change fields such as inj_vol or path; returns their previous values
+        group = self.groups_by_id[group_id]
+        previous = {key: group.get(key) for key in changes}
+        group.update(changes)
+        self._log("edit_group", group_id, changes)
+        return previous
+
+    def move_to_end(self, group_ids):
+        # Queue the given groups last, in the given order
+        moved = [self.groups_by_id[group_id] for group_id in group_ids]
+        moving = set(group_ids)
+        self.sample_groups[:] = [group for group in self.sample_groups if group["id"] not in moving] + moved
+        self._log("move_to_end", list(group_ids))
+
+    def refresh_positions(self, group):
+        # Rebuild a group's positions from its plate, dropping the group once it is empty
+        model = self.plate(group["tray"])
+        mask = model.group_masks.get(group["id"], 0)
+        group["positions"] = positions_for(group["tray"], model.format, mask)
+        if not mask:
+            self.sample_groups.remove(group)
+            del self.groups_by_id[group["id"]]
+        return bool(mask)
+
+    def remove_well(self, tray, index):
+        # Free one well; returns the group it belonged to, or None
+        group_id = self.plate(tray).remove(index)
+        group = self.groups_by_id.get(group_id)
+        if group is not None:
+            self.refresh_positions(group)
+            self._log("remove_well", tray, index)
+        return group
+
+    def remove_group(self, group_id):
+        group = self.groups_by_id.pop(group_id)
+        self.sample_groups.remove(group)
+        wells = self.plate(group["tray"]).remove_group(group_id)
+        self._log("remove_group", group_id)
+        return wells
+
+    def record_export(self, rows, removed=()):
+        # Remember the rows ({injection key: row}) of an export and forget the removed injections
+        self.exported.update(rows, removed)
+        self._log("record_export", rows, list(removed))
+
+    def clear(self):
+        self.plates.clear()
+        self.sample_groups.clear()
+        self.groups_by_id.clear()
+        self._log("clear")
+
+    def iter_queue_rows(self, default_method="", default_path=""):
+        return iter_queue_rows(self.sample_groups, default_method, default_path)
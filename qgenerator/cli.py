@@ -0,0 +1,219 @@
+"""``qgen``: turn layout specs or sample manifests into Xcalibur queues without the GUI.
+
+Run as ``python -m qgenerator layout.json -o queue.csv`` or
+``python -m qgenerator samples.xlsx --plate 384-well --fill Serpentine -o queue.csv``.
+Other worklist formats are written with ``--format`` (see ``worklists``).
+``--since record.json`` re-exports only what changed since the export
+kept in the record (see ``exports``).
+"""
+import argparse
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .exports import injection_keys, load_record, save_diff, save_record, write_diff
+from .layout import campaign_from_layout, load_layout
+from .manifest import FILL_ORDERS, campaigns_from_manifest
+from .naming import TOKENS, NameTemplate, check_unique
+from .ordering import optimize_travel
+from .plate import PLATE_FORMATS, get_plate_format
+from .queue import iter_injections, iter_rows
+from .runorder import RUN_ORDERS, run_order
+from .worklists import (DEFAULT_FORMAT, WORKLIST_FORMATS, export_worklists, get_worklist_format, worklist_jobs,
+                        write_worklist)
+
+MANIFEST_EXTENSIONS = (".csv", ".xlsx", ".xlsm")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="qgen",
+        description="Generate Xcalibur queue CSVs from JSON plate layout specs or CSV/Excel sample manifests.",
+    )
+    parser.add_argument("layout", nargs="+", help="layout spec (.json, '-' reads from stdin) or sample manifest "
+                        "(.csv, .xlsx) file(s)")
+    parser.add_argument("-o", "--output", help="queue CSV to write (default: stdout); "
+                        "with several inputs, a directory to write one queue per input into")
+    parser.add_argument("--plate", choices=list(PLATE_FORMATS), help="override the plate type of the spec "
+                        "(manifests default to 96-well)")
+
+    manifest = parser.add_argument_group("manifest placement")
+    manifest.add_argument("--fill", choices=FILL_ORDERS, default=FILL_ORDERS[0],
+                          help="order in which free wells are filled (default: %(default)s)")
+    manifest.add_argument("--prefix", default="", help="file prefix for every sample")
+    manifest.add_argument("--inj-vol", default="", help="injection volume for rows that have none")
+    manifest.add_argument("--method", default="", help="instrument method for rows that have none")
+    manifest.add_argument("--path", default="", help="data path for rows that have none")
+
+    ordering = parser.add_argument_group("injection order")
+    ordering.add_argument("--optimize-travel", action="store_true",
+                          help="reorder injections to shorten autosampler needle travel")
+    ordering.add_argument("--keep-groups", action="store_true",
+                          help="with --optimize-travel, keep the wells (replicates) of each group together")
+    ordering.add_argument("--order", choices=RUN_ORDERS, default=RUN_ORDERS[0],
+                          help="run order of the samples (default: %(default)s)")
+    ordering.add_argument("--seed", type=int, help="seed for randomized orders (default: random, printed)")
+    ordering.add_argument("--blank-every", type=int, default=0, metavar="N",
+                          help="inject a Blank-type well after every N samples")
+    ordering.add_argument("--qc-every", type=int, default=0, metavar="N",
+                          help="inject a QC-type well after every N samples")
+    ordering.add_argument("--bracket", action="store_true",
+                          help="also run blanks/QCs before the first and after the last sample")
+
+    naming = parser.add_argument_group("file names")
+    naming.add_argument("--name-template", metavar="TEMPLATE",
+                        help="file name template, e.g. '{prefix}_{sample}_{well}_{rep:02d}' (default: the group name); "
+                        "tokens: " + " ".join("{" + token + "}" for token in TOKENS))
+
+    output = parser.add_argument_group("worklist formats")
+    output.add_argument("--format", dest="formats", action="append", choices=list(WORKLIST_FORMATS),
+                        help=f"worklist format to write, repeat for several (default: {DEFAULT_FORMAT}); "
+                        "with several, the format name is appended to each file name")
+    output.add_argument("--split-by-method", action="store_true",
+                        help="write one worklist per instrument method, named after the method")
+
+    incremental = parser.add_argument_group("incremental export")
+    incremental.add_argument("--since", metavar="RECORD",
+                             help="write only the injections added or changed since the export kept in RECORD, "
+                             "to append to a running sequence; RECORD is created if missing and updated after "
+                             "writing")
+    incremental.add_argument("--diff", action="store_true",
+                             help="with --since, write a CSV of the added, changed and removed injections instead")
+    return parser
+
+
+def _read_spec(source):
+    if source == "-":
+        return load_layout(sys.stdin)
+    with open(source, encoding="utf-8") as f:
+        return load_layout(f)
+
+
+def _queues_for(source, args):
+    # One campaign per queue; a manifest filling more than four trays gives several
+    if os.path.splitext(source)[1].lower() in MANIFEST_EXTENSIONS:
+        return campaigns_from_manifest(
+            source, get_plate_format(args.plate or "96-well"), args.fill, prefix=args.prefix,
+            inj_vol=args.inj_vol, instrument_method=args.method, path=args.path)
+    return [campaign_from_layout(_read_spec(source), args.plate)]
+
+
+@contextmanager
+def _stdout(encoding="utf-8"):
+    # The writers already end lines the way the worklist wants; text-mode stdout would turn
+    # "\r\n" into "\r\r\n" on Windows, so write to its buffer untranslated
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        yield sys.stdout
+        return
+    sys.stdout.flush()
+    stream = io.TextIOWrapper(buffer, encoding=encoding, newline="")
+    try:
+        yield stream
+    finally:
+        stream.flush()
+        stream.detach()  # Leave sys.stdout open
+
+
+def _write(campaign, output, args, template=None, record=None):
+    # Returns (file, injections) for every worklist written; the file is None for stdout.
+    # With a record, only the changes since the recorded export are written and then recorded.
+    injections = iter_injections(campaign.sample_groups)
+    if args.optimize_travel:
+        injections, report = optimize_travel(campaign, injections, args.keep_groups)
+        print(report, file=sys.stderr)
+    injections, seed = run_order(injections, args.order, args.seed, args.blank_every, args.qc_every, args.bracket)
+    if args.order != RUN_ORDERS[0] and args.seed is None:
+        print(f"Run order seed: {seed}", file=sys.stderr)
+    if record is not None:
+        injections = list(injections)  # Read twice, for the keys and the rows
+    duplicates = []
+    rows = check_unique(iter_rows(injections, template=template, details=True), duplicates)
+    formats = args.formats or [DEFAULT_FORMAT]
+    if record is not None:
+        diff = record.diff(zip(injection_keys(injections), rows))
+        print(diff.summary(), file=sys.stderr)
+        rows = diff.rows()
+    if record is not None and not (diff if args.diff else diff.updated):
+        written = []
+    elif args.diff:
+        if output is None:
+            with _stdout() as stdout:
+                written = [(None, write_diff(diff, stdout))]
+        else:
+            written = [(output, save_diff(diff, output))]
+    elif output is None:
+        with _stdout(get_worklist_format(formats[0]).encoding) as stdout:
+            written = [(None, write_worklist(rows, stdout, formats[0]))]
+    else:
+        if len(formats) > 1 or args.split_by_method:
+            rows = list(rows)  # Shared by the jobs
+        with ThreadPoolExecutor() as executor:
+            written = [(path, future.result())
+                       for path, future in export_worklists(worklist_jobs(rows, output, formats,
+                                                                          args.split_by_method), executor)]
+    if record is not None:
+        # An appended worklist runs after the recorded one, which keeps its removed injections
+        record.update(diff.updates(), diff.removed_keys() if args.diff else ())
+    if duplicates:
+        print(f"qgen: warning: {len(duplicates)} injections reuse a file name (e.g. {duplicates[0]}); "
+              "add {rep}, {well} or {seq} to --name-template", file=sys.stderr)
+    return written
+
+
+def _output_for(source, output_dir):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(output_dir, stem + ".csv")
+
+
+def _numbered(output, number):
+    # queue.csv, queue_2.csv, queue_3.csv, ...
+    if number == 1:
+        return output
+    root, extension = os.path.splitext(output)
+    return f"{root}_{number}{extension}"
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if len(args.layout) > 1 and args.output is None:
+        parser.error("several inputs need -o/--output pointing at a directory")
+    if args.output is None and (len(args.formats or ()) > 1 or args.split_by_method):
+        parser.error("several worklists need -o/--output")
+    if args.since is not None and len(args.layout) > 1:
+        parser.error("--since keeps the record of a single queue, give one input")
+    if args.diff and args.since is None:
+        parser.error("--diff needs --since")
+    if args.diff and (args.formats or args.split_by_method):
+        parser.error("--diff writes a single CSV, it does not take --format or --split-by-method")
+    try:
+        template = NameTemplate(args.name_template) if args.name_template else None
+    except ValueError as error:
+        parser.error(str(error))
+
+    for source in args.layout:
+        output = args.output if len(args.layout) == 1 else _output_for(source, args.output)
+        try:
+            queues = _queues_for(source, args)
+            if len(queues) > 1 and output is None:
+                raise ValueError(f"samples fill {len(queues)} sets of trays, use -o/--output to write one queue each")
+            record = None
+            if args.since is not None:
+                if len(queues) > 1:
+                    raise ValueError(f"samples fill {len(queues)} sets of trays, --since keeps the record of one")
+                record = load_record(args.since)
+            for number, campaign in enumerate(queues, start=1):
+                queue_output = None if output is None else _numbered(output, number)
+                for path, count in _write(campaign, queue_output, args, template, record):
+                    if path is not None:
+                        print(f"{'Diff' if args.diff else 'Queue'} saved to {path} ({count} injections)",
+                              file=sys.stderr)
+            if record is not None:
+                save_record(record, args.since)
+        except (OSError, ValueError) as error:
+            print(f"qgen: {source}: {error}", file=sys.stderr)
+            return 1
+    return 0
@@ -0,0 +1,148 @@
+"""What a queue was last exported with, for incremental re-export.
+
+Every injection has a stable key, its position (``"R:A1"``), with
+``"#2"``, ``"#3"``, ... added for further injections of the same well
+(the blank and QC wells a run order cycles through). A well belongs to
+one group at a time, so the key does not depend on where the group sits
+in the queue or the layout; group ids would, since a layout numbers its
+groups in the order they are listed. An ``ExportRecord``
+maps the keys of the exported injections to the rows they were written
+with, so comparing a queue against it is one dictionary lookup per
+injection, without aligning the two sequences. Only the new and changed
+rows are then written (as an append worklist, or as a diff together
+with the removed ones) and recorded.
+
+Rows are compared as built by ``queue.iter_rows`` with ``details=True``.
+A change of order alone is not a change: a running sequence keeps the
+order it was started with.
+"""
+import csv
+import json
+import os
+
+from .queue import DETAIL_COLUMNS, QUEUE_COLUMNS
+from .xcalibur import _LastLine
+
+EXPORT_MODES = ("Full", "Append", "Diff")
+ROW_COLUMNS = QUEUE_COLUMNS + DETAIL_COLUMNS
+DIFF_COLUMNS = ("Change", "Injection") + ROW_COLUMNS + ("Previous",)
+RECORD_VERSION = 1
+
+
+def injection_keys(injections):
+    # The stable key of every (group, position) injection, in order
+    counts = {}
+    for _group, position in injections:
+        count = counts[position] = counts.get(position, 0) + 1
+        yield position if count == 1 else f"{position}#{count}"
+
+
+class QueueDiff:
+    """Changes of a queue since an export.
+
+    ``updated`` holds ``(key, row, previous row)`` for the new (previous
+    row None) and changed injections, in queue order; ``removed`` holds
+    ``(key, row)`` for exported injections no longer queued, in the order
+    they were exported.
+    """
+
+    def __init__(self, updated, removed):
+        self.updated = updated
+        self.removed = removed
+
+    def __bool__(self):
+        return bool(self.updated or self.removed)
+
+    def rows(self):
+        # New and changed rows in queue order, e.g. for an append worklist
+        return [row for _key, row, _previous in self.updated]
+
+    def updates(self):
+        return {key: row for key, row, _previous in self.updated}
+
+    def removed_keys(self):
+        return [key for key, _row in self.removed]
+
+    def summary(self):
+        added = sum(previous is None for _key, _row, previous in self.updated)
+        return (f"{added} new, {len(self.updated) - added} changed and {len(self.removed)} removed injections "
+                "since the last export")
+
+
+class ExportRecord:
+    def __init__(self, rows=None):
+        # Key -> exported row, in the order the keys were first exported
+        self.rows = {key: tuple(row) for key, row in (rows or {}).items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def diff(self, keyed_rows):
+        """Compare ``(key, row)`` pairs of the current queue with the record; returns a ``QueueDiff``."""
+        exported = self.rows
+        updated = []
+        queued = set()
+        for key, row in keyed_rows:
+            queued.add(key)
+            previous = exported.get(key)
+            if previous != row:
+                updated.append((key, row, previous))
+        removed = [(key, row) for key, row in exported.items() if key not in queued]
+        return QueueDiff(updated, removed)
+
+    def update(self, rows, removed=()):
+        # Record exported rows ({key: row}) and forget the removed keys
+        self.rows.update((key, tuple(row)) for key, row in rows.items())
+        for key in removed:
+            self.rows.pop(key, None)
+
+
+def load_record(file_path):
+    # An empty record when there is no file yet
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        return ExportRecord()
+    except ValueError as error:
+        raise ValueError(f"{file_path} is not an export record: {error}") from None
+    if not isinstance(record, dict) or record.get("version") != RECORD_VERSION:
+        raise ValueError(f"{file_path} is not an export record this version can read")
+    return ExportRecord(record.get("rows"))
+
+
+def save_record(record, file_path):
+    temporary = file_path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"version": RECORD_VERSION, "rows": record.rows}, f, separators=(",", ":"))
+    os.replace(temporary, file_path)
+
+
+def iter_diff_lines(diff):
+    # One line per new, changed or removed injection; changed ones list their old values under "Previous"
+    sink = _LastLine()
+    writer = csv.writer(sink, lineterminator="\r\n")
+    writer.writerow(DIFF_COLUMNS)
+    yield sink.line
+    for key, row, previous in diff.updated:
+        if previous is None:
+            writer.writerow(("Added", key, *row, ""))
+        else:
+            was = "; ".join(f"{column}: {old}" for column, old, new in zip(ROW_COLUMNS, previous, row) if old != new)
+            writer.writerow(("Changed", key, *row, was))
+        yield sink.line
+    for key, row in diff.removed:
+        writer.writerow(("Removed", key, *row, ""))
+        yield sink.line
+
+
+def write_diff(diff, f):
+    # Returns the number of injections listed
+    for line in iter_diff_lines(diff):
+        f.write(line)
+    return len(diff.updated) + len(diff.removed)
+
+
+def save_diff(diff, file_path):
+    with open(file_path, "w", newline="", encoding="utf-8") as f:
+        return write_diff(diff, f)
@@ -0,0 +1,35 @@
+"""Sample groups: a named set of wells sharing volume, method and path.
+
+Groups are plain dicts so the GUI can keep its display-only keys (such as
+``color``) alongside the fields the queue builder reads.
+"""
+from .plate import tray_prefix
+
+# Xcalibur sample types a group can have; Blank and QC wells can be interleaved by the run order
+SAMPLE_TYPES = ("Unknown", "Blank", "QC")
+
+
+def full_name(file_prefix, sample_name):
+    # Combine prefix and sample name the way the GUI always has
+    return f"{file_prefix}_{sample_name}" if file_prefix else sample_name
+
+
+def format_positions(tray, wells):
+    prefix = tray_prefix(tray)
+    return [f"{prefix}{well}" for well in wells]
+
+
+def make_group(name, positions, inj_vol, instrument_method="", path="", **extra):
+    group = {
+        "name": name,
+        "positions": list(positions),
+        "inj_vol": inj_vol,
+        "instrument_method": instrument_method,
+        "path": path,
+    }
+    group.update(extra)
+    return group
+
+
+def sample_type(group):
+    return group.get("sample_type", SAMPLE_TYPES[0])
@@ -0,0 +1,182 @@
+"""Undo/redo of campaign edits.
+
+Each command is recorded after its edit has been made and only keeps what
+that edit changed: the affected group dicts and plate models are shared
+by reference rather than copied, so a removed well costs one small object
+however large the layout is. ``changes`` lists the ``(group id, tray,
+wells)`` an undo or redo touches, so views can repaint just those wells.
+"""
+import collections
+from contextlib import contextmanager
+
+
+class AddGroups:
+    # New groups, e.g. from the selection or a manifest import. formats maps the trays set up for
+    # the groups to their (previous, new) plate formats.
+    def __init__(self, campaign, groups, formats=None):
+        self.groups = [(group, campaign.plate(group["tray"]).group_masks[group["id"]]) for group in groups]
+        self.formats = formats or {}
+        self.changes = [(group["id"], group["tray"], mask) for group, mask in self.groups]
+
+    def undo(self, campaign):
+        for group, _mask in reversed(self.groups):
+            campaign.remove_group(group["id"])
+        for tray, (previous, _new) in self.formats.items():
+            campaign.set_plate_format(tray, previous)
+
+    def redo(self, campaign):
+        for tray, (_previous, new) in self.formats.items():
+            campaign.set_plate_format(tray, new)
+        for group, mask in self.groups:
+            campaign.place_group(group, mask)
+
+
+class RemoveWell:
+    # One well taken out of its group; row is where the group was queued, in case it was dropped
+    def __init__(self, tray, index, group, row):
+        self.tray = tray
+        self.index = index
+        self.group = group
+        self.row = row
+        self.changes = [(group["id"], tray, 1 << index)]
+
+    def undo(self, campaign):
+        if self.group["id"] in campaign.groups_by_id:
+            campaign.add_wells(self.group["id"], 1 << self.index)
+        else:
+            campaign.place_group(self.group, 1 << self.index, self.row)
+
+    def redo(self, campaign):
+        campaign.remove_well(self.tray, self.index)
+
+
+class EditGroup:
+    def __init__(self, group_id, previous, changes):
+        self.group_id = group_id
+        self.previous = previous
+        self.new = changes
+        self.changes = [(group_id, None, 0)]
+
+    def undo(self, campaign):
+        campaign.edit_group(self.group_id, **self.previous)
+
+    def redo(self, campaign):
+        campaign.edit_group(self.group_id, **self.new)
+
+
+class _Restore:
+    # Puts back groups and wells that were lost along with a plate, from the old PlateModels
+    def __init__(self, campaign, plates, groups):
+        self.plates = plates
+        self.rows = {group["id"]: row for row, group in enumerate(campaign.sample_groups) if group["tray"] in plates}
+        self.groups = groups
+        self.changes = [(group["id"], group["tray"], plates[group["tray"]].group_masks[group["id"]])
+                        for group in groups]
+
+    def restore(self, campaign):
+        for tray, model in self.plates.items():
+            campaign.set_plate_format(tray, model.format)
+        for group in self.groups:
+            mask = self.plates[group["tray"]].group_masks[group["id"]]
+            if group["id"] in campaign.groups_by_id:
+                campaign.add_wells(group["id"], mask)
+            else:
+                campaign.place_group(group, mask, self.rows[group["id"]])
+
+
+class Clear(_Restore):
+    # Record before clearing: campaign.clear() empties the dicts in place
+    def __init__(self, campaign):
+        super().__init__(campaign, dict(campaign.plates), list(campaign.sample_groups))
+
+    def undo(self, campaign):
+        self.restore(campaign)
+
+    def redo(self, campaign):
+        campaign.clear()
+
+
+class SetPlateFormat(_Restore):
+    # Record before the swap; groups and wells the new format lacks come back on undo
+    def __init__(self, campaign, tray, plate_format):
+        super().__init__(campaign, {tray: campaign.plate(tray)},
+                         [group for group in campaign.sample_groups if group["tray"] == tray])
+        self.tray = tray
+        self.format = plate_format
+
+    def undo(self, campaign):
+        self.restore(campaign)
+
+    def redo(self, campaign):
+        campaign.set_plate_format(self.tray, self.format)
+
+
+class Batch:
+    # Several commands undone and redone as one step
+    def __init__(self):
+        self.commands = []
+
+    @property
+    def changes(self):
+        return [change for command in self.commands for change in command.changes]
+
+    def undo(self, campaign):
+        for command in reversed(self.commands):
+            command.undo(campaign)
+
+    def redo(self, campaign):
+        for command in self.commands:
+            command.redo(campaign)
+
+
+class History:
+    """Undo and redo stacks of recorded commands; the oldest steps are dropped past ``limit``."""
+
+    def __init__(self, limit=10000):
+        self.undo_stack = collections.deque(maxlen=limit)
+        self.redo_stack = []
+        self._batch = None
+
+    def push(self, command):
+        if self._batch is not None:
+            self._batch.commands.append(command)
+            return
+        self.undo_stack.append(command)
+        self.redo_stack.clear()
+
+    @contextmanager
+    def batch(self):
+        # Everything pushed inside the block becomes one undo step
+        if self._batch is not None:
+            yield
+            return
+        self._batch = Batch()
+        try:
+            yield
+        finally:
+            batch, self._batch = self._batch, None
+            if len(batch.commands) > 1:
+                self.push(batch)
+            elif batch.commands:
+                self.push(batch.commands[0])
+
+    def undo(self, campaign):
+        # Returns the undone command, or None when there is nothing to undo
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        command.undo(campaign)
+        self.redo_stack.append(command)
+        return command
+
+    def redo(self, campaign):
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        command.redo(campaign)
+        self.undo_stack.append(command)
+        return command
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
@@ -0,0 +1,96 @@
+"""Layout specs: a JSON description of the groups to place on the trays.
+
+Example::
+
+    {
+      "plate": "96-well",
+      "trays": {"Blue": "384-well"},
+      "defaults": {"prefix": "EXP1", "inj_vol": "2", "tray": "Red",
+                   "instrument_method": "C:/methods/dda.meth",
+                   "path": "C:/data/EXP1"},
+      "groups": [
+        {"sample": "Blank", "wells": "A1"},
+        {"sample": "HeLa", "wells": ["A2:A6", "B1"], "inj_vol": "1.5"},
+        {"sample": "QC", "wells": "P24", "tray": "Blue", "sample_type": "QC",
+         "comment": "pooled QC"}
+      ]
+    }
+
+``plate`` is the format of every tray not listed under ``trays``. Group
+entries inherit every key from ``defaults`` and may override it. Wells of
+a group are queued in row-major order.
+"""
+import json
+
+from .campaign import Campaign
+from .groups import SAMPLE_TYPES, full_name
+from .plate import TRAYS, get_plate_format
+
+
+def campaign_from_layout(spec, plate_type=None):
+    # plate_type overrides every plate format named in the spec
+    campaign = Campaign(get_plate_format(plate_type or spec.get("plate", "96-well")))
+    for tray, tray_plate_type in spec.get("trays", {}).items():
+        tray = str(tray).capitalize()
+        campaign.set_plate_format(tray, get_plate_format(plate_type or tray_plate_type))
+    defaults = spec.get("defaults", {})
+    entries = spec.get("groups")
+    if not entries:
+        raise ValueError("Layout spec has no groups")
+
+    for number, entry in enumerate(entries, start=1):
+        settings = dict(defaults, **entry)
+        sample_name = str(settings.get("sample", "")).strip()
+        inj_vol = str(settings.get("inj_vol", "")).strip()
+        if not sample_name or not inj_vol:
+            raise ValueError(f"Group {number} needs both a sample name and an injection volume")
+        if "wells" not in settings:
+            raise ValueError(f"Group {number} ({sample_name}) has no wells")
+
+        kind = {name.lower(): name for name in SAMPLE_TYPES}.get(str(settings.get("sample_type", "Unknown")).lower())
+        if kind is None:
+            raise ValueError(f"Group {number} ({sample_name}) has an unknown sample type, expected one of: "
+                             f"{', '.join(SAMPLE_TYPES)}")
+
+        tray = str(settings.get("tray", TRAYS[0])).capitalize()
+        if tray not in TRAYS:
+            raise ValueError(f"Group {number} ({sample_name}) uses unknown tray {tray!r}")
+
+        # The tray's occupancy model catches wells claimed by two groups
+        model = campaign.plate(tray)
+        plate = model.format
+        wells = plate.expand(settings["wells"])
+        mask = 0
+        for well in wells:
+            mask |= 1 << plate.well_index[well]
+        if bin(mask).count("1") != len(wells):
+            raise ValueError(f"Group {number} ({sample_name}) lists the same well more than once")
+        taken = model.conflicts(mask)
+        if taken:
+            names = ", ".join(well for well in wells if taken >> plate.well_index[well] & 1)
+            raise ValueError(f"Group {number} ({sample_name}) reuses wells already in another group: {names}")
+        prefix = str(settings.get("prefix", "")).strip()
+        campaign.add_group(
+            tray,
+            mask,
+            full_name(prefix, sample_name),
+            inj_vol,
+            str(settings.get("instrument_method", "")).strip(),
+            str(settings.get("path", "")).strip(),
+            sample_type=kind,
+            prefix=prefix,
+            sample=sample_name,
+            comment=str(settings.get("comment", "")).strip(),
+        )
+    return campaign
+
+
+def groups_from_layout(spec, plate_type=None):
+    return campaign_from_layout(spec, plate_type).sample_groups
+
+
+def load_layout(f):
+    spec = json.load(f)
+    if not isinstance(spec, dict):
+        raise ValueError("Layout spec must be a JSON object")
+    return spec
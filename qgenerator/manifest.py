@@ -0,0 +1,203 @@
+"""Sample manifests: CSV or Excel sheets placed onto free wells in bulk.
+
+A manifest has a header row and one row per sample. Recognised columns
+(case-insensitive) are the sample name, injection volume, instrument
+method, path, sample type, comment and an optional fixed well (``A1`` or ``B:A1``
+with a tray prefix) or tray. Rows are read one at a time; Excel files need the
+optional ``openpyxl`` package and are opened in read-only mode.
+"""
+import csv
+import os
+
+from .campaign import Campaign
+from .groups import SAMPLE_TYPES, full_name
+from .plate import FREE, TRAYS, split_position, tray_prefix
+
+FILL_ORDERS = ("Row-major", "Column-major", "Serpentine")
+
+# Header aliases for each manifest field
+_COLUMNS = {
+    "sample": ("sample", "sample name", "name", "file name"),
+    "inj_vol": ("inj vol", "inj. vol.", "injection volume", "inj_vol", "volume"),
+    "instrument_method": ("instrument method", "method", "instrument_method"),
+    "path": ("path", "data path", "output path"),
+    "well": ("well", "position"),
+    "tray": ("tray",),
+    "sample_type": ("sample type", "type", "sample_type"),
+    "comment": ("comment", "comments", "note"),
+}
+_ALIASES = {alias: field for field, aliases in _COLUMNS.items() for alias in aliases}
+_TRAY_BY_PREFIX = {tray_prefix(tray)[0]: tray for tray in TRAYS}
+_SAMPLE_TYPES = {name.lower(): name for name in SAMPLE_TYPES}
+
+_fill_orders = {}
+
+
+def fill_order(plate_format, order):
+    # Well indices in the order auto-placed samples fill a plate, built once per format
+    key = (plate_format.name, order)
+    indices = _fill_orders.get(key)
+    if indices is None:
+        n_rows, n_cols = plate_format.n_rows, plate_format.n_cols
+        if order == "Row-major":
+            indices = list(range(plate_format.size))
+        elif order == "Column-major":
+            indices = [row * n_cols + col for col in range(n_cols) for row in range(n_rows)]
+        elif order == "Serpentine":
+            indices = [row * n_cols + (col if row % 2 == 0 else n_cols - 1 - col)
+                       for row in range(n_rows) for col in range(n_cols)]
+        else:
+            raise ValueError(f"Unknown fill order {order!r}, expected one of: {', '.join(FILL_ORDERS)}")
+        _fill_orders[key] = indices
+    return indices
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _iter_table(file_path):
+    # Raw rows of the first sheet (Excel) or of the CSV file, header included
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Reading Excel manifests needs the openpyxl package; save the sheet as CSV instead") from None
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield [_cell_text(value) for value in row]
+        finally:
+            workbook.close()
+        return
+
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.reader(f, dialect):
+            yield [value.strip() for value in row]
+
+
+def read_manifest(file_path):
+    # Yield (line number, {field: text}) for every non-empty manifest row
+    rows = _iter_table(file_path)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError(f"{file_path} is empty")
+    fields = [_ALIASES.get(name.lower()) for name in header]
+    if "sample" not in fields:
+        raise ValueError(f"{file_path} has no sample name column (expected one of: {', '.join(_COLUMNS['sample'])})")
+    for line, row in enumerate(rows, start=2):
+        record = {field: value for field, value in zip(fields, row) if field and value}
+        if record:
+            yield line, record
+
+
+def _fixed_well(record, line, default_tray):
+    well = record["well"]
+    tray = record.get("tray", "").capitalize() or default_tray
+    if ":" in well:
+        prefix, well = split_position(well)
+        tray = _TRAY_BY_PREFIX.get(prefix.upper(), prefix.capitalize())
+    if tray not in TRAYS:
+        raise ValueError(f"Line {line}: unknown tray {tray!r}")
+    return tray, well
+
+
+def place_manifest(campaign, records, fill="Row-major", trays=TRAYS, plate_format=None, prefix="",
+                   inj_vol="", instrument_method="", path=""):
+    """Place manifest rows on the campaign's trays, one single-well group per row.
+
+    Rows with a fixed well are placed first; the rest fill the free wells
+    of ``trays`` in ``fill`` order, moving to the next tray when one is
+    full. Trays the campaign does not have yet get ``plate_format``.
+    Returns ``(groups, leftover)`` with the rows that did not fit.
+    """
+    records = list(records)
+    new_trays = [tray for tray in trays if plate_format is not None and tray not in campaign.plates]
+
+    # Every row is checked before any is placed or a tray is set up, so a bad row leaves the
+    # campaign as it was
+    def group_fields(line, record):
+        sample_name = record["sample"]
+        volume = record.get("inj_vol", inj_vol)
+        if not volume:
+            raise ValueError(f"Line {line}: {sample_name} has no injection volume")
+        try:
+            float(volume)
+        except ValueError:
+            raise ValueError(f"Line {line}: injection volume {volume!r} of {sample_name} is not a number") from None
+        kind = _SAMPLE_TYPES.get(record.get("sample_type", "unknown").lower())
+        if kind is None:
+            raise ValueError(f"Line {line}: unknown sample type {record['sample_type']!r}")
+        return {"name": full_name(prefix, sample_name), "inj_vol": volume,
+                "instrument_method": record.get("instrument_method", instrument_method),
+                "path": record.get("path", path), "sample_type": kind, "prefix": prefix, "sample": sample_name,
+                "comment": record.get("comment", "")}
+
+    fields = [group_fields(line, record) for line, record in records]
+    fixed = {}
+    claimed = set()
+    for number, (line, record) in enumerate(records):
+        if "well" not in record:
+            continue
+        tray, well = _fixed_well(record, line, trays[0])
+        # A tray still to be set up is empty and gets plate_format
+        model = None if tray in new_trays else campaign.plate(tray)
+        try:
+            index = (plate_format if model is None else model.format).index_of(well)
+        except ValueError as error:
+            raise ValueError(f"Line {line}: {error}") from None
+        if (model is not None and model.owner[index] != FREE) or (tray, index) in claimed:
+            raise ValueError(f"Line {line}: well {tray_prefix(tray)}{well} is already in use")
+        claimed.add((tray, index))
+        fixed[number] = (tray, index)
+
+    for tray in new_trays:
+        campaign.set_plate_format(tray, plate_format)
+    placed = {number: campaign.add_group(tray, 1 << index, **fields[number])
+              for number, (tray, index) in fixed.items()}
+
+    groups = []
+    leftover = []
+    free_wells = ((tray, index) for tray in trays for index in fill_order(campaign.plate(tray).format, fill)
+                  if campaign.plate(tray).owner[index] == FREE)
+    for number, (line, record) in enumerate(records):
+        group = placed.get(number)
+        if group is None:
+            tray, index = next(free_wells, (None, None))
+            if tray is None:
+                leftover.append((line, record))
+                continue
+            group = campaign.add_group(tray, 1 << index, **fields[number])
+        groups.append(group)
+
+    # Queue the new groups in manifest order rather than fixed wells first
+    campaign.move_to_end([group["id"] for group in groups])
+    return groups, leftover
+
+
+def campaigns_from_manifest(file_path, plate_format, fill="Row-major", **defaults):
+    # Place a whole manifest, starting a further campaign whenever all four trays are full
+    campaigns = []
+    records = read_manifest(file_path)
+    while True:
+        campaign = Campaign(plate_format)
+        groups, records = place_manifest(campaign, records, fill, plate_format=plate_format, **defaults)
+        if not groups:
+            break
+        campaigns.append(campaign)
+        if not records:
+            break
+    if not campaigns:
+        raise ValueError(f"{file_path} lists no samples")
+    return campaigns
@@ -0,0 +1,159 @@
+"""Index of the instrument methods in a set of library folders.
+
+``MethodIndex.scan`` walks the folders and is meant to run on a worker
+thread. The folder listings are cached on disk together with each
+folder's modification time; since adding, removing or renaming a file
+changes the time of the folder holding it, a rescan only lists the
+folders whose time differs and just stats the rest. ``search`` is a
+fuzzy filter over the indexed paths, fast enough to run on every
+keystroke for tens of thousands of methods.
+"""
+import heapq
+import json
+import os
+import re
+
+# Xcalibur .meth files, MassHunter .m folders and Analyst .dam files
+METHOD_EXTENSIONS = (".meth", ".m", ".dam")
+INDEX_VERSION = 1
+
+
+def _name_start(path):
+    return max(path.rfind("/"), path.rfind("\\")) + 1
+
+
+class MethodIndex:
+    """Methods found under ``roots``, optionally cached in ``cache_path``.
+
+    The method list is replaced as a whole when a scan finishes, so
+    searching from another thread while a scan runs sees either the old
+    or the new list, never a mix.
+    """
+
+    def __init__(self, roots=(), cache_path=None):
+        self.roots = list(roots)
+        self.cache_path = cache_path
+        # Sorted method paths, and their (lowercased path, start of the file name) search keys
+        self._table = ([], [])
+        self._folders = {}      # folder -> [mtime_ns, method names, subfolder names]
+        self._last_search = (None, None, None)  # (table, query, numbers of the matching methods)
+        self._saved_roots = []
+
+    def __len__(self):
+        return len(self._table[0])
+
+    @property
+    def methods(self):
+        return self._table[0]
+
+    def load(self):
+        # Restore the roots and listings of the last scan; returns False when there is no usable cache
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(record, dict) or record.get("version") != INDEX_VERSION:
+            return False
+        self.roots = record.get("roots", self.roots)
+        self._saved_roots = list(self.roots)
+        self._folders = record.get("folders", {})
+        self._collect()
+        return True
+
+    def save(self):
+        roots = list(self.roots)
+        temporary = self.cache_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "roots": roots, "folders": self._folders}, f,
+                      separators=(",", ":"))
+        os.replace(temporary, self.cache_path)
+        self._saved_roots = roots
+
+    def scan(self):
+        """Bring the index up to date with the folders; returns True if any method was added or removed."""
+        roots = list(self.roots)
+        folders = {}
+        pending = list(roots)
+        while pending:
+            folder = pending.pop()
+            if folder in folders:
+                continue
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue  # Gone, or a share that is not mounted
+            listing = self._folders.get(folder)
+            if listing is None or listing[0] != mtime:
+                listing = self._list(folder, mtime)
+                if listing is None:
+                    continue
+            folders[folder] = listing
+            pending.extend(os.path.join(folder, name) for name in listing[2])
+
+        changed = folders != self._folders
+        self._folders = folders
+        if changed:
+            self._collect()
+        if self.cache_path is not None and (changed or roots != self._saved_roots):
+            self.save()
+        return changed
+
+    def _list(self, folder, mtime):
+        methods, subfolders = [], []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(METHOD_EXTENSIONS):
+                        methods.append(entry.name)  # Also MassHunter's .m folders, which are not searched
+                    elif entry.is_dir(follow_symlinks=False):
+                        subfolders.append(entry.name)
+        except OSError:
+            return None
+        return [mtime, methods, subfolders]
+
+    def _collect(self):
+        methods = sorted(os.path.join(folder, name) for folder, listing in self._folders.items()
+                         for name in listing[1])
+        keys = [(path.lower(), _name_start(path)) for path in methods]
+        self._table = (methods, keys)
+
+    def search(self, query, limit=200):
+        """Methods whose path holds the characters of ``query`` in order, best matches first.
+
+        Matches within the file name rank before matches spread over the
+        folders, then tighter matches before looser ones. Spaces in the
+        query are ignored; an empty query lists the first ``limit`` methods.
+        """
+        table = self._table
+        methods, keys = table
+        query = "".join(query.lower().split())
+        if not query:
+            return methods[:limit]
+        # Each character is found at its first occurrence after the previous one, without backtracking
+        pattern = re.compile(re.escape(query[0]) + "".join(f"[^{re.escape(char)}]*{re.escape(char)}"
+                                                           for char in query[1:]))
+        search = pattern.search
+
+        # Typing on narrows the previous matches instead of searching everything again
+        last_table, last_query, last_numbers = self._last_search
+        if last_table is table and query.startswith(last_query):
+            candidates = last_numbers
+        else:
+            candidates = range(len(keys))
+        numbers = []
+        scored = []
+        for number in candidates:
+            key, name_start = keys[number]
+            match = search(key)
+            if match is None:
+                continue
+            numbers.append(number)
+            if match.start() < name_start:
+                in_name = search(key, name_start)
+                if in_name is not None:
+                    match = in_name
+            scored.append((match.start() < name_start, match.end() - match.start(), len(key) - name_start, number))
+        self._last_search = (table, query, numbers)
+        best = heapq.nsmallest(limit, scored) if limit else sorted(scored)
+        return [methods[score[-1]] for score in best]
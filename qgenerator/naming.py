@@ -0,0 +1,138 @@
+"""File-name templates such as ``{prefix}_{sample}_{well}_{rep:02d}``.
+
+A template is parsed and checked once (``NameTemplate``) and then
+rendered in bulk over an injection sequence. Tokens:
+
+``{name}``    group name (prefix and sample joined as the GUI always did)
+``{prefix}``  file prefix        ``{sample}``  sample name
+``{well}``    well, e.g. ``B7``  ``{tray}``    tray letter, e.g. ``R``
+``{rep}``     n-th injection of the same group in the queue, from 1
+``{seq}``     injection number in the queue, from 1
+``{type}``    sample type        ``{date}``    export date
+
+Format specs work as in ``str.format`` (``{seq:04d}``); ``{date}`` takes
+an ``strftime`` pattern instead and defaults to ``%Y%m%d``.
+"""
+import datetime
+import string
+
+from .groups import sample_type
+
+DEFAULT_TEMPLATE = "{name}"
+TOKENS = ("name", "prefix", "sample", "well", "tray", "rep", "seq", "type", "date")
+# Tokens that change from one injection of a group to the next; the rest are fixed per group
+INJECTION_TOKENS = ("rep", "seq", "tray", "well")
+
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class NameTemplate:
+    """A compiled file-name template."""
+
+    def __init__(self, template):
+        self.template = template
+        self.tokens = []
+        self.date_formats = []
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as error:
+            raise ValueError(f"Invalid file name template {template!r}: {error}") from None
+
+        # (literal text, token, format spec) pieces; each {date} gets its own key since it carries its
+        # own strftime pattern
+        self._pieces = []
+        for literal, field, spec, conversion in parsed:
+            if field is None:
+                self._pieces.append((literal, None, ""))
+                continue
+            if field not in TOKENS:
+                raise ValueError(f"Unknown token {{{field}}} in file name template, "
+                                 f"expected one of: {', '.join('{' + token + '}' for token in TOKENS)}")
+            if conversion:
+                raise ValueError(f"Conversions such as !{conversion} are not supported in file name templates")
+            self.tokens.append(field)
+            if field == "date":
+                self._pieces.append((literal, f"date{len(self.date_formats)}", ""))
+                self.date_formats.append(spec or "%Y%m%d")
+            else:
+                self._pieces.append((literal, field, spec))
+
+        # Catch bad format specs now rather than halfway through an export
+        try:
+            names = self._group_format(dict.fromkeys(["name", "prefix", "sample", "type"] + [
+                f"date{i}" for i in range(len(self.date_formats))], "x"))
+            if names.__class__ is not str:
+                names(1, 1, "x", "x")
+        except ValueError as error:
+            raise ValueError(f"Invalid format in file name template {template!r}: {error}") from None
+
+    def __repr__(self):
+        return f"NameTemplate({self.template!r})"
+
+    def _group_format(self, values):
+        # The bound format method of the template with the group's fixed tokens filled in, taking
+        # (rep, seq, tray, well); just the name when the template has none of those
+        parts = []
+        varies = False
+        for literal, key, spec in self._pieces:
+            parts.append(_escape(literal))
+            if key is None:
+                continue
+            if key in INJECTION_TOKENS:
+                slot = INJECTION_TOKENS.index(key)
+                parts.append(f"{{{slot}:{spec}}}" if spec else f"{{{slot}}}")
+                varies = True
+            else:
+                parts.append(_escape(format(values[key], spec)))
+        text = "".join(parts)
+        return text.format if varies else text.replace("{{", "{").replace("}}", "}")
+
+    def render(self, injections, date=None):
+        """Yield one file name per ``(group, position)`` injection, in order.
+
+        The group's fixed tokens are rendered once per group; per injection
+        only the used ones of rep, seq, tray and well are filled in.
+        """
+        date = date or datetime.date.today()
+        dates = {f"date{i}": date.strftime(date_format) for i, date_format in enumerate(self.date_formats)}
+        needs_position = "well" in self.tokens or "tray" in self.tokens
+
+        # id(group) -> [format of the group's names (or the fixed name), injections so far]
+        group_formats = {}
+        tray = well = ""
+        for seq, (group, position) in enumerate(injections, start=1):
+            state = group_formats.get(id(group))
+            if state is None:
+                values = {
+                    "name": group["name"],
+                    "prefix": group.get("prefix", ""),
+                    "sample": group.get("sample", group["name"]),
+                    "type": sample_type(group),
+                    **dates,
+                }
+                state = group_formats[id(group)] = [self._group_format(values), 0]
+            state[1] += 1
+            group_format = state[0]
+            if group_format.__class__ is str:
+                yield group_format
+                continue
+            if needs_position:
+                tray, well = position.split(":", 1)
+            yield group_format(state[1], seq, tray, well)
+
+
+def check_unique(rows, duplicates):
+    """Pass queue rows through, appending repeated File Names to ``duplicates``.
+
+    Xcalibur silently overwrites the raw file of an earlier injection with the
+    same name, so callers warn about anything collected here.
+    """
+    seen = set()
+    for row in rows:
+        if row[0] in seen:
+            duplicates.append(row[0])
+        else:
+            seen.add(row[0])
+        yield row
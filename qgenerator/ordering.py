@@ -0,0 +1,205 @@
+"""Injection ordering that shortens autosampler needle travel.
+
+Sits between injection collection and row writing: takes the
+``(group, position)`` sequence from ``queue.iter_injections`` and returns
+it reordered. Wells are placed in millimetres using the plate pitch, with
+the four trays side by side, so a tray change costs the distance between
+trays. The tour is built greedily (nearest neighbour) and then improved
+with a windowed 2-opt pass.
+"""
+import math
+
+from .plate import TRAYS, split_position
+
+# Well-to-well pitch per plate format and distance between neighbouring tray origins
+PITCH_MM = {"96-well": 9.0, "384-well": 4.5, "1536-well": 2.25}
+TRAY_SPACING_MM = 130.0
+
+_TRAY_BY_PREFIX = {tray[0]: number for number, tray in enumerate(TRAYS)}
+
+
+def injection_points(campaign, injections):
+    # (x, y) needle position in mm of every injection
+    points = []
+    for group, position in injections:
+        prefix, well = split_position(position)
+        tray_number = _TRAY_BY_PREFIX[prefix.upper()]
+        plate_format = campaign.plate(TRAYS[tray_number]).format
+        pitch = PITCH_MM.get(plate_format.name, 9.0)
+        row, col = plate_format.coords(well)
+        points.append((tray_number * TRAY_SPACING_MM + col * pitch, row * pitch))
+    return points
+
+
+def path_length(points):
+    return sum(math.dist(points[i], points[i + 1]) for i in range(len(points) - 1))
+
+
+def tray_changes(injections):
+    return sum(1 for i in range(1, len(injections))
+               if injections[i][1].split(":", 1)[0] != injections[i - 1][1].split(":", 1)[0])
+
+
+class TravelReport:
+    """Estimated needle travel before and after reordering."""
+
+    def __init__(self, before_mm, after_mm, tray_changes_before, tray_changes_after):
+        self.before_mm = before_mm
+        self.after_mm = after_mm
+        self.tray_changes_before = tray_changes_before
+        self.tray_changes_after = tray_changes_after
+
+    @property
+    def saved_mm(self):
+        return self.before_mm - self.after_mm
+
+    def __str__(self):
+        percent = 100 * self.saved_mm / self.before_mm if self.before_mm else 0.0
+        return (f"Needle travel {self.before_mm / 1000:.2f} m -> {self.after_mm / 1000:.2f} m "
+                f"(saved {self.saved_mm / 1000:.2f} m, {percent:.0f}%), "
+                f"tray changes {self.tray_changes_before} -> {self.tray_changes_after}")
+
+
+def _serpentine(members, points):
+    # Visit a group's wells row by row, alternating direction
+    rows = {}
+    for member in members:
+        rows.setdefault(points[member][1], []).append(member)
+    ordered = []
+    for number, y in enumerate(sorted(rows)):
+        ordered.extend(sorted(rows[y], key=lambda member: points[member][0], reverse=number % 2 == 1))
+    return ordered
+
+
+def _ring(cx, cy, radius):
+    # The grid cells at Chebyshev distance radius from cell (cx, cy)
+    if radius == 0:
+        yield cx, cy
+        return
+    for x in range(cx - radius, cx + radius + 1):
+        yield x, cy - radius
+        yield x, cy + radius
+    for y in range(cy - radius + 1, cy + radius):
+        yield cx - radius, y
+        yield cx + radius, y
+
+
+def _nearest_neighbour(units, entry, exit_):
+    # Greedy tour over units starting with the first one; a unit may be walked backwards.
+    # The unit ends are bucketed in a grid of about one end per cell, so each step only looks at
+    # the cells around the needle, widening ring by ring until nothing closer can be left.
+    xs = [point[0] for point in entry + exit_]
+    ys = [point[1] for point in entry + exit_]
+    size = max(math.sqrt((max(xs) - min(xs) + 1) * (max(ys) - min(ys) + 1) / len(units)), 1e-6)
+
+    def cell_of(point):
+        return int(point[0] // size), int(point[1] // size)
+
+    # Cell -> {(unit, walked backwards)}
+    cells = {}
+    for unit in range(1, len(units)):
+        cells.setdefault(cell_of(entry[unit]), set()).add((unit, False))
+        if exit_[unit] is not entry[unit]:
+            cells.setdefault(cell_of(exit_[unit]), set()).add((unit, True))
+
+    def nearest(here):
+        # Ties go to the lowest unit, then forwards, whatever cell they are in
+        cx, cy = cell_of(here)
+        best = None
+        radius = 0
+        while True:
+            everything = 8 * radius >= len(cells)  # Cheaper to look at every occupied cell
+            if everything:
+                ends = [end for ends in cells.values() for end in ends]
+            else:
+                ends = [end for key in _ring(cx, cy, radius) for end in cells.get(key, ())]
+            for unit, flipped in ends:
+                candidate = (math.dist(here, exit_[unit] if flipped else entry[unit]), unit, flipped)
+                if best is None or candidate < best:
+                    best = candidate
+            # Ends outside the rings seen so far are more than radius cells away
+            if everything or (best is not None and best[0] <= radius * size):
+                return best
+            radius += 1
+
+    tour = [(0, False)]
+    here = exit_[0]
+    for _ in range(len(units) - 1):
+        _distance, best, flipped = nearest(here)
+        for end, point in (((best, False), entry[best]), ((best, True), exit_[best])):
+            ends = cells.get(cell_of(point))
+            if ends is not None:
+                ends.discard(end)
+                if not ends:
+                    del cells[cell_of(point)]
+        tour.append((best, flipped))
+        here = entry[best] if flipped else exit_[best]
+    return tour
+
+
+def _two_opt(tour, entry, exit_, window, passes):
+    # Reverse tour segments (flipping the units in them) while that shortens the path.
+    # heads/tails hold where the needle enters and leaves each step of the tour.
+    heads = [exit_[unit] if flipped else entry[unit] for unit, flipped in tour]
+    tails = [entry[unit] if flipped else exit_[unit] for unit, flipped in tour]
+    dist = math.dist
+    n = len(tour)
+    for _ in range(passes):
+        improved = False
+        for i in range(n - 2):
+            a, b = tails[i], heads[i + 1]
+            ab = dist(a, b)
+            for j in range(i + 2, min(n, i + 2 + window)):
+                c = tails[j]
+                if j + 1 < n:
+                    d = heads[j + 1]
+                    delta = dist(a, c) + dist(b, d) - ab - dist(c, d)
+                else:
+                    delta = dist(a, c) - ab
+                if delta < -1e-9:
+                    tour[i + 1:j + 1] = [(unit, not flipped) for unit, flipped in reversed(tour[i + 1:j + 1])]
+                    heads[i + 1:j + 1], tails[i + 1:j + 1] = tails[j:i:-1], heads[j:i:-1]
+                    b = heads[i + 1]
+                    ab = dist(a, b)
+                    improved = True
+        if not improved:
+            break
+    return tour
+
+
+def optimize_travel(campaign, injections, keep_groups=False, window=60, passes=3):
+    """Reorder injections to shorten needle travel.
+
+    With ``keep_groups`` the wells of each group (its replicates) stay
+    consecutive and only the order of groups changes. The first injection
+    stays first, and the original order is kept if no shorter one is
+    found. Returns ``(ordered injections, TravelReport)``.
+    """
+    injections = list(injections)
+    if len(injections) < 3:
+        return injections, TravelReport(0.0, 0.0, 0, 0)
+    points = injection_points(campaign, injections)
+
+    if keep_groups:
+        members_by_group = {}
+        for number, (group, _position) in enumerate(injections):
+            members_by_group.setdefault(id(group), []).append(number)
+        units = [_serpentine(members, points) for members in members_by_group.values()]
+    else:
+        units = [[number] for number in range(len(injections))]
+    entry = [points[unit[0]] for unit in units]
+    exit_ = [points[unit[-1]] for unit in units]
+
+    tour = _nearest_neighbour(units, entry, exit_)
+    tour = _two_opt(tour, entry, exit_, window, passes)
+
+    order = []
+    for unit, flipped in tour:
+        order.extend(reversed(units[unit]) if flipped else units[unit])
+    before = path_length(points)
+    after = path_length([points[number] for number in order])
+    if after >= before:
+        # The heuristics found nothing better, keep the order as added
+        return injections, TravelReport(before, before, tray_changes(injections), tray_changes(injections))
+    ordered = [injections[number] for number in order]
+    return ordered, TravelReport(before, after, tray_changes(injections), tray_changes(ordered))
@@ -0,0 +1,53 @@
+"""Checks of the data paths a queue writes to.
+
+``check_outputs`` looks at the disk, so the GUI runs it on a worker
+thread with copies of the groups. It reports data paths that do not
+exist and raw files that are already there under a name the queue
+would use again, since the acquisition software overwrites (or refuses
+to start on) an existing raw file. It takes the injections in the order
+the queue is written, after travel optimization and the run order, since
+``{seq}`` and ``{rep}`` in a file name template depend on that order.
+"""
+import os
+
+# Raw data of Xcalibur, MassHunter and Analyst acquisitions
+RAW_EXTENSIONS = (".raw", ".d", ".wiff")
+
+
+def check_outputs(injections, template=None, date=None):
+    """Problems per group of the ``(group, position)`` injections.
+
+    Returns ``{group id: [message, ...]}`` for the groups that have any.
+    """
+    injections = list(injections)
+    if template is None:
+        names = (group["name"] for group, _position in injections)
+    else:
+        names = template.render(injections, date)
+    by_path = {}
+    for (group, _position), name in zip(injections, names):
+        path = group.get("path", "").strip()
+        if path:
+            by_path.setdefault(path, {}).setdefault(group["id"], {})[name] = None
+
+    problems = {}
+    for path, groups_names in by_path.items():
+        try:
+            with os.scandir(path) as entries:
+                existing = {entry.name.lower() for entry in entries}
+        except FileNotFoundError:
+            for group_id in groups_names:
+                problems.setdefault(group_id, []).append(f"data path does not exist: {path}")
+            continue
+        except OSError as error:
+            for group_id in groups_names:
+                problems.setdefault(group_id, []).append(f"data path cannot be read: {error.strerror or error}")
+            continue
+        for group_id, group_names in groups_names.items():
+            found = [name + extension for name in group_names for extension in RAW_EXTENSIONS
+                     if (name + extension).lower() in existing]
+            if found:
+                more = f" and {len(found) - 3} more" if len(found) > 3 else ""
+                problems.setdefault(group_id, []).append(f"raw files already in the data path: "
+                                                         f"{', '.join(found[:3])}{more}")
+    return problems
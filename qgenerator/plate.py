@@ -0,0 +1,222 @@
+"""Plate formats, well naming, occupancy and tray position strings.
+
+Pure Python on purpose: nothing in here may import Qt or pandas so the
+queue engine can run from scripts without starting a QApplication.
+"""
+import string
+from array import array
+
+
+# Autosampler trays in the order they appear in the GUI combo box
+TRAYS = ("Red", "Green", "Blue", "Yellow")
+
+# Group id stored in PlateModel.owner for wells that belong to no group
+FREE = -1
+
+
+def row_label(row):
+    # 0 -> "A", 25 -> "Z", 26 -> "AA", ... (1536-well plates run to "AF")
+    label = ""
+    row += 1
+    while row:
+        row, remainder = divmod(row - 1, 26)
+        label = string.ascii_uppercase[remainder] + label
+    return label
+
+
+def iter_bits(mask):
+    # Indices of the set bits of mask, lowest first (row-major well order)
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class PlateFormat:
+    """Geometry of a microplate and its precomputed well lookup tables."""
+
+    def __init__(self, name, n_rows, n_cols):
+        self.name = name
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.size = n_rows * n_cols
+        self.row_labels = [row_label(row) for row in range(n_rows)]
+        self.col_labels = [str(col + 1) for col in range(n_cols)]
+
+        # Row-major well names, coordinates and the reverse lookup, built once per format
+        self.well_names = [f"{row}{col}" for row in self.row_labels for col in self.col_labels]
+        self.well_index = {well: index for index, well in enumerate(self.well_names)}
+        self.well_rows = array("H", (index // n_cols for index in range(self.size)))
+        self.well_cols = array("H", (index % n_cols for index in range(self.size)))
+        self.full_mask = (1 << self.size) - 1
+
+    def __repr__(self):
+        return f"PlateFormat({self.name!r}, {self.n_rows}, {self.n_cols})"
+
+    def index(self, row, col):
+        return row * self.n_cols + col
+
+    def well_name(self, row, col):
+        return self.well_names[row * self.n_cols + col]
+
+    def index_of(self, well):
+        try:
+            return self.well_index[well.strip().upper()]
+        except KeyError:
+            raise ValueError(f"Well {well!r} does not exist on a {self.name} plate") from None
+
+    def coords(self, well):
+        # Convert a well name such as "B7" or "AF48" to a (row, col) pair
+        return divmod(self.index_of(well), self.n_cols)
+
+    def rect_mask(self, top, left, bottom, right):
+        # Bitmask of every well in the inclusive rectangle
+        span = ((1 << (right - left + 1)) - 1) << left
+        mask = 0
+        for row in range(top, bottom + 1):
+            mask |= span << (row * self.n_cols)
+        return mask
+
+    def expand(self, spec):
+        # Expand "A1", "A1:B3" (rectangle) or a list of those into well names
+        if isinstance(spec, (list, tuple)):
+            wells = []
+            for part in spec:
+                wells.extend(self.expand(part))
+            return wells
+        if ":" not in spec:
+            row, col = self.coords(spec)
+            return [self.well_name(row, col)]
+        first, last = spec.split(":", 1)
+        start_row, start_col = self.coords(first)
+        end_row, end_col = self.coords(last)
+        return [self.well_name(row, col)
+                for row in range(min(start_row, end_row), max(start_row, end_row) + 1)
+                for col in range(min(start_col, end_col), max(start_col, end_col) + 1)]
+
+
+PLATE_FORMATS = {
+    "96-well": PlateFormat("96-well", 8, 12),
+    "384-well": PlateFormat("384-well", 16, 24),
+    "1536-well": PlateFormat("1536-well", 32, 48),
+}
+
+
+def get_plate_format(name):
+    try:
+        return PLATE_FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown plate type {name!r}, expected one of: {', '.join(PLATE_FORMATS)}") from None
+
+
+class PlateModel:
+    """Occupancy and selection state of one plate.
+
+    ``owner`` holds the group id of every well (``FREE`` when unassigned)
+    in a preallocated integer array indexed row-major. Selections and the
+    wells of each group are kept as integer bitmasks, so selecting,
+    assigning, removing and conflict-checking a well are all O(1).
+    """
+
+    def __init__(self, plate_format):
+        self.format = plate_format
+        self.owner = array("i", [FREE]) * plate_format.size
+        self.selection = 0
+        self.occupied = 0
+        self.group_masks = {}
+
+    # Selection
+
+    def is_selected(self, index):
+        return self.selection >> index & 1
+
+    def select(self, index):
+        self.selection |= 1 << index
+
+    def deselect(self, index):
+        self.selection &= ~(1 << index)
+
+    def select_mask(self, mask):
+        self.selection |= mask
+
+    def select_rect(self, top, left, bottom, right):
+        self.selection |= self.format.rect_mask(top, left, bottom, right)
+
+    def clear_selection(self):
+        self.selection = 0
+
+    def selected_wells(self):
+        names = self.format.well_names
+        return [names[index] for index in iter_bits(self.selection)]
+
+    # Occupancy
+
+    def owner_of(self, index):
+        return self.owner[index]
+
+    def is_free(self, index):
+        return self.owner[index] == FREE
+
+    def conflicts(self, mask):
+        # Wells of mask that already belong to a group
+        return mask & self.occupied
+
+    def assign(self, mask, group_id):
+        # Assign the free wells of mask to group_id; returns the mask actually assigned
+        mask &= ~self.occupied
+        owner = self.owner
+        for index in iter_bits(mask):
+            owner[index] = group_id
+        self.occupied |= mask
+        self.group_masks[group_id] = self.group_masks.get(group_id, 0) | mask
+        return mask
+
+    def assign_selection(self, group_id):
+        # Returns (assigned mask, conflicting mask) and clears the selection
+        conflicting = self.conflicts(self.selection)
+        assigned = self.assign(self.selection, group_id)
+        self.selection = 0
+        return assigned, conflicting
+
+    def remove(self, index):
+        # Free one well and return the group it belonged to (FREE if none)
+        group_id = self.owner[index]
+        if group_id != FREE:
+            bit = 1 << index
+            self.owner[index] = FREE
+            self.occupied &= ~bit
+            remaining = self.group_masks[group_id] & ~bit
+            if remaining:
+                self.group_masks[group_id] = remaining
+            else:
+                del self.group_masks[group_id]
+        return group_id
+
+    def remove_group(self, group_id):
+        mask = self.group_masks.pop(group_id, 0)
+        owner = self.owner
+        for index in iter_bits(mask):
+            owner[index] = FREE
+        self.occupied &= ~mask
+        return mask
+
+    def group_wells(self, group_id):
+        names = self.format.well_names
+        return [names[index] for index in iter_bits(self.group_masks.get(group_id, 0))]
+
+    def clear(self):
+        self.owner = array("i", [FREE]) * self.format.size
+        self.selection = 0
+        self.occupied = 0
+        self.group_masks = {}
+
+
+def tray_prefix(tray):
+    # "Red" -> "R:", matching the Xcalibur position notation
+    return tray[0].upper() + ":"
+
+
+def split_position(position):
+    # "R:A1" -> ("R", "A1")
+    tray, well = position.split(":", 1)
+    return tray, well
@@ -0,0 +1,153 @@
+"""Opt-in timing of the GUI's hot paths.
+
+Methods decorated with ``profiled`` are timed while ``PROFILER`` is
+enabled; when it is not, the decorator costs one attribute check per
+call. Timings, item counters and event-loop stalls go to either
+
+- a Chrome trace (``.json``, open it in chrome://tracing or Perfetto),
+  streamed so that a trace cut short by a crash still loads, or
+- a rolling text log (any other extension), capped at a few MB.
+
+``QGEN_PROFILE`` turns profiling on at start-up: ``trace`` or ``log``
+writes into the default directory, anything else is taken as the path
+of the file to write.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENVIRONMENT_VARIABLE = "QGEN_PROFILE"
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+class _ChromeTrace:
+    # Trace Event Format, JSON array flavour; the closing bracket is optional for the viewers
+    def __init__(self, file_path):
+        self.file = open(file_path, "w", encoding="utf-8")
+        self.file.write("[\n")
+        self.pid = os.getpid()
+
+    def write(self, phase, name, start, duration=None, args=None):
+        event = {"name": name, "ph": phase, "ts": round(start * 1e6, 1), "pid": self.pid,
+                 "tid": threading.get_ident()}
+        if duration is not None:
+            event["dur"] = round(duration * 1e6, 1)
+        if args:
+            event["args"] = args
+        if phase == "i":
+            event["s"] = "p"
+        self.file.write(json.dumps(event, separators=(",", ":"), default=str) + ",\n")
+
+    def close(self):
+        self.file.write("{}]\n")
+        self.file.close()
+
+
+class _RollingLog:
+    def __init__(self, file_path):
+        import logging.handlers  # Only needed when profiling to a log, so not at start-up
+
+        self.logger = logging.Logger("qgenerator.profiling")
+        handler = logging.handlers.RotatingFileHandler(file_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.logger.addHandler(handler)
+
+    def write(self, phase, name, start, duration=None, args=None):
+        text = name if duration is None else f"{name} {duration * 1000:.2f} ms"
+        if args:
+            text += " " + " ".join(f"{key}={value}" for key, value in args.items())
+        self.logger.info(text)
+
+    def close(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers.clear()
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.file_path = None
+        self._sink = None
+        self._origin = time.perf_counter()
+
+    def start(self, file_path):
+        # Chrome trace for .json files, rolling log otherwise
+        self.stop()
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        sink = _ChromeTrace if file_path.lower().endswith(".json") else _RollingLog
+        self._sink = sink(file_path)
+        self.file_path = file_path
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def _now(self):
+        return time.perf_counter() - self._origin
+
+    @contextmanager
+    def span(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+        start = self._now()
+        try:
+            yield
+        finally:
+            if self._sink is not None:
+                self._sink.write("X", name, start, self._now() - start, args)
+
+    def counter(self, name, **values):
+        # Sizes worth seeing next to the timings, e.g. how many groups a refresh went through
+        if self.enabled:
+            self._sink.write("C", name, self._now(), args=values)
+
+    def stall(self, duration, **args):
+        # The event loop was blocked for `duration` seconds, up to now
+        if self.enabled:
+            self._sink.write("X", "event loop stall", self._now() - duration, duration, args)
+
+
+PROFILER = Profiler()
+
+
+def profiled(function):
+    # Time every call while PROFILER is enabled
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return function(*args, **kwargs)
+        with PROFILER.span(name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def profile_path(directory, kind):
+    extension = ".json" if kind == "trace" else ".log"
+    return os.path.join(directory, f"qgen-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{extension}")
+
+
+def start_from_environment(directory):
+    """Start PROFILER if ``QGEN_PROFILE`` asks for it; returns the file written, or None."""
+    setting = os.environ.get(ENVIRONMENT_VARIABLE, "").strip()
+    if not setting or setting == "0":
+        return None
+    if setting.lower() in ("1", "trace", "log"):
+        file_path = profile_path(directory, "log" if setting.lower() == "log" else "trace")
+    else:
+        file_path = setting
+    PROFILER.start(file_path)
+    return file_path
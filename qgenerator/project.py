@@ -0,0 +1,284 @@
+"""Project files and the autosave journal.
+
+A project file is compact JSON: the plate type of every tray, the sample
+groups with their wells stored as a hex bitmask, and a free-form
+``settings`` dict for the GUI. Loading assigns each group's mask in one
+step, so even four full 1536-well trays load in milliseconds.
+
+The journal is an append-only log next to an open project. It starts
+with a snapshot of the campaign and then gets one line per edit (see
+``Campaign._log``). Lines are written and synced by a background thread,
+so recording an edit never waits for the disk. A new snapshot replaces
+the journal by renaming a synced file over it, never by rewriting it in
+place. ``replay_journal``
+rebuilds the campaign after a crash and skips a half-written last line.
+While a journal is open its session holds a lock on a ``.lock`` file
+next to it; the system drops the lock when the session ends, however it
+ends, so ``journal_in_use`` tells a crashed session's journal from the
+live journal of another running window.
+"""
+import json
+import os
+import queue
+import threading
+
+from .campaign import Campaign
+from .exports import ExportRecord
+from .plate import get_plate_format
+
+PROJECT_VERSION = 1
+PROJECT_EXTENSION = ".qgen"
+
+# The journal is rewritten as a single snapshot once it has this many edits
+COMPACT_AFTER = 2000
+LOCK_SUFFIX = ".lock"
+
+
+def group_record(campaign, group):
+    # Every key except the positions, which the well mask replaces
+    record = {key: value for key, value in group.items() if key != "positions"}
+    record["wells"] = format(campaign.plate(group["tray"]).group_masks.get(group["id"], 0), "x")
+    return record
+
+
+def campaign_record(campaign):
+    record = {
+        "plate": campaign.default_format.name,
+        "trays": {tray: model.format.name for tray, model in campaign.plates.items()},
+        "next_group_id": campaign.next_group_id,
+        "groups": [group_record(campaign, group) for group in campaign.sample_groups],
+    }
+    if campaign.exported:
+        record["exported"] = campaign.exported.rows
+    return record
+
+
+def _place_record(campaign, record, row=None):
+    group = dict(record)
+    try:
+        mask = int(group.pop("wells"), 16)
+        group_id, tray = group["id"], group["tray"]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Malformed group in project: {record!r}") from None
+    if campaign.place_group(group, mask, row) is None:
+        raise ValueError(f"Group {group.get('name', group_id)} has no free wells left on the {tray} tray")
+    return group
+
+
+def campaign_from_record(record):
+    campaign = Campaign(get_plate_format(record.get("plate", "96-well")))
+    for tray, plate_type in record.get("trays", {}).items():
+        campaign.set_plate_format(tray, get_plate_format(plate_type))
+    for group in record.get("groups", []):
+        _place_record(campaign, group)
+    campaign.next_group_id = max(campaign.next_group_id, record.get("next_group_id", 0))
+    campaign.exported = ExportRecord(record.get("exported"))
+    return campaign
+
+
+def dump_project(campaign, f, settings=None, default=None):
+    # default converts values JSON can't store, e.g. the GUI's QColors
+    json.dump({"version": PROJECT_VERSION, "settings": settings or {}, **campaign_record(campaign)}, f,
+              separators=(",", ":"), default=default)
+
+
+def save_project(campaign, file_path, settings=None, default=None):
+    # Written next to the target and renamed over it, so a failed save keeps the old file
+    temporary = file_path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        dump_project(campaign, f, settings, default)
+    os.replace(temporary, file_path)
+
+
+def load_project(file_path):
+    """Read a project file; returns ``(campaign, settings)``."""
+    with open(file_path, encoding="utf-8") as f:
+        try:
+            record = json.load(f)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"{file_path} is not a project file: {error}") from None
+    if not isinstance(record, dict) or record.get("version", 0) > PROJECT_VERSION:
+        raise ValueError(f"{file_path} is not a project file this version can read")
+    return campaign_from_record(record), record.get("settings", {})
+
+
+def apply_edit(campaign, edit, args):
+    # Repeat one journaled Campaign edit
+    if edit == "add_group":
+        _place_record(campaign, *args)
+    elif edit == "add_wells":
+        campaign.add_wells(args[0], int(args[1], 16))
+    elif edit == "edit_group":
+        campaign.edit_group(args[0], **args[1])
+    elif edit == "remove_well":
+        campaign.remove_well(*args)
+    elif edit == "remove_group":
+        campaign.remove_group(*args)
+    elif edit == "set_plate_format":
+        campaign.set_plate_format(args[0], get_plate_format(args[1]))
+    elif edit == "move_to_end":
+        campaign.move_to_end(args[0])
+    elif edit == "record_export":
+        campaign.record_export(*args)
+    elif edit == "clear":
+        campaign.clear()
+    else:
+        raise ValueError(f"Unknown journal entry {edit!r}")
+
+
+def replay_journal(file_path):
+    """Rebuild the campaign of a journal; returns ``(campaign, settings, edits)``.
+
+    ``edits`` counts the entries after the last snapshot, so 0 means the
+    journal holds nothing that a saved project does not.
+    """
+    campaign, settings, edits = None, {}, 0
+    with open(file_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                edit, *args = json.loads(line)
+            except ValueError:
+                break  # Cut short by the crash
+            if edit == "snapshot":
+                campaign = campaign_from_record(args[0])
+                settings, edits = args[0].get("settings", {}), 0
+            elif campaign is not None:
+                apply_edit(campaign, edit, args)
+                edits += 1
+    if campaign is None:
+        raise ValueError(f"{file_path} holds no snapshot to replay")
+    return campaign, settings, edits
+
+
+def _lock_file(file_path):
+    # Open file_path and lock it for this process; raises OSError when another process holds the lock
+    f = open(file_path, "w")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        raise
+    return f
+
+
+def journal_in_use(file_path):
+    # True while the session that writes the journal is still running
+    lock_path = file_path + LOCK_SUFFIX
+    if not os.path.exists(lock_path):
+        return False
+    try:
+        _lock_file(lock_path).close()
+    except OSError:
+        return True
+    return False
+
+
+def remove_journal_lock(file_path):
+    try:
+        os.remove(file_path + LOCK_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def remove_journal(file_path):
+    # Along with a snapshot a crash kept from being renamed over it
+    for path in (file_path, file_path + ".tmp"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    remove_journal_lock(file_path)
+
+
+class Journal:
+    """Append-only autosave log of a campaign's edits.
+
+    Attaching the journal sets ``campaign.journal``; ``close`` detaches it
+    and waits for the writer thread, removing the file when asked to.
+    """
+
+    def __init__(self, file_path, campaign, settings=None, default=None):
+        self.file_path = file_path
+        self._lock = _lock_file(file_path + LOCK_SUFFIX)
+        self.campaign = campaign
+        self.settings = settings or {}
+        self.default = default
+        self.edits = 0
+        self._lines = queue.Queue()
+        self._writer = threading.Thread(target=self._write_lines, name="qgen-journal", daemon=True)
+        self._writer.start()
+        self.snapshot()
+        campaign.journal = self
+
+    def _encode(self, entry):
+        return json.dumps(entry, separators=(",", ":"), default=self.default) + "\n"
+
+    def record(self, edit, *args):
+        # Serialized right away, since the group dicts keep changing after the edit
+        if edit == "add_group":
+            args = (group_record(self.campaign, args[0]), *args[1:])
+        self._lines.put((False, self._encode([edit, *args])))
+        self.edits += 1
+        if self.edits >= COMPACT_AFTER:
+            self.snapshot()
+
+    def snapshot(self, settings=None):
+        # Start the journal over from the current state, e.g. after the project was saved
+        if settings is not None:
+            self.settings = settings
+        record = dict(campaign_record(self.campaign), settings=self.settings)
+        self._lines.put((True, self._encode(["snapshot", record])))
+        self.edits = 0
+
+    def _write_lines(self):
+        f = None
+        try:
+            while True:
+                # Write whatever has queued up, then sync once
+                batch = [self._lines.get()]
+                while not self._lines.empty():
+                    batch.append(self._lines.get_nowait())
+                for item in batch:
+                    if item is None:
+                        break
+                    restart, line = item
+                    if restart:
+                        if f is not None:
+                            f.close()
+                        self._replace(line)
+                        f = open(self.file_path, "a", encoding="utf-8")
+                    else:
+                        f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                if item is None:
+                    return
+        finally:
+            if f is not None:
+                f.close()
+
+    def _replace(self, snapshot):
+        # The new snapshot is synced next to the journal and renamed over it, so a crash at any point
+        # leaves either the old journal or the new one
+        temporary = self.file_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.file_path)
+
+    def close(self, remove=False):
+        if self.campaign.journal is self:
+            self.campaign.journal = None
+        self._lines.put(None)
+        self._writer.join()
+        self._lock.close()
+        if remove:
+            remove_journal(self.file_path)
+        else:
+            remove_journal_lock(self.file_path)
@@ -0,0 +1,45 @@
+"""Turn sample groups into Xcalibur queue rows.
+
+Export runs in stages: ``iter_injections`` collects ``(group, position)``
+pairs from the groups, optional stages reorder that sequence (see
+``ordering``), and ``iter_rows`` turns it into CSV rows for a writer.
+File names are the group names unless a ``naming.NameTemplate`` is given.
+With ``details``, rows also carry the ``DETAIL_COLUMNS`` some worklist
+formats need (see ``worklists``).
+"""
+import itertools
+
+from .groups import sample_type
+
+QUEUE_COLUMNS = ("File Name", "Position", "Inj Vol", "Instrument Method", "Path")
+DETAIL_COLUMNS = ("Sample Type", "Sample ID", "Comment")
+
+
+def iter_injections(sample_groups):
+    # One (group, position) pair per well, in group order and then in well order
+    for group in sample_groups:
+        for position in group["positions"]:
+            yield group, position
+
+
+def iter_rows(injections, default_method="", default_path="", template=None, date=None, details=False):
+    names = None
+    if template is not None:
+        # Names are rendered in lockstep from a second view of the same injections
+        injections, named = itertools.tee(injections)
+        names = template.render(named, date)
+    for group, position in injections:
+        name = group["name"] if names is None else next(names)
+        row = (name, position, group.get("inj_vol", ""), group.get("instrument_method", default_method),
+               group.get("path", default_path))
+        if details:
+            row += (sample_type(group), group.get("sample") or group["name"], group.get("comment", ""))
+        yield row
+
+
+def iter_queue_rows(sample_groups, default_method="", default_path=""):
+    return iter_rows(iter_injections(sample_groups), default_method, default_path)
+
+
+def build_queue(sample_groups, default_method="", default_path=""):
+    return list(iter_queue_rows(sample_groups, default_method, default_path))
@@ -0,0 +1,97 @@
+"""Run orders: seeded randomization, blocking and blank/QC interleaving.
+
+Works on the ``(group, position)`` injection sequence of
+``queue.iter_injections``. Wells of groups whose ``sample_type`` is
+``Blank`` or ``QC`` are the designated blank and QC wells: when an
+interval is set they are taken out of the sample order and injected
+every N samples, cycling through the designated wells. Everything is
+driven by one ``random.Random(seed)`` so an order can be regenerated
+exactly from its seed.
+"""
+import itertools
+import random
+
+from .groups import sample_type
+
+RUN_ORDERS = ("As added", "Randomized", "Randomized groups", "Block-randomized")
+
+
+def _by_group(injections):
+    groups = {}
+    for injection in injections:
+        groups.setdefault(id(injection[0]), []).append(injection)
+    return list(groups.values())
+
+
+def _blocks(injections, rng):
+    # Block k holds the k-th injection of every group, shuffled within the block
+    members = _by_group(injections)
+    ordered = []
+    for k in range(max(map(len, members), default=0)):
+        block = [group[k] for group in members if k < len(group)]
+        rng.shuffle(block)
+        ordered.extend(block)
+    return ordered
+
+
+def _interleave(samples, blank_every, blanks, qc_every, qcs, bracket):
+    # After every N samples inject the next designated blank (then QC), cycling through their wells
+    blank_wells = itertools.cycle(blanks) if blank_every and blanks else None
+    qc_wells = itertools.cycle(qcs) if qc_every and qcs else None
+    if blank_wells is None and qc_wells is None:
+        return samples
+
+    ordered = []
+    if bracket:
+        ordered.extend(next(wells) for wells in (blank_wells, qc_wells) if wells)
+    last = len(samples)
+    for number, injection in enumerate(samples, start=1):
+        ordered.append(injection)
+        if number == last:
+            break
+        if blank_wells and number % blank_every == 0:
+            ordered.append(next(blank_wells))
+        if qc_wells and number % qc_every == 0:
+            ordered.append(next(qc_wells))
+    if bracket:
+        ordered.extend(next(wells) for wells in (qc_wells, blank_wells) if wells)
+    return ordered
+
+
+def run_order(injections, order="As added", seed=None, blank_every=0, qc_every=0, bracket=False):
+    """Build a run order; returns ``(ordered injections, seed)``.
+
+    A ``seed`` of None draws a fresh one, which is returned so the same
+    order can be rebuilt later. ``bracket`` also runs a blank/QC before
+    the first and after the last sample. With nothing to reorder or
+    interleave, ``injections`` is returned as it is, so an iterator
+    still streams; otherwise the result is a list.
+    """
+    if order not in RUN_ORDERS:
+        raise ValueError(f"Unknown run order {order!r}, expected one of: {', '.join(RUN_ORDERS)}")
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if order == RUN_ORDERS[0] and not blank_every and not qc_every:
+        return injections, seed
+    rng = random.Random(seed)
+
+    samples, blanks, qcs = [], [], []
+    for injection in injections:
+        kind = sample_type(injection[0])
+        if kind == "Blank" and blank_every:
+            blanks.append(injection)
+        elif kind == "QC" and qc_every:
+            qcs.append(injection)
+        else:
+            samples.append(injection)
+
+    if order == "Randomized":
+        rng.shuffle(samples)
+    elif order == "Randomized groups":
+        members = _by_group(samples)
+        rng.shuffle(members)
+        samples = [injection for group in members for injection in group]
+    elif order == "Block-randomized":
+        samples = _blocks(samples, rng)
+
+    return _interleave(samples, blank_every, blanks, qc_every, qcs, bracket), seed
@@ -0,0 +1,97 @@
+"""Differential drag selection over a plate.
+
+A drag only reports the wells whose state changed since the previous
+hovered cell, so the GUI can (de)select just those instead of re-marking
+the whole rectangle on every mouse move.
+"""
+from .plate import iter_bits
+
+SELECTION_MODES = ("Rectangle", "Rows", "Columns", "Checkerboard", "Interleaved")
+
+_pattern_cache = {}
+
+
+def _pattern(plate_format, mode, row_parity, col_parity):
+    # Plate-wide masks for the patterned modes, built once per format
+    key = (plate_format.name, mode, row_parity, col_parity)
+    mask = _pattern_cache.get(key)
+    if mask is None:
+        mask = 0
+        for index in range(plate_format.size):
+            row, col = plate_format.well_rows[index], plate_format.well_cols[index]
+            if mode == "Checkerboard":
+                keep = (row + col) % 2 == (row_parity + col_parity) % 2
+            else:
+                keep = row % 2 == row_parity and col % 2 == col_parity
+            if keep:
+                mask |= 1 << index
+        _pattern_cache[key] = mask
+    return mask
+
+
+def shape_mask(plate_format, mode, start_cell, end_cell):
+    # Wells covered by a drag from start_cell to end_cell in the given mode
+    (start_row, start_col), (end_row, end_col) = start_cell, end_cell
+    top, bottom = min(start_row, end_row), max(start_row, end_row)
+    left, right = min(start_col, end_col), max(start_col, end_col)
+    if mode == "Rows":
+        left, right = 0, plate_format.n_cols - 1
+    elif mode == "Columns":
+        top, bottom = 0, plate_format.n_rows - 1
+    mask = plate_format.rect_mask(top, left, bottom, right)
+    if mode in ("Checkerboard", "Interleaved"):
+        # Patterns are anchored on the start cell so it is always included
+        mask &= _pattern(plate_format, mode, start_row % 2, start_col % 2)
+    return mask
+
+
+class RubberBand:
+    """One drag selection, applied on top of the selection it started from.
+
+    Starting on an unselected well selects the dragged shape; starting on
+    a selected well erases it instead. Wells in ``exclude`` (for example
+    wells that already belong to a group) are never touched.
+    """
+
+    def __init__(self, plate_format, start_cell, base=0, exclude=0, mode="Rectangle"):
+        if mode not in SELECTION_MODES:
+            raise ValueError(f"Unknown selection mode {mode!r}")
+        self.format = plate_format
+        self.mode = mode
+        self.start_cell = start_cell
+        self.end_cell = None
+        self.base = base
+        self.exclude = exclude
+        self.erase = bool(base >> plate_format.index(*start_cell) & 1)
+        self.shape = 0
+
+    def move(self, end_cell):
+        # Returns (added, removed) selection masks, or None when the hovered cell did not change
+        if end_cell == self.end_cell:
+            return None
+        self.end_cell = end_cell
+        old_shape = self.shape
+        self.shape = shape_mask(self.format, self.mode, self.start_cell, end_cell) & ~self.exclude
+        grown = self.shape & ~old_shape
+        shrunk = old_shape & ~self.shape
+        if self.erase:
+            return shrunk & self.base, grown & self.base
+        return grown & ~self.base, shrunk & ~self.base
+
+    def selection(self):
+        return self.base & ~self.shape if self.erase else self.base | self.shape
+
+
+def row_runs(plate_format, mask):
+    # Split mask into (row, first col, last col) runs of adjacent wells
+    runs = []
+    n_cols = plate_format.n_cols
+    current = None
+    for index in iter_bits(mask):
+        row, col = divmod(index, n_cols)
+        if current and current[0] == row and current[2] == col - 1:
+            current[2] = col
+        else:
+            current = [row, col, col]
+            runs.append(current)
+    return [tuple(run) for run in runs]
@@ -0,0 +1,166 @@
+"""Live checks of a queue's sample groups.
+
+``ValidationIndex`` keeps hash indexes from well position, file name,
+instrument method and data path to the groups using them. Adding, editing
+or removing a group only touches that group's entries, so an edit costs
+O(wells of the group) however large the queue is, and the indexes always
+know which wells are claimed twice, which file names would overwrite each
+other and which groups lack a method or path.
+
+File names are checked for the groups as laid out, one injection per
+well. Run orders that inject Blank or QC wells again are checked when
+the queue is written (see ``naming.check_unique``).
+"""
+
+
+class _UsageIndex:
+    # key -> {group id: uses}, tracking the keys used more than once
+    def __init__(self):
+        self.users = {}
+        self.totals = {}
+        self.clashes = set()
+
+    def add(self, key, group_id, changed):
+        users = self.users.setdefault(key, {})
+        users[group_id] = users.get(group_id, 0) + 1
+        total = self.totals[key] = self.totals.get(key, 0) + 1
+        if total == 2:
+            # Every group already using the key has just gained an error
+            self.clashes.add(key)
+            changed.update(users)
+
+    def remove(self, key, group_id, changed):
+        users = self.users[key]
+        total = self.totals[key] - 1
+        if total == 1:
+            self.clashes.discard(key)
+            changed.update(users)
+        users[group_id] -= 1
+        if not users[group_id]:
+            del users[group_id]
+        if total:
+            self.totals[key] = total
+        else:
+            del self.users[key], self.totals[key]
+
+    def clashing(self, key):
+        return self.totals.get(key, 0) > 1
+
+
+class ValidationIndex:
+    def __init__(self, groups=(), template=None):
+        self.rebuild(groups, template)
+
+    def rebuild(self, groups, template=None):
+        # Start over, e.g. after the file name template or a whole tray changed
+        self.template = template
+        self.wells = _UsageIndex()      # "R:A1" -> groups listing the position
+        self.names = _UsageIndex()      # file name -> groups injecting under it
+        self.methods = {}               # instrument method -> group ids, "" for none
+        self.paths = {}                 # data path -> group ids, "" for none
+        self._entries = {}              # group id -> (positions, names, method, path) as indexed
+        self._errors = {}               # group id -> cached group_errors()
+        for group in groups:
+            self.add(group)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _file_names(self, group):
+        positions = group["positions"]
+        if self.template is None:
+            return [group["name"]] * len(positions)
+        if "seq" in self.template.tokens:
+            # The injection number makes every name unique
+            return []
+        return list(self.template.render([(group, position) for position in positions]))
+
+    def add(self, group):
+        """Index a new group; returns the ids of groups whose errors changed."""
+        group_id = group["id"]
+        if group_id in self._entries:
+            return self.update(group)
+        positions = list(group["positions"])
+        names = self._file_names(group)
+        method = group.get("instrument_method", "").strip()
+        path = group.get("path", "").strip()
+        self._entries[group_id] = (positions, names, method, path)
+
+        changed = {group_id}
+        for position in positions:
+            self.wells.add(position, group_id, changed)
+        for name in names:
+            self.names.add(name, group_id, changed)
+        self.methods.setdefault(method, set()).add(group_id)
+        self.paths.setdefault(path, set()).add(group_id)
+        self._forget(changed)
+        return changed
+
+    def remove(self, group_id):
+        """Drop a group from the indexes; returns the ids of groups whose errors changed."""
+        entry = self._entries.pop(group_id, None)
+        if entry is None:
+            return set()
+        positions, names, method, path = entry
+
+        changed = {group_id}
+        for position in positions:
+            self.wells.remove(position, group_id, changed)
+        for name in names:
+            self.names.remove(name, group_id, changed)
+        for index, key in ((self.methods, method), (self.paths, path)):
+            index[key].discard(group_id)
+            if not index[key]:
+                del index[key]
+        self._forget(changed)
+        return changed
+
+    def update(self, group):
+        # Re-index an edited group, e.g. after one of its wells was removed
+        changed = self.remove(group["id"])
+        changed |= self.add(group)
+        return changed
+
+    def _forget(self, group_ids):
+        for group_id in group_ids:
+            self._errors.pop(group_id, None)
+
+    def group_errors(self, group_id):
+        """Problems of one group as short messages, empty when it is fine."""
+        errors = self._errors.get(group_id)
+        if errors is not None:
+            return errors
+        entry = self._entries.get(group_id)
+        if entry is None:
+            return []
+        positions, names, method, path = entry
+        errors = []
+        shared = [position for position in dict.fromkeys(positions) if self.wells.clashing(position)]
+        if shared:
+            errors.append(f"wells also used by another group: {', '.join(shared)}")
+        repeated = [name for name in dict.fromkeys(names) if self.names.clashing(name)]
+        if repeated:
+            errors.append(f"file name used by several injections: {', '.join(repeated)}")
+        if not method:
+            errors.append("no instrument method")
+        if not path:
+            errors.append("no data path")
+        self._errors[group_id] = errors
+        return errors
+
+    def error_count(self):
+        return (len(self.wells.clashes) + len(self.names.clashes)
+                + ("" in self.methods) + ("" in self.paths))
+
+    def errors(self):
+        """Yield summary messages for the whole queue, ``error_count()`` of them."""
+        for position in self.wells.clashes:
+            users = len(self.wells.users[position])
+            yield (f"{position} is used by {users} groups" if users > 1
+                   else f"{position} is listed twice in one group")
+        for name in self.names.clashes:
+            yield f"File name {name} is used by {self.names.totals[name]} injections"
+        for index, what in ((self.methods, "instrument method"), (self.paths, "data path")):
+            count = len(index.get("", ()))
+            if count:
+                yield f"{count} group{'s' if count > 1 else ''} without {what}"
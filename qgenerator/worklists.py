@@ -0,0 +1,178 @@
+"""Worklist formats for the acquisition software of different vendors.
+
+Each format is a plugin: a generator turning queue rows (see
+``queue.iter_rows`` with ``details=True``) into the lines of a worklist,
+registered under a name with ``register_worklist_format``. Lines are
+written as they are produced, so every format streams like the Xcalibur
+export.
+
+``worklist_jobs`` plans the files of one export (several formats, and
+optionally one file per instrument method) and ``export_worklists``
+writes them on a thread pool.
+"""
+import csv
+import ntpath
+import os
+import re
+
+from .xcalibur import _LastLine, iter_xcalibur_lines
+
+WORKLIST_FORMATS = {}
+DEFAULT_FORMAT = "Xcalibur"
+
+
+class WorklistFormat:
+    def __init__(self, name, extension, iter_lines, encoding="utf-8"):
+        self.name = name
+        self.extension = extension
+        self.iter_lines = iter_lines
+        self.encoding = encoding
+
+    def __repr__(self):
+        return f"WorklistFormat({self.name!r}, {self.extension!r})"
+
+
+def register_worklist_format(name, extension, encoding="utf-8"):
+    # Decorator registering iter_lines(rows) as the format `name`
+    def register(iter_lines):
+        WORKLIST_FORMATS[name] = WorklistFormat(name, extension, iter_lines, encoding)
+        return iter_lines
+    return register
+
+
+def get_worklist_format(name):
+    if isinstance(name, WorklistFormat):
+        return name
+    try:
+        return WORKLIST_FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown worklist format {name!r}, expected one of: {', '.join(WORKLIST_FORMATS)}") from None
+
+
+def _iter_table_lines(header, rows, delimiter=","):
+    # One header line and one line per row, CRLF-terminated as the Windows instrument PCs expect
+    sink = _LastLine()
+    writer = csv.writer(sink, delimiter=delimiter, lineterminator="\r\n")
+    writer.writerow(header)
+    yield sink.line
+    for row in rows:
+        writer.writerow(row)
+        yield sink.line
+
+
+def _data_file(path, name, extension=""):
+    return ntpath.join(path, name + extension) if path else name + extension
+
+
+# Xcalibur keeps the platform's encoding and line endings, as the CSV export always has
+register_worklist_format("Xcalibur", ".csv", encoding=None)(iter_xcalibur_lines)
+
+
+_CHROMELEON_TYPES = {"Unknown": "Unknown", "Blank": "Blank", "QC": "Check Standard"}
+
+
+@register_worklist_format("Chromeleon", ".csv")
+def iter_chromeleon_lines(rows):
+    # Chromeleon keeps the data with the sequence, so the path is not part of the worklist
+    header = ("Name", "Type", "Position", "Inj. Vol.", "Instrument Method", "Sample ID", "Comment")
+    return _iter_table_lines(header, (
+        (name, _CHROMELEON_TYPES.get(kind, kind), position, inj_vol, method, sample_id, comment)
+        for name, position, inj_vol, method, path, kind, sample_id, comment in rows))
+
+
+_MASSHUNTER_TYPES = {"Unknown": "Sample", "Blank": "Blank", "QC": "QC"}
+
+
+@register_worklist_format("MassHunter", ".csv")
+def iter_masshunter_lines(rows):
+    header = ("Sample Name", "Sample ID", "Sample Position", "Method", "Data File", "Sample Type", "Inj Vol (ul)",
+              "Comment")
+    return _iter_table_lines(header, (
+        (name, sample_id, position, method, _data_file(path, name, ".d"), _MASSHUNTER_TYPES.get(kind, kind),
+         inj_vol, comment)
+        for name, position, inj_vol, method, path, kind, sample_id, comment in rows))
+
+
+@register_worklist_format("Analyst", ".txt")
+def iter_analyst_lines(rows):
+    # Tab-separated batch import; trays become plate positions and wells vial positions
+    header = ("Sample Name", "Sample ID", "Comments", "Acquisition Method", "Plate Position", "Vial Position",
+              "Inj. Volume (ul)", "Sample Type", "Data File")
+
+    def analyst_rows():
+        for name, position, inj_vol, method, path, kind, sample_id, comment in rows:
+            plate, _, well = position.rpartition(":")
+            yield (name, sample_id, comment, method, plate, well, inj_vol, kind, _data_file(path, name))
+    return _iter_table_lines(header, analyst_rows(), delimiter="\t")
+
+
+def write_worklist(rows, f, worklist_format=DEFAULT_FORMAT):
+    # Returns the number of injections written
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+    write = f.write
+    for line in get_worklist_format(worklist_format).iter_lines(counted()):
+        write(line)
+    return count
+
+
+def save_worklist(rows, file_path, worklist_format=DEFAULT_FORMAT):
+    worklist_format = get_worklist_format(worklist_format)
+    with open(file_path, "w", newline="", encoding=worklist_format.encoding) as f:
+        return write_worklist(rows, f, worklist_format)
+
+
+def method_label(method):
+    # "C:\methods\dda 60min.meth" -> "dda_60min", for use in a file name
+    stem = ntpath.splitext(ntpath.basename(method.rstrip("\\/")))[0]
+    return re.sub(r"[^\w.-]+", "_", stem).strip("_") or "no_method"
+
+
+def worklist_jobs(rows, file_path, formats=(DEFAULT_FORMAT,), per_method=False):
+    """Plan the files of an export; returns ``(format, file path, rows)`` triples.
+
+    One format writes to ``file_path`` itself. Several formats get the
+    format name appended (``queue_masshunter.csv``), and ``per_method``
+    splits the rows by instrument method (``queue_dda_60min.csv``), in
+    the order the methods first come up. ``rows`` must be a list when
+    it is used by more than one job.
+    """
+    formats = [get_worklist_format(name) for name in formats]
+    if not formats:
+        raise ValueError("No worklist format selected")
+    root, extension = os.path.splitext(file_path)
+
+    parts = [("", rows)]
+    if per_method:
+        by_method = {}
+        for row in rows:
+            by_method.setdefault(row[3], []).append(row)
+        labels = {}
+        parts = []
+        for method, method_rows in by_method.items():
+            label = method_label(method)
+            labels[label] = labels.get(label, 0) + 1
+            if labels[label] > 1:
+                label = f"{label}_{labels[label]}"  # Same method name in another folder
+            parts.append(("_" + label, method_rows))
+
+    jobs = []
+    for suffix, part_rows in parts:
+        for worklist_format in formats:
+            if len(formats) > 1:
+                path = f"{root}{suffix}_{worklist_format.name.lower()}{worklist_format.extension}"
+            else:
+                path = f"{root}{suffix}{extension or worklist_format.extension}"
+            jobs.append((worklist_format, path, part_rows))
+    return jobs
+
+
+def export_worklists(jobs, executor):
+    # Start writing every job on the executor; returns (file path, future of the injection count) pairs
+    return [(path, executor.submit(save_worklist, rows, path, worklist_format))
+            for worklist_format, path, rows in jobs]
@@ -0,0 +1,54 @@
+"""Xcalibur sequence CSV output.
+
+Rows are streamed from the queue builder to the file one line at a time,
+so exporting tens of thousands of injections runs in constant memory.
+The output is byte-for-byte what the old ``pandas.DataFrame.to_csv``
+export produced: a ``\\n``-terminated bracket line followed by
+``os.linesep``-terminated, minimally quoted CSV rows.
+"""
+import csv
+import os
+
+from .queue import QUEUE_COLUMNS, iter_queue_rows
+
+BRACKET_HEADER = "Bracket Type=4"
+
+
+class _LastLine:
+    # File-like sink for csv.writer that only keeps the most recent line
+    line = ""
+
+    def write(self, line):
+        self.line = line
+
+
+def iter_xcalibur_lines(rows):
+    # Detail columns of the rows (Sample Type, ...) are left out, the queue has never had them
+    yield BRACKET_HEADER + "\n"
+    sink = _LastLine()
+    writer = csv.writer(sink, lineterminator=os.linesep)
+    writer.writerow(QUEUE_COLUMNS)
+    yield sink.line
+    width = len(QUEUE_COLUMNS)
+    for row in rows:
+        writer.writerow(row[:width])
+        yield sink.line
+
+
+def write_xcalibur_csv(rows, f):
+    # Returns the number of injections written
+    count = -2  # bracket and column header lines
+    write = f.write
+    for line in iter_xcalibur_lines(rows):
+        write(line)
+        count += 1
+    return count
+
+
+def save_rows(rows, file_path):
+    with open(file_path, "w", newline="") as f:
+        return write_xcalibur_csv(rows, f)
+
+
+def save_queue(sample_groups, file_path, default_method="", default_path=""):
+    return save_rows(iter_queue_rows(sample_groups, default_method, default_path), file_path)
@@ -0,0 +1,29 @@
+import pytest
+
+# The layout behind the queue the pandas-based export wrote before the streaming writer
+BASELINE_LAYOUT = {
+    "plate": "96-well",
+    "defaults": {"prefix": "P", "inj_vol": "2", "instrument_method": "C:\\m\\a.meth", "path": "C:\\data"},
+    "groups": [
+        {"sample": "S1", "wells": "A1:B3", "tray": "Red"},
+        {"prefix": "", "sample": "we,ird \"n\"", "inj_vol": "1.5", "instrument_method": "", "path": "",
+         "tray": "blue", "wells": "D4:D6"},
+        {"prefix": "X", "sample": "S3", "inj_vol": "10", "instrument_method": "m b", "path": "p, q",
+         "tray": "Yellow", "wells": ["H12"]},
+    ],
+}
+
+
+@pytest.fixture
+def baseline_layout():
+    return BASELINE_LAYOUT
+
+
+def campaign_state(campaign):
+    # Everything that makes up a campaign: queue order, group fields, well owners, plate types and
+    # the export record. Empty trays are left out since they come and go with their first group.
+    return ([(group["id"], group["name"], group["inj_vol"], group["tray"], list(group["positions"]))
+             for group in campaign.sample_groups],
+            {tray: (model.format.name, list(model.owner)) for tray, model in campaign.plates.items()
+             if model.occupied},
+            campaign.exported.rows)
@@ -0,0 +1,18 @@
+from qgenerator import PLATE_FORMATS, Campaign
+
+
+def test_format_losses_counts_what_a_smaller_plate_drops():
+    campaign = Campaign(PLATE_FORMATS["384-well"])
+    plate_format = campaign.plate("Red").format
+    kept = campaign.add_group("Red", 0b11, "kept", "1")  # A1, A2
+    index = plate_format.index_of("K21")
+    gone = campaign.add_group("Red", 0b111 << index, "gone", "1")  # K21:K23
+    mixed = campaign.add_group("Red", (1 << plate_format.index_of("A3")) | (1 << plate_format.index_of("P24")),
+                               "mixed", "1")
+    assert campaign.format_losses("Red", PLATE_FORMATS["96-well"]) == (4, 1)
+    assert campaign.format_losses("Red", PLATE_FORMATS["1536-well"]) == (0, 0)
+    assert campaign.format_losses("Blue", PLATE_FORMATS["96-well"]) == (0, 0)
+
+    assert campaign.set_plate_format("Red", PLATE_FORMATS["96-well"]) == [gone]
+    assert kept["positions"] == ["R:A1", "R:A2"]
+    assert mixed["positions"] == ["R:A3"]
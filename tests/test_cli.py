@@ -0,0 +1,52 @@
+import io
+import json
+
+from qgenerator.cli import main
+
+
+def write_layout(tmp_path, spec):
+    file_path = tmp_path / "layout.json"
+    file_path.write_text(json.dumps(spec), encoding="utf-8")
+    return str(file_path)
+
+
+def windows_stdout():
+    # A text-mode stdout that translates "\n" to "\r\n", as it does on Windows
+    return io.TextIOWrapper(io.BytesIO(), encoding="utf-8", newline="\r\n")
+
+
+def test_stdout_matches_file_output(tmp_path, monkeypatch, baseline_layout):
+    layout = write_layout(tmp_path, baseline_layout)
+    output = tmp_path / "queue.csv"
+    assert main([layout, "-o", str(output)]) == 0
+
+    stdout = windows_stdout()
+    monkeypatch.setattr("sys.stdout", stdout)
+    assert main([layout]) == 0
+    stdout.flush()
+    assert stdout.buffer.getvalue() == output.read_bytes()
+
+
+def test_stdout_keeps_crlf_lines(tmp_path, monkeypatch, baseline_layout):
+    stdout = windows_stdout()
+    monkeypatch.setattr("sys.stdout", stdout)
+    assert main([write_layout(tmp_path, baseline_layout), "--format", "Chromeleon"]) == 0
+    stdout.flush()
+    written = stdout.buffer.getvalue()
+    assert b"\r\r\n" not in written
+    assert written.count(b"\r\n") == 11  # Header and ten injections
+
+
+def test_since_appends_only_a_group_inserted_into_the_layout(tmp_path, capsys):
+    spec = {"defaults": {"inj_vol": "1"}, "groups": [{"sample": "A", "wells": "A1"}, {"sample": "B", "wells": "A2"}]}
+    layout = write_layout(tmp_path, spec)
+    record = str(tmp_path / "queue.export.json")
+    assert main([layout, "--since", record, "-o", str(tmp_path / "queue.csv")]) == 0
+
+    spec["groups"].insert(0, {"sample": "Z", "wells": "B1"})
+    write_layout(tmp_path, spec)
+    capsys.readouterr()
+    append = tmp_path / "append.csv"
+    assert main([layout, "--since", record, "-o", str(append)]) == 0
+    assert "1 new, 0 changed and 0 removed" in capsys.readouterr().err
+    assert append.read_text(encoding="utf-8").splitlines()[2:] == ["Z,R:B1,1,,"]
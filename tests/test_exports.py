@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+from qgenerator import Campaign, iter_injections, iter_rows
+from qgenerator.exports import ExportRecord, injection_keys, load_record, save_record, write_diff
+from qgenerator.runorder import run_order
+
+
+def keyed_rows(campaign, **order):
+    injections, _seed = run_order(list(iter_injections(campaign.sample_groups)), seed=1, **order)
+    return list(zip(injection_keys(injections), iter_rows(injections, details=True)))
+
+
+def two_groups():
+    campaign = Campaign()
+    campaign.add_group("Red", 0b111, "HeLa", "1")
+    campaign.add_group("Red", 0b1 << 12, "Blank", "1", sample_type="Blank")
+    return campaign
+
+
+def test_keys_are_wells_with_repeats_numbered():
+    campaign = two_groups()
+    keys = [key for key, _row in keyed_rows(campaign, blank_every=1)]
+    assert keys == ["R:A1", "R:B1", "R:A2", "R:B1#2", "R:A3"]
+
+
+def test_only_new_changed_and_removed_injections_differ():
+    campaign = two_groups()
+    record = ExportRecord()
+    diff = record.diff(keyed_rows(campaign))
+    assert [key for key, _row, previous in diff.updated if previous is None] == ["R:A1", "R:A2", "R:A3", "R:B1"]
+    record.update(diff.updates(), diff.removed_keys())
+    assert not record.diff(keyed_rows(campaign))
+
+    campaign.remove_well("Red", 1)
+    campaign.edit_group(1, inj_vol="2")
+    campaign.add_group("Blue", 0b1, "New", "1")
+    diff = record.diff(keyed_rows(campaign))
+    assert [(key, row[2], previous and previous[2]) for key, row, previous in diff.updated] == [
+        ("R:B1", "2", "1"), ("B:A1", "1", None)]
+    assert diff.removed_keys() == ["R:A2"]
+    assert diff.rows() == [row for _key, row, _previous in diff.updated]
+    assert diff.summary().startswith("1 new, 1 changed and 1 removed")
+
+
+def test_a_new_order_alone_is_no_change():
+    campaign = two_groups()
+    record = ExportRecord()
+    record.update(dict(keyed_rows(campaign)))
+    assert not record.diff(keyed_rows(campaign, order="Randomized"))
+
+
+def test_a_group_added_before_the_others_is_only_new():
+    campaign = two_groups()
+    record = ExportRecord(dict(keyed_rows(campaign)))
+    moved = Campaign()
+    moved.add_group("Blue", 0b1, "New", "1")
+    for group in campaign.sample_groups:
+        moved.add_group(group["tray"], campaign.plate(group["tray"]).group_masks[group["id"]], group["name"], "1",
+                        sample_type=group.get("sample_type", "Unknown"))
+    diff = record.diff(keyed_rows(moved))
+    assert [(key, previous) for key, _row, previous in diff.updated] == [("B:A1", None)]
+    assert not diff.removed
+
+
+def test_record_round_trip(tmp_path):
+    file_path = str(tmp_path / "queue.export.json")
+    assert len(load_record(file_path)) == 0
+    record = ExportRecord(dict(keyed_rows(two_groups())))
+    save_record(record, file_path)
+    assert load_record(file_path).rows == record.rows
+
+
+def test_unreadable_record_is_refused(tmp_path):
+    file_path = tmp_path / "queue.export.json"
+    file_path.write_text('{"version": 99, "rows": {}}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_record(str(file_path))
+
+
+def test_diff_lists_previous_values():
+    campaign = two_groups()
+    record = ExportRecord(dict(keyed_rows(campaign)))
+    campaign.edit_group(0, inj_vol="4")
+    campaign.remove_group(1)
+    f = io.StringIO()
+    assert write_diff(record.diff(keyed_rows(campaign)), f) == 4
+    lines = f.getvalue().split("\r\n")
+    assert lines[0].startswith("Change,Injection,File Name")
+    assert lines[1] == "Changed,R:A1,HeLa,R:A1,4,,,Unknown,HeLa,,Inj Vol: 1"
+    assert lines[4] == "Removed,R:B1,Blank,R:B1,1,,,Blank,Blank,,"
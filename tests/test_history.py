@@ -0,0 +1,123 @@
+from conftest import campaign_state
+from qgenerator import PLATE_FORMATS, Campaign
+from qgenerator.history import AddGroups, Clear, EditGroup, History, RemoveWell, SetPlateFormat
+
+
+def add(campaign, history, tray, mask, name):
+    group = campaign.add_group(tray, mask, name, "1")
+    history.push(AddGroups(campaign, [group]))
+    return group
+
+
+def remove_well(campaign, history, tray, index):
+    # As the window does it: the queue row is kept for groups that lose their last well
+    group = campaign.groups_by_id[campaign.plate(tray).owner[index]]
+    row = campaign.sample_groups.index(group) if len(group["positions"]) == 1 else None
+    campaign.remove_well(tray, index)
+    history.push(RemoveWell(tray, index, group, row))
+
+
+def three_groups():
+    campaign, history = Campaign(), History()
+    for number in range(3):
+        add(campaign, history, "Red", 0b11 << (number * 12), f"G{number + 1}")
+    return campaign, history
+
+
+def round_trip(campaign, history, edit):
+    # Make the edit, then undo and redo it step by step back to either side
+    before = campaign_state(campaign)
+    steps = len(history.undo_stack)
+    edit()
+    after = campaign_state(campaign)
+    while len(history.undo_stack) > steps:
+        history.undo(campaign)
+    assert campaign_state(campaign) == before
+    while history.redo_stack:
+        history.redo(campaign)
+    assert campaign_state(campaign) == after
+    return before, after
+
+
+def test_undo_puts_a_removed_group_back_at_its_row():
+    campaign, history = three_groups()
+    first = campaign.sample_groups[0]
+
+    def remove_first():
+        remove_well(campaign, history, "Red", 0)
+        remove_well(campaign, history, "Red", 1)
+
+    round_trip(campaign, history, remove_first)
+    assert [group["name"] for group in campaign.sample_groups] == ["G2", "G3"]
+    history.undo(campaign)
+    assert [group["name"] for group in campaign.sample_groups] == ["G1", "G2", "G3"]
+    assert campaign.sample_groups[0] is first
+    assert first["positions"] == ["R:A2"]
+
+
+def test_add_and_edit_round_trip():
+    campaign, history = three_groups()
+    round_trip(campaign, history, lambda: add(campaign, history, "Blue", 0b111, "G4"))
+
+    def edit():
+        group_id = campaign.sample_groups[1]["id"]
+        previous = campaign.edit_group(group_id, inj_vol="5", name="renamed")
+        history.push(EditGroup(group_id, previous, {"inj_vol": "5", "name": "renamed"}))
+
+    before, after = round_trip(campaign, history, edit)
+    assert before[0][1][1:3] == ("G2", "1") and after[0][1][1:3] == ("renamed", "5")
+
+
+def test_clear_round_trip():
+    campaign, history = three_groups()
+    add(campaign, history, "Green", 0b1, "G4")
+
+    def clear():
+        history.push(Clear(campaign))
+        campaign.clear()
+
+    round_trip(campaign, history, clear)
+    assert campaign.sample_groups == []
+
+
+def test_smaller_plate_round_trip():
+    campaign = Campaign(PLATE_FORMATS["384-well"])
+    history = History()
+    add(campaign, history, "Red", 0b11, "kept")
+    add(campaign, history, "Red", 1 << campaign.plate("Red").format.index_of("P24"), "dropped")
+    add(campaign, history, "Red", 0b1100, "last")
+
+    def shrink():
+        history.push(SetPlateFormat(campaign, "Red", PLATE_FORMATS["96-well"]))
+        campaign.set_plate_format("Red", PLATE_FORMATS["96-well"])
+
+    before, after = round_trip(campaign, history, shrink)
+    assert [group[1] for group in after[0]] == ["kept", "last"]
+    history.undo(campaign)
+    assert [group[1] for group in campaign_state(campaign)[0]] == ["kept", "dropped", "last"]
+
+
+def test_batch_is_one_step():
+    campaign, history = three_groups()
+
+    def remove_several():
+        with history.batch():
+            for index in (0, 12, 13):
+                remove_well(campaign, history, "Red", index)
+
+    round_trip(campaign, history, remove_several)
+    assert len(history.undo_stack) == 4
+
+
+def test_import_round_trip_takes_back_new_trays():
+    campaign, history = three_groups()
+    plate_format = PLATE_FORMATS["384-well"]
+
+    def import_groups():
+        campaign.set_plate_format("Green", plate_format)
+        group = campaign.add_group("Green", 1 << plate_format.index_of("P24"), "G4", "1")
+        history.push(AddGroups(campaign, [group], {"Green": (campaign.default_format, plate_format)}))
+
+    round_trip(campaign, history, import_groups)
+    history.undo(campaign)
+    assert campaign.plate("Green").format is campaign.default_format
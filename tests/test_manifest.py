@@ -0,0 +1,45 @@
+import pytest
+
+from qgenerator import PLATE_FORMATS, Campaign
+from qgenerator.manifest import place_manifest, read_manifest
+
+
+def write_manifest(tmp_path, text):
+    file_path = tmp_path / "manifest.csv"
+    file_path.write_text(text, encoding="utf-8")
+    return str(file_path)
+
+
+def test_place_manifest_fills_free_wells_in_order(tmp_path):
+    file_path = write_manifest(tmp_path, "Sample,Inj Vol,Well\nS1,2,\nS2,2,A1\nS3,1.5,\n")
+    campaign = Campaign()
+    groups, leftover = place_manifest(campaign, read_manifest(file_path))
+    assert [group["positions"] for group in groups] == [["R:A2"], ["R:A1"], ["R:A3"]]
+    assert [group["name"] for group in campaign.sample_groups] == ["S1", "S2", "S3"]
+    assert leftover == []
+
+
+@pytest.mark.parametrize("bad_row", ["S2,lots,", "S2,2,Z99", "S2,2,A1", ""])
+def test_bad_row_places_nothing(tmp_path, bad_row):
+    # The bad row sits between good ones; none of them may be placed
+    rows = ["Sample,Inj Vol,Well", "S1,2,A1", bad_row or "S2,,", "S3,2,"]
+    file_path = write_manifest(tmp_path, "\n".join(rows) + "\n")
+    campaign = Campaign()
+    with pytest.raises(ValueError, match="Line 3"):
+        place_manifest(campaign, read_manifest(file_path), plate_format=PLATE_FORMATS["384-well"])
+    assert campaign.plates == {}
+    assert campaign.sample_groups == []
+    assert campaign.groups_by_id == {}
+    assert campaign.trays() == []
+
+
+def test_new_trays_get_the_plate_format(tmp_path):
+    # A fixed well only a 384-well plate has is placed on a tray that is still to be set up
+    file_path = write_manifest(tmp_path, "Sample,Inj Vol,Well\nS1,2,G:P24\nS2,2,\n")
+    campaign = Campaign()
+    campaign.plate("Red")
+    groups, _leftover = place_manifest(campaign, read_manifest(file_path), trays=("Red", "Green"),
+                                       plate_format=PLATE_FORMATS["384-well"])
+    assert campaign.plate("Red").format.name == "96-well"
+    assert campaign.plate("Green").format.name == "384-well"
+    assert [group["positions"] for group in groups] == [["G:P24"], ["R:A1"]]
@@ -0,0 +1,97 @@
+import os
+import random
+
+from qgenerator.methods import MethodIndex
+
+
+def make_library(root):
+    for folder, names in {"": ["HeLa_DIA_60min.meth", "notes.txt"], "dda": ["HeLa_DDA_120min.meth", "QC.meth"],
+                          "dda/old": ["dia_60.meth"], "masshunter": ["Lipids.m"]}.items():
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        for name in names:
+            open(os.path.join(root, folder, name), "w").close()
+
+
+def listed_folders(index, monkeypatch):
+    # The folders a scan lists again, rather than only looking at their modification time
+    listed = []
+    list_folder = index._list
+
+    def spy(folder, mtime):
+        listed.append(os.path.relpath(folder, index.roots[0]))
+        return list_folder(folder, mtime)
+
+    monkeypatch.setattr(index, "_list", spy)
+    return listed
+
+
+def test_scan_finds_methods_in_subfolders(tmp_path):
+    make_library(tmp_path)
+    index = MethodIndex([str(tmp_path)])
+    assert index.scan()
+    assert [os.path.relpath(path, tmp_path) for path in index.methods] == [
+        "HeLa_DIA_60min.meth", os.path.join("dda", "HeLa_DDA_120min.meth"), os.path.join("dda", "QC.meth"),
+        os.path.join("dda", "old", "dia_60.meth"), os.path.join("masshunter", "Lipids.m")]
+    assert not index.scan()
+
+
+def test_rescan_only_lists_changed_folders(tmp_path, monkeypatch):
+    make_library(tmp_path)
+    index = MethodIndex([str(tmp_path)])
+    index.scan()
+    listed = listed_folders(index, monkeypatch)
+    open(tmp_path / "dda" / "old" / "new.meth", "w").close()
+    # The folder's time may not move on a coarse clock, so make sure it does
+    mtime = os.stat(tmp_path / "dda" / "old").st_mtime_ns + 10 ** 9
+    os.utime(tmp_path / "dda" / "old", ns=(mtime, mtime))
+    assert index.scan()
+    assert listed == [os.path.join("dda", "old")]
+    assert str(tmp_path / "dda" / "old" / "new.meth") in index.methods
+
+
+def test_cache_round_trip(tmp_path, monkeypatch):
+    library = tmp_path / "library"
+    make_library(library)
+    cache = str(tmp_path / "methods.json")
+    index = MethodIndex([str(library)], cache)
+    index.scan()
+
+    cached = MethodIndex(cache_path=cache)
+    assert cached.load()
+    assert cached.roots == [str(library)] and cached.methods == index.methods
+    listed = listed_folders(cached, monkeypatch)
+    assert not cached.scan()
+    assert listed == []
+    assert not MethodIndex(cache_path=str(tmp_path / "missing.json")).load()
+
+
+def indexed(folders):
+    index = MethodIndex()
+    index._folders = {folder: [0, names, []] for folder, names in folders.items()}
+    index._collect()
+    return index
+
+
+def test_search_ranks_file_name_matches_first():
+    index = indexed({"hela60": ["QC.meth"], "methods": ["HeLa_DIA_60min.meth", "HeLa_DDA_120min.meth",
+                                                        "hela60_old.meth"]})
+    assert index.search("hela60") == [os.path.join("methods", "hela60_old.meth"),
+                                      os.path.join("methods", "HeLa_DIA_60min.meth"),
+                                      os.path.join("hela60", "QC.meth")]
+    assert sorted(index.search("meth")) == index.methods
+    assert index.search("") == index.methods
+    assert index.search("", limit=2) == index.methods[:2]
+    assert index.search("xyz") == []
+    assert index.search("Q C") == [os.path.join("hela60", "QC.meth")]
+
+
+def test_typing_on_narrows_to_the_same_results():
+    # Each keystroke filters the previous matches; the results equal a search from scratch
+    rng = random.Random(3)
+    words = ["hela", "dia", "dda", "qc", "60min", "120min", "lipid", "blank", "old"]
+    index = indexed({"methods": ["_".join(rng.sample(words, 3)) + ".meth" for _ in range(500)]})
+    for query in ("hela60", "d1m", "qcold"):
+        for end in range(1, len(query) + 1):
+            narrowed = index.search(query[:end], limit=0)
+            index._last_search = (None, None, None)
+            assert narrowed == index.search(query[:end], limit=0)
@@ -0,0 +1,42 @@
+import datetime
+
+import pytest
+
+from qgenerator.naming import NameTemplate, check_unique
+
+DATE = datetime.date(2024, 5, 6)
+
+
+def injections():
+    hela = {"id": 0, "name": "EXP_HeLa", "prefix": "EXP", "sample": "HeLa"}
+    blank = {"id": 1, "name": "Blank", "sample": "Blank", "sample_type": "Blank"}
+    return [(hela, "R:A1"), (blank, "B:H12"), (hela, "R:A2"), (blank, "B:H12")]
+
+
+@pytest.mark.parametrize("template, names", [
+    ("{prefix}_{sample}_{well}_{rep:02d}", ["EXP_HeLa_A1_01", "_Blank_H12_01", "EXP_HeLa_A2_02", "_Blank_H12_02"]),
+    ("{seq:03d}_{name}", ["001_EXP_HeLa", "002_Blank", "003_EXP_HeLa", "004_Blank"]),
+    ("{tray}{well}_{type}", ["RA1_Unknown", "BH12_Blank", "RA2_Unknown", "BH12_Blank"]),
+    ("{date}_{date:%y-%m}_{sample}", ["20240506_24-05_HeLa", "20240506_24-05_Blank"] * 2),
+    ("{{{sample:>6}}}", ["{  HeLa}", "{ Blank}"] * 2),
+])
+def test_render(template, names):
+    assert list(NameTemplate(template).render(injections(), DATE)) == names
+
+
+def test_braces_in_group_values_are_kept():
+    group = {"id": 0, "name": "a{0}b", "sample": "x}"}
+    assert list(NameTemplate("{name}_{sample}_{rep}").render([(group, "R:A1")], DATE)) == ["a{0}b_x}_1"]
+
+
+@pytest.mark.parametrize("template", ["{nope}", "{name!r}", "{seq:q}", "{sample:d}", "{"])
+def test_bad_templates_are_refused(template):
+    with pytest.raises(ValueError):
+        NameTemplate(template)
+
+
+def test_check_unique_collects_repeated_names():
+    duplicates = []
+    rows = [("a", 1), ("b", 2), ("a", 3)]
+    assert list(check_unique(rows, duplicates)) == rows
+    assert duplicates == ["a"]
@@ -0,0 +1,52 @@
+import math
+import random
+
+import pytest
+
+from qgenerator import PLATE_FORMATS, Campaign
+from qgenerator.ordering import _nearest_neighbour, injection_points, optimize_travel, path_length
+from qgenerator.queue import iter_injections
+
+
+def brute_force_tour(units, entry, exit_):
+    # The plain quadratic greedy tour, ties to the lowest unit and then forwards
+    remaining = set(range(1, len(units)))
+    tour = [(0, False)]
+    here = exit_[0]
+    while remaining:
+        _distance, best, flipped = min(
+            (math.dist(here, exit_[unit] if flipped else entry[unit]), unit, flipped)
+            for unit in remaining for flipped in (False, True) if not flipped or exit_[unit] is not entry[unit])
+        remaining.discard(best)
+        tour.append((best, flipped))
+        here = entry[best] if flipped else exit_[best]
+    return tour
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bucketed_tour_matches_brute_force(seed):
+    rng = random.Random(seed)
+    # Wells on a grid give plenty of ties; some units span two wells and may be walked backwards
+    grid = [(x * 4.5, y * 4.5) for x in range(24) for y in range(16)]
+    entry, exit_ = [], []
+    for _ in range(300):
+        start = rng.choice(grid)
+        entry.append(start)
+        exit_.append(rng.choice(grid) if rng.random() < 0.3 else start)
+    units = [[number] for number in range(len(entry))]
+    assert _nearest_neighbour(units, entry, exit_) == brute_force_tour(units, entry, exit_)
+
+
+def test_optimize_travel_keeps_every_injection_and_shortens_the_path():
+    campaign = Campaign(PLATE_FORMATS["384-well"])
+    rng = random.Random(3)
+    for tray in ("Red", "Blue"):
+        for number in range(20):
+            campaign.add_group(tray, rng.getrandbits(384), f"{tray}{number}", "1")
+    injections = list(iter_injections(campaign.sample_groups))
+    ordered, report = optimize_travel(campaign, injections)
+    assert sorted((group["id"], position) for group, position in ordered) == \
+        sorted((group["id"], position) for group, position in injections)
+    assert ordered[0] == injections[0]
+    assert report.after_mm == pytest.approx(path_length(injection_points(campaign, ordered)))
+    assert report.after_mm < report.before_mm
@@ -0,0 +1,40 @@
+from qgenerator import Campaign, iter_injections
+from qgenerator.naming import NameTemplate
+from qgenerator.outputs import check_outputs
+from qgenerator.runorder import run_order
+
+
+def campaign_in(path):
+    campaign = Campaign()
+    campaign.add_group("Red", 0b11, "A", "1", path=str(path))
+    campaign.add_group("Red", 0b100, "B", "1", path=str(path))
+    return campaign
+
+
+def test_missing_path_is_reported(tmp_path):
+    campaign = Campaign()
+    campaign.add_group("Red", 0b1, "A", "1", path=str(tmp_path / "missing"))
+    campaign.add_group("Red", 0b10, "B", "1")
+    assert check_outputs(iter_injections(campaign.sample_groups)) == {
+        0: [f"data path does not exist: {tmp_path / 'missing'}"]}
+
+
+def test_existing_raw_files_are_reported(tmp_path):
+    (tmp_path / "a.RAW").touch()
+    (tmp_path / "B.txt").touch()
+    campaign = campaign_in(tmp_path)
+    campaign.edit_group(0, name="a")
+    assert check_outputs(iter_injections(campaign.sample_groups)) == {
+        0: ["raw files already in the data path: a.raw"]}
+
+
+def test_names_follow_the_queue_order(tmp_path):
+    # With {seq} the third injection is the one that would overwrite 3.raw, whichever group that is
+    (tmp_path / "3.raw").touch()
+    campaign = campaign_in(tmp_path)
+    template = NameTemplate("{seq}")
+    assert list(check_outputs(iter_injections(campaign.sample_groups), template)) == [1]
+    for seed in range(20):
+        injections, _seed = run_order(iter_injections(campaign.sample_groups), "Randomized groups", seed)
+        owner = injections[2][0]["id"]
+        assert list(check_outputs(injections, template)) == [owner]
@@ -0,0 +1,108 @@
+import os
+
+from conftest import campaign_state
+from qgenerator import PLATE_FORMATS, Campaign
+from qgenerator.project import Journal, journal_in_use, load_project, replay_journal, save_project
+
+
+def test_open_journal_is_in_use_until_closed(tmp_path):
+    file_path = str(tmp_path / "session.qgenlog")
+    journal = Journal(file_path, Campaign())
+    assert journal_in_use(file_path)
+    journal.close()
+    assert not journal_in_use(file_path)
+    assert os.path.exists(file_path)
+    assert os.listdir(tmp_path) == ["session.qgenlog"]
+
+
+def test_journal_without_lock_file_is_abandoned(tmp_path):
+    # What a crashed session leaves behind once the lock file is gone
+    file_path = tmp_path / "session.qgenlog"
+    file_path.write_text("", encoding="utf-8")
+    assert not journal_in_use(str(file_path))
+
+
+def make_edits(campaign):
+    first = campaign.add_group("Red", 0b1111, "G1", "1")
+    second = campaign.add_group("Blue", 0b11 << 12, "G2", "2", sample_type="QC")
+    campaign.add_group("Red", 0b11 << 24, "G3", "1")
+    campaign.add_wells(first["id"], 0b11 << 4)
+    campaign.remove_well("Red", 1)
+    campaign.edit_group(second["id"], inj_vol="3", comment="pooled")
+    campaign.move_to_end([first["id"]])
+    campaign.set_plate_format("Green", PLATE_FORMATS["384-well"])
+    campaign.add_group("Green", 1 << 383, "G4", "1")
+    campaign.record_export({"0:R:A1": ("G1", "R:A1", "1", "", "", "Unknown", "G1", "")}, [])
+    campaign.remove_group(second["id"])
+
+
+def test_journal_replays_every_edit(tmp_path):
+    file_path = str(tmp_path / "session.qgenlog")
+    campaign = Campaign()
+    journal = Journal(file_path, campaign, {"tray": "Red"})
+    make_edits(campaign)
+    journal.close()
+    replayed, settings, edits = replay_journal(file_path)
+    assert campaign_state(replayed) == campaign_state(campaign)
+    assert replayed.next_group_id == campaign.next_group_id
+    assert settings == {"tray": "Red"}
+    assert edits == 11
+
+
+def test_journal_replay_skips_a_half_written_line(tmp_path):
+    file_path = str(tmp_path / "session.qgenlog")
+    campaign = Campaign()
+    journal = Journal(file_path, campaign)
+    campaign.add_group("Red", 0b11, "G1", "1")
+    journal.close()
+    expected = campaign_state(campaign)
+    with open(file_path, "a", encoding="utf-8") as f:
+        f.write('["add_group", {"id": 5, "na')
+    replayed, _settings, edits = replay_journal(file_path)
+    assert campaign_state(replayed) == expected
+    assert edits == 1
+
+
+def test_snapshot_starts_the_journal_over(tmp_path):
+    file_path = str(tmp_path / "session.qgenlog")
+    campaign = Campaign()
+    journal = Journal(file_path, campaign)
+    make_edits(campaign)
+    journal.snapshot({"seed": "7"})
+    campaign.add_group("Yellow", 0b1, "G5", "1")
+    journal.close()
+    replayed, settings, edits = replay_journal(file_path)
+    assert campaign_state(replayed) == campaign_state(campaign)
+    assert (settings, edits) == ({"seed": "7"}, 1)
+
+
+def test_project_round_trip(tmp_path):
+    file_path = str(tmp_path / "plates.qgen")
+    campaign = Campaign()
+    make_edits(campaign)
+    save_project(campaign, file_path, {"run_order": "Randomized"})
+    loaded, settings = load_project(file_path)
+    assert campaign_state(loaded) == campaign_state(campaign)
+    assert settings == {"run_order": "Randomized"}
+
+
+def test_a_snapshot_cut_short_keeps_the_old_journal(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "session.qgenlog")
+    campaign = Campaign()
+    journal = Journal(file_path, campaign)
+    make_edits(campaign)
+    journal.close()
+    expected = campaign_state(campaign)
+
+    def crash(source, target):
+        raise OSError("crashed before the rename")
+
+    # The writer thread dies on the failed rename, as the session would
+    monkeypatch.setattr("threading.excepthook", lambda args: None)
+    monkeypatch.setattr("os.replace", crash)
+    campaign.add_group("Yellow", 0b1, "G5", "1")
+    journal = Journal(file_path, campaign)
+    journal.close()
+    monkeypatch.undo()
+    replayed, _settings, _edits = replay_journal(file_path)
+    assert campaign_state(replayed) == expected
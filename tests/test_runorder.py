@@ -0,0 +1,56 @@
+import pytest
+
+from qgenerator import Campaign, iter_injections
+from qgenerator.runorder import RUN_ORDERS, run_order
+
+
+def campaign():
+    campaign = Campaign()
+    for number in range(4):
+        campaign.add_group("Red", 0b111 << (number * 12), f"S{number}", "1")
+    campaign.add_group("Blue", 0b1, "Blank", "1", sample_type="Blank")
+    campaign.add_group("Blue", 0b110, "QC", "1", sample_type="QC")
+    return campaign
+
+
+def names(injections):
+    return [f"{group['name']}@{position}" for group, position in injections]
+
+
+@pytest.mark.parametrize("order", RUN_ORDERS)
+def test_same_seed_same_order(order):
+    injections = list(iter_injections(campaign().sample_groups))
+    first, seed = run_order(injections, order, seed=None)
+    again, _seed = run_order(injections, order, seed=seed)
+    assert names(first) == names(again)
+    assert sorted(names(first)) == sorted(names(injections))
+
+
+def test_blanks_and_qcs_are_interleaved_and_bracketed():
+    injections = list(iter_injections(campaign().sample_groups))
+    ordered, _seed = run_order(injections, blank_every=4, qc_every=6, bracket=True)
+    kinds = [group["name"] if group["name"] in ("Blank", "QC") else "S" for group, _position in ordered]
+    assert kinds == (["Blank", "QC"] + ["S"] * 4 + ["Blank"] + ["S"] * 2 + ["QC"] + ["S"] * 2 + ["Blank"]
+                     + ["S"] * 4 + ["QC", "Blank"])
+    qc_wells = [position for group, position in ordered if group["name"] == "QC"]
+    assert qc_wells == ["B:A2", "B:A3", "B:A2"]
+
+
+def test_block_randomized_keeps_replicate_blocks():
+    ordered, _seed = run_order(iter_injections(campaign().sample_groups), "Block-randomized", seed=3)
+    samples = [position for group, position in ordered if group["name"].startswith("S")]
+    columns = [int(position[3:]) for position in samples]
+    assert [sorted(columns[block * 4:block * 4 + 4]) for block in range(3)] == [[1] * 4, [2] * 4, [3] * 4]
+
+
+def test_unknown_order_is_refused():
+    with pytest.raises(ValueError):
+        run_order([], "Sideways")
+
+
+def test_nothing_to_reorder_streams_through():
+    injections = iter_injections(campaign().sample_groups)
+    ordered, seed = run_order(injections, seed=5)
+    assert ordered is injections and seed == 5
+    ordered, _seed = run_order(iter_injections(campaign().sample_groups), qc_every=2)
+    assert isinstance(ordered, list)
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from qgenerator import PLATE_FORMATS, SELECTION_MODES, RubberBand, row_runs, shape_mask
+
+PLATE = PLATE_FORMATS["384-well"]
+
+
+def random_cell(rng):
+    return rng.randrange(PLATE.n_rows), rng.randrange(PLATE.n_cols)
+
+
+@pytest.mark.parametrize("mode", SELECTION_MODES)
+@pytest.mark.parametrize("seed", range(4))
+def test_deltas_add_up_to_the_selection(mode, seed):
+    # Applying each move's (added, removed) to the shown selection always gives selection()
+    rng = random.Random(seed)
+    base = rng.getrandbits(PLATE.size)
+    exclude = rng.getrandbits(PLATE.size) & rng.getrandbits(PLATE.size)
+    band = RubberBand(PLATE, random_cell(rng), base, exclude, mode)
+    shown = base
+    for _ in range(40):
+        delta = band.move(random_cell(rng))
+        if delta is None:
+            continue
+        added, removed = delta
+        assert not added & removed
+        assert not added & shown and removed & shown == removed
+        assert not (added | removed) & exclude
+        shown = (shown | added) & ~removed
+        assert shown == band.selection()
+
+
+def test_start_on_a_selected_well_erases():
+    start = (2, 3)
+    base = PLATE.rect_mask(0, 0, 5, 5)
+    band = RubberBand(PLATE, start, base)
+    added, removed = band.move((4, 4))
+    assert added == 0
+    assert removed == PLATE.rect_mask(2, 3, 4, 4)
+    assert band.selection() == base & ~removed
+
+
+def test_hovering_the_same_cell_reports_nothing():
+    band = RubberBand(PLATE, (0, 0))
+    assert band.move((1, 1)) == (PLATE.rect_mask(0, 0, 1, 1), 0)
+    assert band.move((1, 1)) is None
+
+
+def test_shapes():
+    assert shape_mask(PLATE, "Rows", (1, 5), (2, 7)) == PLATE.rect_mask(1, 0, 2, PLATE.n_cols - 1)
+    assert shape_mask(PLATE, "Columns", (1, 5), (2, 7)) == PLATE.rect_mask(0, 5, PLATE.n_rows - 1, 7)
+    checkerboard = shape_mask(PLATE, "Checkerboard", (0, 0), (1, 1))
+    assert checkerboard == (1 << PLATE.index(0, 0)) | (1 << PLATE.index(1, 1))
+
+
+def test_row_runs():
+    mask = PLATE.rect_mask(0, 2, 0, 4) | (1 << PLATE.index(0, 6)) | PLATE.rect_mask(3, 0, 3, 1)
+    assert row_runs(PLATE, mask) == [(0, 2, 4), (0, 6, 6), (3, 0, 1)]
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from qgenerator.naming import NameTemplate
+from qgenerator.validation import ValidationIndex
+
+POSITIONS = [f"R:A{col}" for col in range(1, 7)]
+NAMES = ["S1", "S2", "S3"]
+
+
+def random_group(rng, group_id):
+    return {"id": group_id, "name": rng.choice(NAMES), "positions": rng.sample(POSITIONS, rng.randint(1, 3)),
+            "instrument_method": rng.choice(["", "dda.meth"]), "path": rng.choice(["", "C:\\data"])}
+
+
+def all_errors(index, group_ids):
+    return {group_id: index.group_errors(group_id) for group_id in group_ids}
+
+
+@pytest.mark.parametrize("template", [None, "{sample}", "{name}_{well}", "{seq}"])
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_index_matches_a_rebuild(template, seed):
+    # After every add, edit and removal the index reports what a fresh index of the same groups does,
+    # and the ids it returns cover every group whose errors changed
+    rng = random.Random(seed)
+    template = template and NameTemplate(template)
+    groups = {}
+    index = ValidationIndex(template=template)
+    for group_id in range(60):
+        before = all_errors(index, groups)
+        action = rng.random()
+        if action < 0.4 or not groups:
+            group = groups[group_id] = random_group(rng, group_id)
+            changed = index.add(group)
+        elif action < 0.75:
+            group = groups[rng.choice(list(groups))]
+            group.update(random_group(rng, group["id"]))
+            changed = index.update(group)
+        else:
+            changed = index.remove(groups.pop(rng.choice(list(groups)))["id"])
+
+        rebuilt = ValidationIndex(groups.values(), template)
+        assert all_errors(index, groups) == all_errors(rebuilt, groups)
+        assert index.error_count() == rebuilt.error_count() == len(list(index.errors()))
+        assert sorted(index.errors()) == sorted(rebuilt.errors())
+        after = all_errors(index, groups)
+        assert {group_id for group_id in groups if before.get(group_id, []) != after[group_id]} <= changed
+
+
+def test_messages():
+    index = ValidationIndex([
+        {"id": 0, "name": "S1", "positions": ["R:A1", "R:A2"], "instrument_method": "m", "path": "p"},
+        {"id": 1, "name": "S1", "positions": ["R:A2"], "instrument_method": "", "path": "p"},
+    ])
+    assert index.group_errors(0) == ["wells also used by another group: R:A2",
+                                     "file name used by several injections: S1"]
+    assert index.group_errors(1)[-1] == "no instrument method"
+    assert sorted(index.errors()) == ["1 group without instrument method", "File name S1 is used by 3 injections",
+                                      "R:A2 is used by 2 groups"]
+    index.remove(1)
+    assert index.group_errors(0) == ["file name used by several injections: S1"]
@@ -0,0 +1,97 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from qgenerator import Campaign, iter_injections, iter_rows
+from qgenerator.worklists import (export_worklists, get_worklist_format, method_label, save_worklist,
+                                  worklist_jobs, write_worklist)
+
+
+def rows():
+    campaign = Campaign()
+    campaign.add_group("Red", 0b11, "P_HeLa", "2", "C:\\methods\\dda.meth", "D:\\data", prefix="P", sample="HeLa",
+                       comment="lot 7")
+    campaign.add_group("Blue", 0b1, 'QC "pool", 1', "1.5", sample_type="QC")
+    return list(iter_rows(iter_injections(campaign.sample_groups), details=True))
+
+
+def written(worklist_format):
+    f = io.StringIO()
+    assert write_worklist(rows(), f, worklist_format) == 3
+    return f.getvalue().split("\r\n")
+
+
+def test_chromeleon():
+    assert written("Chromeleon") == [
+        "Name,Type,Position,Inj. Vol.,Instrument Method,Sample ID,Comment",
+        "P_HeLa,Unknown,R:A1,2,C:\\methods\\dda.meth,HeLa,lot 7",
+        "P_HeLa,Unknown,R:A2,2,C:\\methods\\dda.meth,HeLa,lot 7",
+        '"QC ""pool"", 1",Check Standard,B:A1,1.5,,"QC ""pool"", 1",',
+        "",
+    ]
+
+
+def test_masshunter():
+    assert written("MassHunter") == [
+        "Sample Name,Sample ID,Sample Position,Method,Data File,Sample Type,Inj Vol (ul),Comment",
+        "P_HeLa,HeLa,R:A1,C:\\methods\\dda.meth,D:\\data\\P_HeLa.d,Sample,2,lot 7",
+        "P_HeLa,HeLa,R:A2,C:\\methods\\dda.meth,D:\\data\\P_HeLa.d,Sample,2,lot 7",
+        '"QC ""pool"", 1","QC ""pool"", 1",B:A1,,"QC ""pool"", 1.d",QC,1.5,',
+        "",
+    ]
+
+
+def test_analyst():
+    assert written("Analyst") == [
+        "Sample Name\tSample ID\tComments\tAcquisition Method\tPlate Position\tVial Position\tInj. Volume (ul)"
+        "\tSample Type\tData File",
+        "P_HeLa\tHeLa\tlot 7\tC:\\methods\\dda.meth\tR\tA1\t2\tUnknown\tD:\\data\\P_HeLa",
+        "P_HeLa\tHeLa\tlot 7\tC:\\methods\\dda.meth\tR\tA2\t2\tUnknown\tD:\\data\\P_HeLa",
+        '"QC ""pool"", 1"\t"QC ""pool"", 1"\t\t\tB\tA1\t1.5\tQC\t"QC ""pool"", 1"',
+        "",
+    ]
+
+
+@pytest.mark.parametrize("worklist_format", ["Chromeleon", "MassHunter", "Analyst"])
+def test_files_keep_crlf_lines(tmp_path, worklist_format):
+    file_path = tmp_path / "queue.csv"
+    assert save_worklist(rows(), str(file_path), worklist_format) == 3
+    assert file_path.read_bytes().decode("utf-8").split("\r\n") == written(worklist_format)
+
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError, match="Unknown worklist format"):
+        get_worklist_format("Xcalibar")
+
+
+def test_method_label():
+    assert method_label("C:\\methods\\dda 60min.meth") == "dda_60min"
+    assert method_label("D:/MassHunter/Lipids.m/") == "Lipids"
+    assert method_label("") == "no_method"
+
+
+def test_jobs_split_by_format_and_method():
+    queue = rows() + [("S9", "R:A3", "1", "E:\\other\\dda.meth", "", "Unknown", "S9", "")]
+    jobs = worklist_jobs(queue, os.path.join("out", "queue.csv"), ["Xcalibur", "Analyst"], per_method=True)
+    assert [(worklist_format.name, path, len(job_rows)) for worklist_format, path, job_rows in jobs] == [
+        ("Xcalibur", os.path.join("out", "queue_dda_xcalibur.csv"), 2),
+        ("Analyst", os.path.join("out", "queue_dda_analyst.txt"), 2),
+        ("Xcalibur", os.path.join("out", "queue_no_method_xcalibur.csv"), 1),
+        ("Analyst", os.path.join("out", "queue_no_method_analyst.txt"), 1),
+        ("Xcalibur", os.path.join("out", "queue_dda_2_xcalibur.csv"), 1),
+        ("Analyst", os.path.join("out", "queue_dda_2_analyst.txt"), 1),
+    ]
+    assert [path for _format, path, _rows in worklist_jobs(queue, "queue", ["Analyst"])] == ["queue.txt"]
+    with pytest.raises(ValueError):
+        worklist_jobs(queue, "queue.csv", [])
+
+
+def test_export_writes_every_job(tmp_path):
+    queue = rows()
+    jobs = worklist_jobs(queue, str(tmp_path / "queue.csv"), ["Xcalibur", "Chromeleon", "MassHunter", "Analyst"])
+    with ThreadPoolExecutor(4) as executor:
+        counts = {path: future.result() for path, future in export_worklists(jobs, executor)}
+    assert counts == {path: 3 for _format, path, _rows in jobs}
+    assert (tmp_path / "queue_chromeleon.csv").read_bytes().decode("utf-8").split("\r\n") == written("Chromeleon")
@@ -0,0 +1,54 @@
+import io
+import os
+
+from qgenerator import campaign_from_layout, iter_injections, iter_rows, save_queue, write_xcalibur_csv
+from qgenerator.worklists import save_worklist
+
+# What the pandas DataFrame.to_csv export wrote for the baseline layout: a "\n"-terminated bracket
+# line, then os.linesep-terminated rows
+BASELINE_LINES = [
+    "File Name,Position,Inj Vol,Instrument Method,Path",
+    "P_S1,R:A1,2,C:\\m\\a.meth,C:\\data",
+    "P_S1,R:A2,2,C:\\m\\a.meth,C:\\data",
+    "P_S1,R:A3,2,C:\\m\\a.meth,C:\\data",
+    "P_S1,R:B1,2,C:\\m\\a.meth,C:\\data",
+    "P_S1,R:B2,2,C:\\m\\a.meth,C:\\data",
+    "P_S1,R:B3,2,C:\\m\\a.meth,C:\\data",
+    '"we,ird ""n""",B:D4,1.5,,',
+    '"we,ird ""n""",B:D5,1.5,,',
+    '"we,ird ""n""",B:D6,1.5,,',
+    'X_S3,Y:H12,10,m b,"p, q"',
+]
+BASELINE = ("Bracket Type=4\n" + "".join(line + os.linesep for line in BASELINE_LINES)).encode()
+
+
+def test_save_queue_matches_the_pandas_export(tmp_path, baseline_layout):
+    campaign = campaign_from_layout(baseline_layout)
+    file_path = tmp_path / "queue.csv"
+    assert save_queue(campaign.sample_groups, str(file_path)) == 10
+    assert file_path.read_bytes() == BASELINE
+
+
+def test_xcalibur_worklist_with_details_matches_the_pandas_export(tmp_path, baseline_layout):
+    # The detail columns the other formats use are left out of the Xcalibur queue
+    campaign = campaign_from_layout(baseline_layout)
+    rows = iter_rows(iter_injections(campaign.sample_groups), details=True)
+    file_path = tmp_path / "queue.csv"
+    assert save_worklist(rows, str(file_path), "Xcalibur") == 10
+    assert file_path.read_bytes() == BASELINE
+
+
+def test_rows_are_written_as_they_come():
+    # The writer pulls one row at a time instead of collecting the queue first
+    pulled = []
+
+    def rows():
+        for number in range(3):
+            pulled.append(number)
+            yield (f"S{number}", f"R:A{number + 1}", "1", "", "")
+
+    f = io.StringIO()
+    lines = []
+    f.write = lambda line: lines.append((line, len(pulled)))
+    assert write_xcalibur_csv(rows(), f) == 3
+    assert [count for _line, count in lines] == [0, 0, 1, 2, 3]